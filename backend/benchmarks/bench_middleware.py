@@ -0,0 +1,158 @@
+"""
+Microbenchmark: per-request middleware overhead, BaseHTTPMiddleware vs pure ASGI
+
+Builds two minimal apps with the same three middlewares (security headers,
+request logging, CSRF check) - one using the previous BaseHTTPMiddleware /
+@app.middleware("http") implementations, one using the pure ASGI classes
+from middleware/ - and drives them in-process through the ASGI interface,
+so only framework and middleware cost is measured.
+
+Usage (from backend/):
+    python -m benchmarks.bench_middleware [--requests N]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware.csrf_middleware import CSRFMiddleware, validate_csrf_token
+from middleware.request_logging import RequestLoggingMiddleware
+from middleware.security_headers import SecurityHeadersMiddleware
+
+
+# ═══════════════════════════════════════
+# PREVIOUS IMPLEMENTATIONS (for comparison only)
+# ═══════════════════════════════════════
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers['X-Frame-Options'] = 'DENY'
+        response.headers['X-XSS-Protection'] = '1; mode=block'
+        response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+        response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
+        if '/auth/' in str(request.url.path):
+            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, private'
+            response.headers['Pragma'] = 'no-cache'
+        return response
+
+
+async def legacy_csrf_middleware(request: Request, call_next):
+    if request.method in ('GET', 'HEAD', 'OPTIONS'):
+        return await call_next(request)
+    skip_paths = ['/api/auth/login', '/api/auth/refresh', '/api/auth/setup']
+    if any(request.url.path.startswith(path) for path in skip_paths):
+        return await call_next(request)
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return await call_next(request)
+    csrf_token = request.headers.get('X-CSRF-Token')
+    session_id = request.cookies.get('session_id')
+    if session_id and csrf_token and not await validate_csrf_token(session_id, csrf_token):
+        return JSONResponse(status_code=403, content={"detail": "Invalid CSRF token"})
+    return await call_next(request)
+
+
+def add_routes(app: FastAPI):
+    @app.get("/api/cms/posts/public/list")
+    async def public_list():
+        return [{"slug": f"post-{i}", "title": "Post"} for i in range(10)]
+
+    @app.post("/api/cms/posts")
+    async def create():
+        return {"success": True}
+
+    @app.get("/api/cms/audit-logs/export")
+    async def export():
+        async def rows():
+            for i in range(100):
+                yield f"{i},admin@timelov.pl,update,post\n".encode()
+        return StreamingResponse(rows(), media_type="text/csv")
+
+
+def build_legacy_app() -> FastAPI:
+    app = FastAPI()
+    add_routes(app)
+    app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_csrf_middleware)
+    app.add_middleware(LegacySecurityHeadersMiddleware)
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        logging.getLogger("server").info(f"{request.method} {request.url.path}")
+        return await call_next(request)
+
+    return app
+
+
+def build_asgi_app() -> FastAPI:
+    app = FastAPI()
+    add_routes(app)
+    app.add_middleware(CSRFMiddleware)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
+    return app
+
+
+# ═══════════════════════════════════════
+# DRIVER
+# ═══════════════════════════════════════
+async def call(app, method: str, path: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", b"Bearer x")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app, method: str, path: str, requests: int) -> float:
+    for _ in range(200):
+        await call(app, method, path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, method, path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def run(requests: int):
+    logging.getLogger("server").setLevel(logging.WARNING)
+    legacy, asgi = build_legacy_app(), build_asgi_app()
+    cases = [
+        ("GET public list", "GET", "/api/cms/posts/public/list"),
+        ("POST create (csrf path)", "POST", "/api/cms/posts"),
+        ("GET streaming export", "GET", "/api/cms/audit-logs/export"),
+    ]
+    print(f"{'case':<28} {'BaseHTTP':>11} {'pure ASGI':>11} {'saved':>10}")
+    for name, method, path in cases:
+        old = await measure(legacy, method, path, requests)
+        new = await measure(asgi, method, path, requests)
+        print(f"{name:<28} {old:>9.1f}us {new:>9.1f}us {old - new:>8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Microbenchmark: hydrating stored documents with and without validation
+
+Compares full pydantic construction (validators re-run) against the
+trusted `from_db` path for integrations with large widget_code and for
+admin users.
+
+Usage (from backend/):
+    python -m benchmarks.bench_model_hydration [--iterations N]
+"""
+import argparse
+import timeit
+import uuid
+from datetime import datetime
+
+from models.user import AdminUser
+from models.widget import ThirdPartyIntegration, _widget_code_cache
+
+
+def make_integration_doc(code_kb: int) -> dict:
+    """Build a stored integration document with roughly `code_kb` KB of widget code"""
+    line = '<div class="elfsight-app-item" data-index="{i}">Review {i}</div>\n'
+    body = []
+    size = 0
+    i = 0
+    while size < code_kb * 1024 - 200:
+        chunk = line.format(i=i)
+        body.append(chunk)
+        size += len(chunk)
+        i += 1
+    widget_code = (
+        '<script src="https://static.elfsight.com/platform/platform.js" defer></script>\n'
+        + "".join(body)
+    )
+    return {
+        "_id": "5f0000000000000000000000",
+        "id": str(uuid.uuid4()),
+        "integration_type": "ELFSIGHT_REVIEWS",
+        "integration_name": "Google Reviews",
+        "widget_code": widget_code,
+        "section_name": "testimonials",
+        "injection_position": "inline",
+        "is_active": True,
+        "priority_order": 0,
+        "custom_css_override": None,
+        "config": {},
+        "created_by": None,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def make_user_doc() -> dict:
+    """Build a stored admin user document"""
+    return {
+        "_id": "5f0000000000000000000001",
+        "id": str(uuid.uuid4()),
+        "email": "admin@timelov.pl",
+        "username": "admin",
+        "password_hash": "$2b$12$" + "x" * 53,
+        "is_active": True,
+        "is_superadmin": True,
+        "last_login": datetime.utcnow(),
+        "failed_login_attempts": 0,
+        "locked_until": None,
+        "password_reset_token": None,
+        "password_reset_expires": None,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def per_call_us(fn, iterations: int) -> float:
+    """Best-of-5 time per call in microseconds"""
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'case':<40} {'validated':>12} {'from_db':>12} {'speedup':>9}")
+
+    for code_kb in (1, 10, 50, 95):
+        doc = make_integration_doc(code_kb)
+        stripped = {k: v for k, v in doc.items() if k != "_id"}
+
+        def validated_cold():
+            _widget_code_cache.clear()
+            ThirdPartyIntegration(**stripped)
+
+        validated = per_call_us(validated_cold, args.iterations)
+        trusted = per_call_us(lambda: ThirdPartyIntegration.from_db(doc), args.iterations)
+        print(f"{f'integration, {code_kb}KB widget_code':<40} {validated:>10.1f}us {trusted:>10.1f}us {validated / trusted:>8.1f}x")
+
+    user_doc = make_user_doc()
+    user_stripped = {k: v for k, v in user_doc.items() if k != "_id"}
+    validated = per_call_us(lambda: AdminUser(**user_stripped), args.iterations)
+    trusted = per_call_us(lambda: AdminUser.from_db(user_doc), args.iterations)
+    print(f"{'admin user':<40} {validated:>10.1f}us {trusted:>10.1f}us {validated / trusted:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Load test for the TimeLov public landing-page and admin list endpoints
+
+Boots the API with uvicorn against a local MongoDB database (seeded with
+benchmarks.seed_data unless --skip-seed), drives each endpoint with
+concurrent clients for a fixed duration and reports p50/p95/p99 latency
+and requests per second. Results are written as JSON so runs can be
+compared across commits. Rate limiting is switched off in the booted
+server (RATE_LIMIT_ENABLED=false) unless --rate-limits is given; when
+targeting --url, start that server with the same variable.
+
+Usage (from backend/, MongoDB running locally):
+    python -m benchmarks.load_test                      # seed, boot, run
+    python -m benchmarks.load_test --skip-seed --duration 5
+    python -m benchmarks.load_test --url http://localhost:8001 --skip-seed
+    python -m benchmarks.load_test --compare benchmarks/results/<old>.json
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+from pymongo import MongoClient
+
+from benchmarks.seed_data import seed_database, BENCH_ADMIN_EMAIL, BENCH_ADMIN_PASSWORD
+from services.audit_storage import PARTITION_RE
+
+BACKEND_DIR = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+PUBLIC_ENDPOINTS = [
+    ("settings_public", "/api/cms/settings/public"),
+    ("integrations_render", "/api/cms/integrations/render"),
+    ("integrations_render_header", "/api/cms/integrations/render?position=header"),
+    ("integrations_public", "/api/cms/integrations/public"),
+    ("posts_public_list", "/api/cms/posts/public/list"),
+    ("posts_public_list_category", "/api/cms/posts/public/list?category=technologia&skip=20"),
+    ("posts_public_detail", "/api/cms/posts/public/{post_slug}"),
+    ("pages_public_detail", "/api/cms/pages/public/{page_slug}"),
+    ("widgets_public_pricing", "/api/cms/widgets/public/pricing"),
+    ("widgets_public_faq", "/api/cms/widgets/public/faq"),
+]
+
+ADMIN_ENDPOINTS = [
+    ("admin_posts", "/api/cms/posts"),
+    ("admin_posts_published", "/api/cms/posts?status=published&skip=50"),
+    ("admin_pages", "/api/cms/pages"),
+    ("admin_widgets", "/api/cms/widgets"),
+    ("admin_integrations", "/api/cms/integrations?include_inactive=true"),
+    ("admin_audit_logs", "/api/cms/audit-logs"),
+    ("admin_audit_stats", "/api/cms/audit-logs/stats"),
+    ("admin_dashboard", "/api/cms/dashboard"),
+]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(pct / 100 * len(sorted_values)))) - 1
+    return sorted_values[rank]
+
+
+def run_endpoint(url: str, headers: dict, concurrency: int, duration: float) -> dict:
+    """Hammer one URL with `concurrency` clients for `duration` seconds"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=30)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if ok:
+                local_latencies.append(elapsed)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def wait_for_server(base_url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout}s")
+
+
+def start_server(args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "MONGO_URL": args.mongo_url,
+        "DB_NAME": args.db,
+        "WEB_CONCURRENCY": str(args.workers),
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limits else "false",
+    }
+    cmd = [
+        sys.executable, "-m", "uvicorn", "server:app",
+        "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+
+def login(base_url: str) -> str:
+    response = requests.post(
+        f"{base_url}/api/auth/login",
+        json={"email": BENCH_ADMIN_EMAIL, "password": BENCH_ADMIN_PASSWORD},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict, baseline: dict = None):
+    header = f"{'endpoint':<28} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'rps Δ':>8} {'p95 Δ':>8}"
+    print(header)
+    for name, r in results.items():
+        line = f"{name:<28} {r['rps']:>9} {r['p50_ms']:>7}ms {r['p95_ms']:>7}ms {r['p99_ms']:>7}ms {r['errors']:>7}"
+        old = (baseline or {}).get(name)
+        if old and old["rps"] and old["p95_ms"]:
+            line += f" {(r['rps'] / old['rps'] - 1) * 100:>+7.1f}% {(r['p95_ms'] / old['p95_ms'] - 1) * 100:>+7.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark an already running server instead of booting one")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="timelov_bench")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--rate-limits", action="store_true", help="Keep API rate limits enabled in the booted server")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--audit-logs", type=int, default=1_000_000)
+    parser.add_argument("--integrations", type=int, default=50)
+    parser.add_argument("--public-only", action="store_true")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Previous result file to diff against")
+    args = parser.parse_args()
+
+    mongo = MongoClient(args.mongo_url)
+    db = mongo[args.db]
+    if not args.skip_seed:
+        seed_database(db, posts=args.posts, integrations=args.integrations, audit_logs=args.audit_logs)
+
+    post = db.posts.find_one({"status": "published", "deleted_at": None}, {"slug": 1})
+    page = db.pages.find_one({"status": "published", "deleted_at": None}, {"slug": 1})
+    slugs = {
+        "post_slug": post["slug"] if post else "missing",
+        "page_slug": page["slug"].lstrip("/") if page else "missing",
+    }
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args)
+
+    try:
+        wait_for_server(base_url)
+        endpoints = [(name, path, {}) for name, path in PUBLIC_ENDPOINTS]
+        if not args.public_only:
+            auth = {"Authorization": f"Bearer {login(base_url)}"}
+            endpoints += [(name, path, auth) for name, path in ADMIN_ENDPOINTS]
+
+        results = {}
+        for name, path, headers in endpoints:
+            url = base_url + path.format(**slugs)
+            print(f"-> {name} ({args.concurrency} clients, {args.duration}s)", flush=True)
+            results[name] = run_endpoint(url, headers, args.concurrency, args.duration)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "counts": {
+                **{name: db[name].estimated_document_count() for name in ("posts", "pages", "integrations")},
+                "audit_logs": sum(
+                    db[name].estimated_document_count()
+                    for name in db.list_collection_names(filter={"name": {"$regex": PARTITION_RE.pattern}})
+                ),
+            },
+        },
+        "results": results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    baseline = json.loads(Path(args.compare).read_text())["results"] if args.compare else None
+    print_results(results, baseline)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Local stand-in for a CDN purge API
+
+Accepts the requests sent by services.cdn_purge.HttpPurgeBackend, prints
+every purge and keeps them for inspection, so the cache policy and purge
+hooks can be exercised without a real CDN.
+
+Usage (from backend/):
+    python -m benchmarks.purge_endpoint --port 9100
+    CDN_PURGE_URL=http://127.0.0.1:9100/purge uvicorn server:app --port 8001
+
+    curl http://127.0.0.1:9100/purges          # keys received so far
+    curl -X DELETE http://127.0.0.1:9100/purges
+"""
+import argparse
+from datetime import datetime
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Header, Request
+
+app = FastAPI(title="CDN purge stand-in")
+
+purges: List[dict] = []
+
+
+@app.post("/purge")
+async def purge(request: Request, surrogate_key: Optional[str] = Header(None)):
+    body = await request.json()
+    keys = body.get("surrogate_keys") or (surrogate_key or "").split()
+    purges.append({"at": datetime.utcnow().isoformat(), "keys": keys})
+    print(f"purge: {' '.join(keys)}", flush=True)
+    return {"status": "ok", "purged": len(keys)}
+
+
+@app.get("/purges")
+async def list_purges():
+    return {"count": len(purges), "purges": purges}
+
+
+@app.delete("/purges")
+async def clear_purges():
+    purges.clear()
+    return {"status": "ok"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Seed a MongoDB database with realistic TimeLov CMS volumes for benchmarks
+
+Documents mirror the shapes written by the routes (models.post.Post,
+models.audit_log.AuditLog, ...) but are built as plain dicts so that
+seeding a million audit rows stays fast. Audit rows are stored the way the
+audit writer stores them: encoded, in their monthly partitions and counted
+into the rollups.
+
+Usage (from backend/):
+    python -m benchmarks.seed_data --db timelov_bench [--posts 10000] [--audit-logs 1000000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+import bcrypt
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from models.post import PostCategory, PostStatus
+from models.settings import get_default_settings
+from models.widget import IntegrationType, InjectionPosition, WidgetSection
+from models.audit_log import AuditAction, EntityType
+from services.audit_codec import USER_AGENT_COLLECTION, encode_entry, user_agent_id
+from services.audit_rollups import BACKFILL_META_ID, ROLLED_UP_FIELD, ROLLUP_COLLECTION, rollup_updates
+from services.audit_storage import PARTITION_RE, group_by_partition
+from services.indexes import INDEX_SPEC_META_ID
+from services.search_service import SEARCH_FIELD, POST_SEARCH_SOURCES, PAGE_SEARCH_SOURCES, search_fields
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+BENCH_ADMIN_EMAIL = "bench@timelov.pl"
+BENCH_ADMIN_PASSWORD = "Bench123!@#"
+
+BATCH_SIZE = 10_000
+
+WORDS = (
+    "zespół kalendarz grafik zmiana pracownik urlop raport czas projekt zadanie "
+    "spotkanie klient plan tydzień miesiąc lider cel wynik ocena szkolenie "
+    "gamifikacja kod qr obecność biuro zdalnie wydajność proces narzędzie"
+).split()
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+]
+
+
+def words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def make_widget_code(rng: random.Random, size_kb: int) -> str:
+    """Trusted-source widget code of roughly `size_kb` KB"""
+    header = '<script src="https://static.elfsight.com/platform/platform.js" data-use-service-core defer></script>\n'
+    line = '<div class="elfsight-app-item">{}</div>\n'
+    parts = [header]
+    size = len(header)
+    while size < size_kb * 1024:
+        chunk = line.format(words(rng, 8))
+        parts.append(chunk)
+        size += len(chunk)
+    return "".join(parts)
+
+
+def insert_batched(collection, docs):
+    """Insert an iterable of documents in batches"""
+    batch = []
+    inserted = 0
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+def insert_audit_logs(db, docs) -> int:
+    """
+    Store audit documents as the audit writer does: encoded (audit_codec),
+    grouped into monthly partitions and counted into the rollups
+    """
+    async def encode(batch):
+        for doc in batch:
+            await encode_entry(doc)
+            doc[ROLLED_UP_FIELD] = True
+
+    db[USER_AGENT_COLLECTION].insert_many(
+        [{"_id": user_agent_id(user_agent), "user_agent": user_agent} for user_agent in USER_AGENTS]
+    )
+    docs = iter(docs)
+    inserted = 0
+    while batch := list(islice(docs, BATCH_SIZE)):
+        asyncio.run(encode(batch))
+        for name, partition_docs in group_by_partition(batch).items():
+            db[name].insert_many(partition_docs, ordered=False)
+        db[ROLLUP_COLLECTION].bulk_write(rollup_updates(batch), ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+def generate_posts(rng: random.Random, count: int, admin_id: str):
+    now = datetime.utcnow()
+    categories = [c.value for c in PostCategory]
+    statuses = [PostStatus.PUBLISHED.value] * 6 + [PostStatus.DRAFT.value] * 3 + [PostStatus.ARCHIVED.value]
+    for i in range(count):
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 730))
+        status = rng.choice(statuses)
+        yield {
+            "id": str(uuid.uuid4()),
+            "slug": f"post-{i}",
+            "title": words(rng, 6).capitalize(),
+            "excerpt": words(rng, 20)[:255],
+            "content": "\n\n".join(words(rng, 80) for _ in range(rng.randint(3, 25))),
+            "featured_image_url": None,
+            "category": rng.choice(categories),
+            "tags": rng.sample(WORDS, rng.randint(0, 4)),
+            "status": status,
+            "created_by": admin_id,
+            "created_at": created,
+            "updated_at": created,
+            "published_at": created + timedelta(hours=1) if status == PostStatus.PUBLISHED.value else None,
+            "deleted_at": now if rng.random() < 0.02 else None,
+        }
+
+
+def generate_pages(rng: random.Random, count: int, admin_id: str):
+    now = datetime.utcnow()
+    for i in range(count):
+        created = now - timedelta(days=rng.randint(0, 730))
+        published = rng.random() < 0.8
+        yield {
+            "id": str(uuid.uuid4()),
+            "slug": f"/page-{i}",
+            "title": words(rng, 4).capitalize(),
+            "meta_description": words(rng, 12)[:160],
+            "content": "\n\n".join(words(rng, 80) for _ in range(rng.randint(2, 10))),
+            "status": "published" if published else "draft",
+            "created_by": admin_id,
+            "created_at": created,
+            "updated_at": created,
+            "published_at": created if published else None,
+            "deleted_at": None,
+        }
+
+
+def generate_widgets(rng: random.Random, admin_id: str):
+    now = datetime.utcnow()
+    for order, section in enumerate(WidgetSection):
+        yield {
+            "id": str(uuid.uuid4()),
+            "section_name": section.value,
+            "widget_code": make_widget_code(rng, rng.randint(1, 8)),
+            "widget_name": f"Widget - {section.value}",
+            "is_active": True,
+            "display_order": order,
+            "created_by": admin_id,
+            "created_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+        }
+
+
+def generate_integrations(rng: random.Random, count: int, admin_id: str):
+    now = datetime.utcnow()
+    types = [t.value for t in IntegrationType]
+    sections = [s.value for s in WidgetSection]
+    positions = [p.value for p in InjectionPosition]
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "integration_type": rng.choice(types),
+            "integration_name": f"Integration {i}",
+            "widget_code": make_widget_code(rng, rng.randint(1, 20)),
+            "section_name": rng.choice(sections),
+            "injection_position": rng.choice(positions),
+            "is_active": rng.random() < 0.8,
+            "priority_order": rng.randint(0, 100),
+            "custom_css_override": None,
+            "config": {},
+            "created_by": admin_id,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+def generate_audit_logs(rng: random.Random, count: int, admin_id: str, entity_ids: list):
+    now = datetime.utcnow()
+    actions = [a.value for a in AuditAction]
+    entity_types = [e.value for e in EntityType]
+    span_minutes = 60 * 24 * 365
+    for _ in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "admin_id": admin_id,
+            "admin_email": BENCH_ADMIN_EMAIL,
+            "action": rng.choice(actions),
+            "entity_type": rng.choice(entity_types),
+            "entity_id": rng.choice(entity_ids) if entity_ids else None,
+            "old_values": {"title": words(rng, 4)},
+            "new_values": {"title": words(rng, 4)},
+            "ip_address": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            "user_agent": rng.choice(USER_AGENTS),
+            "additional_info": None,
+            "created_at": now - timedelta(minutes=rng.randint(0, span_minutes)),
+        }
+
+
+def seed_database(
+    db,
+    posts: int = 10_000,
+    pages: int = 200,
+    integrations: int = 50,
+    audit_logs: int = 1_000_000,
+    seed: int = 42,
+    log=print,
+) -> dict:
+    """Drop and re-seed the CMS collections; returns inserted counts"""
+    rng = random.Random(seed)
+
+    for name in ("admin_users", "posts", "pages", "widgets", "integrations", "audit_logs", "site_settings"):
+        db[name].drop()
+    # Audit data derived from or stored beside audit_logs: monthly
+    # partitions, rollups and the user agent dictionary
+    for name in db.list_collection_names(filter={"name": {"$regex": PARTITION_RE.pattern}}):
+        db[name].drop()
+    db[ROLLUP_COLLECTION].drop()
+    db[USER_AGENT_COLLECTION].drop()
+    # Dropping collections drops their indexes; force the next reconcile
+    db.schema_meta.delete_many({"_id": {"$in": [INDEX_SPEC_META_ID, BACKFILL_META_ID]}})
+
+    admin_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    db.admin_users.insert_one({
+        "id": admin_id,
+        "email": BENCH_ADMIN_EMAIL,
+        "username": "bench",
+        "password_hash": bcrypt.hashpw(BENCH_ADMIN_PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=12)).decode("utf-8"),
+        "is_active": True,
+        "is_superadmin": True,
+        "last_login": None,
+        "failed_login_attempts": 0,
+        "locked_until": None,
+        "password_reset_token": None,
+        "password_reset_expires": None,
+        "created_at": now,
+        "updated_at": now,
+    })
+
+    settings = get_default_settings().dict()
+    settings["_type"] = "complete_settings"
+    db.site_settings.insert_one(settings)
+
+    counts = {}
+    log(f"Seeding {posts} posts...")
+    post_docs = list(generate_posts(rng, posts, admin_id))
+    for doc in post_docs:
+        doc[SEARCH_FIELD] = search_fields(doc, POST_SEARCH_SOURCES)
+    counts["posts"] = insert_batched(db.posts, post_docs)
+    log(f"Seeding {pages} pages...")
+    page_docs = list(generate_pages(rng, pages, admin_id))
+    for doc in page_docs:
+        doc[SEARCH_FIELD] = search_fields(doc, PAGE_SEARCH_SOURCES)
+    counts["pages"] = insert_batched(db.pages, page_docs)
+    log("Seeding widgets...")
+    counts["widgets"] = insert_batched(db.widgets, generate_widgets(rng, admin_id))
+    log(f"Seeding {integrations} integrations...")
+    counts["integrations"] = insert_batched(db.integrations, generate_integrations(rng, integrations, admin_id))
+    log(f"Seeding {audit_logs} audit logs...")
+    entity_ids = [p["id"] for p in post_docs[:1000]]
+    counts["audit_logs"] = insert_audit_logs(db, generate_audit_logs(rng, audit_logs, admin_id, entity_ids))
+    # Every seeded entry is already counted into the rollups
+    db.schema_meta.update_one(
+        {"_id": BACKFILL_META_ID},
+        {"$set": {"completed_at": datetime.utcnow(), "counted": 0}},
+        upsert=True
+    )
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="timelov_bench")
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--integrations", type=int, default=50)
+    parser.add_argument("--audit-logs", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_url)
+    counts = seed_database(
+        client[args.db],
+        posts=args.posts,
+        pages=args.pages,
+        integrations=args.integrations,
+        audit_logs=args.audit_logs,
+        seed=args.seed,
+    )
+    print(f"Seeded {args.db}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+HTTP cache policy for TimeLov Admin API
+
+Cache-Control is decided here for every response, per route template,
+so a CDN in front of the API can serve anonymous traffic:
+
+- public routes get `s-maxage` (shared caches) with `stale-while-revalidate`
+  and `stale-if-error`, while browsers revalidate (`max-age=0`);
+- every other route is `private, no-store`;
+- only successful responses (200/304) are cacheable;
+- a Cache-Control header set by the route itself is left as is.
+
+Responses also name the entities they contain in `Surrogate-Key` (Fastly,
+space separated) and `Cache-Tag` (Cloudflare, comma separated), so a write
+can purge exactly the cached responses it affects (services/cdn_purge.py).
+Keys come from ROUTE_CACHE_POLICIES (templated with path and query
+parameters) plus any added by the handler with add_surrogate_keys().
+"""
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl
+import logging
+import re
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_STATUS = frozenset((200, 304))
+
+
+class CachePolicy(NamedTuple):
+    """Cache-Control directives for one route"""
+    max_age: int = 0
+    s_maxage: int = 0
+    stale_while_revalidate: int = 0
+    stale_if_error: int = 0
+    immutable: bool = False
+    surrogate_keys: Tuple[str, ...] = ()
+
+    def header(self) -> bytes:
+        directives = ["public", f"max-age={self.max_age}"]
+        if self.s_maxage:
+            directives.append(f"s-maxage={self.s_maxage}")
+        if self.stale_while_revalidate:
+            directives.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        if self.stale_if_error:
+            directives.append(f"stale-if-error={self.stale_if_error}")
+        if self.immutable:
+            directives.append("immutable")
+        return ", ".join(directives).encode()
+
+
+# Landing-page content: edited rarely, purged on write
+PUBLIC_CONTENT = CachePolicy(s_maxage=300, stale_while_revalidate=600, stale_if_error=86400)
+# Search results: read from secondaries and never purged (a purge could
+# refetch from a lagging secondary), so kept short
+PUBLIC_SEARCH = CachePolicy(s_maxage=60, stale_while_revalidate=120, stale_if_error=3600)
+# Uploaded files never change under the same id
+IMMUTABLE = CachePolicy(max_age=31536000, s_maxage=31536000, immutable=True)
+
+SETTINGS_KEYS = (
+    "settings", "settings:branding", "settings:seo", "settings:navigation",
+    "settings:general", "settings:integrations"
+)
+
+# Route template -> policy; anything not listed is private
+ROUTE_CACHE_POLICIES: Dict[str, CachePolicy] = {
+    "/api/public/bootstrap": PUBLIC_CONTENT._replace(
+        surrogate_keys=SETTINGS_KEYS + ("widgets", "integrations")
+    ),
+    "/api/cms/settings/public": PUBLIC_CONTENT._replace(surrogate_keys=SETTINGS_KEYS),
+    "/api/cms/settings/public/branding.css": PUBLIC_CONTENT._replace(
+        surrogate_keys=("settings", "settings:branding")
+    ),
+    "/api/cms/settings/files/{file_id}": IMMUTABLE._replace(surrogate_keys=("file:{file_id}",)),
+    "/api/cms/posts/public/list": PUBLIC_CONTENT._replace(surrogate_keys=("posts", "posts:list")),
+    "/api/cms/posts/public/search": PUBLIC_SEARCH,
+    "/api/cms/posts/public/quick-search": PUBLIC_SEARCH,
+    "/api/cms/posts/public/{slug}": PUBLIC_CONTENT._replace(surrogate_keys=("posts",)),
+    "/api/cms/pages/public/search": PUBLIC_SEARCH,
+    "/api/cms/pages/public/{slug:path}": PUBLIC_CONTENT._replace(surrogate_keys=("pages",)),
+    "/api/cms/widgets/public/{section}": PUBLIC_CONTENT._replace(
+        surrogate_keys=("widgets", "widgets:section:{section}")
+    ),
+    "/api/cms/integrations/public": PUBLIC_CONTENT._replace(
+        surrogate_keys=("integrations", "integrations:position:{position}", "integrations:section:{section}")
+    ),
+    "/api/cms/integrations/render": PUBLIC_CONTENT._replace(
+        surrogate_keys=("integrations", "integrations:position:{position}", "settings:branding")
+    ),
+}
+
+PRIVATE_HEADERS = [(b'cache-control', b'private, no-store')]
+
+_POLICY_HEADER_NAMES = frozenset((b'surrogate-key', b'cache-tag'))
+SURROGATE_KEY_RE = re.compile(r"^[A-Za-z0-9:_-]+$")
+_SURROGATE_KEYS_STATE = "surrogate_keys"
+
+
+def add_surrogate_keys(request: Request, *keys: str):
+    """Name entities in the response (e.g. post:{id}) for targeted CDN purges"""
+    state = request.scope.setdefault("state", {})
+    state.setdefault(_SURROGATE_KEYS_STATE, []).extend(keys)
+
+
+def _format_key(template: str, params: dict) -> Optional[str]:
+    if "{" not in template:
+        return template
+    try:
+        return template.format(**params)
+    except KeyError:
+        # Optional parameter not given: the key does not apply
+        return None
+
+
+def surrogate_keys_for(scope, policy: CachePolicy) -> list:
+    """Static keys of the route's policy plus keys added by the handler"""
+    params = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    params.update(scope.get("path_params") or {})
+    keys = [key for key in (_format_key(t, params) for t in policy.surrogate_keys) if key]
+    keys.extend((scope.get("state") or {}).get(_SURROGATE_KEYS_STATE, ()))
+    # De-duplicate, keep order. Query values are validated by the routes
+    # (enums) before a cacheable response exists; anything else that is not
+    # a plain token must never reach a header or become a CDN key
+    return [key for key in dict.fromkeys(keys) if SURROGATE_KEY_RE.match(key)]
+
+
+class CachePolicyMiddleware:
+    """Apply ROUTE_CACHE_POLICIES to every response (pure ASGI)"""
+
+    def __init__(self, app, policies: Dict[str, CachePolicy] = ROUTE_CACHE_POLICIES):
+        self.app = app
+        self.policies = policies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_policy(message):
+            if message["type"] == "http.response.start":
+                # The router stores the matched route in the shared scope
+                route = scope.get("route")
+                policy = self.policies.get(getattr(route, "path", None))
+                headers = [h for h in message.get("headers", []) if h[0].lower() not in _POLICY_HEADER_NAMES]
+                # A Cache-Control set by the route itself takes precedence
+                route_cache_control = any(h[0].lower() == b'cache-control' for h in headers)
+                if policy is not None and message["status"] in CACHEABLE_STATUS and scope["method"] in ("GET", "HEAD"):
+                    if not route_cache_control:
+                        headers.append((b'cache-control', policy.header()))
+                    keys = surrogate_keys_for(scope, policy)
+                    if keys:
+                        headers.append((b'surrogate-key', " ".join(keys).encode()))
+                        headers.append((b'cache-tag', ",".join(keys).encode()))
+                elif not route_cache_control:
+                    headers.extend(PRIVATE_HEADERS)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_policy)
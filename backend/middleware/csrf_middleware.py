@@ -1,83 +1,269 @@
-"""CSRF Protection Middleware for TimeLov Admin API"""
+"""CSRF Protection Middleware for TimeLov Admin API
+
+Tokens come from one of three stores, chosen with CSRF_TOKEN_MODE:
+
+- "memory" (default): per-process, capacity-bounded, expiry-ordered store
+  swept in O(expired) by a background task
+- "mongo": shared by all workers; a TTL index expires tokens
+- "signed": stateless HMAC tokens bound to the session, no store at all
+"""
+import asyncio
+import heapq
+import hmac
+import os
 import secrets
 import hashlib
-from datetime import datetime, timedelta
-from typing import Optional, Set
-from fastapi import Request, HTTPException
+import time
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 from fastapi.responses import JSONResponse
+from starlette.requests import cookie_parser
 import logging
 
 logger = logging.getLogger(__name__)
 
-# CSRF token store (in production, use Redis)
-csrf_tokens: dict = {}
 CSRF_TOKEN_EXPIRY_HOURS = 24
+CSRF_TOKEN_MODE = os.environ.get("CSRF_TOKEN_MODE", "memory")
+CSRF_STORE_CAPACITY = int(os.environ.get("CSRF_STORE_CAPACITY", "100000"))
+CSRF_SWEEP_INTERVAL_SECONDS = 60
+# Signed tokens must validate on every worker, so the key has to be shared
+CSRF_SECRET_KEY = os.environ.get("CSRF_SECRET_KEY") or os.environ.get("JWT_SECRET_KEY")
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class MemoryCSRFTokenStore:
+    """
+    Per-process token store with a hard capacity. A min-heap of
+    (expires_at, session_id) orders entries by expiry, so sweeping pops
+    only expired entries and, at capacity, the soonest-expiring token is
+    evicted. Heap entries left behind by re-issued sessions are skipped.
+    """
+
+    def __init__(self, capacity: int = CSRF_STORE_CAPACITY, ttl_seconds: float = CSRF_TOKEN_EXPIRY_HOURS * 3600):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    async def issue(self, session_id: str) -> str:
+        token = secrets.token_urlsafe(32)
+        expires_at = time.monotonic() + self.ttl_seconds
+        if session_id not in self._tokens:
+            while len(self._tokens) >= self.capacity:
+                self._pop_oldest()
+        self._tokens[session_id] = (token, expires_at)
+        heapq.heappush(self._expiry_heap, (expires_at, session_id))
+        if len(self._expiry_heap) > 2 * self.capacity:
+            self._compact()
+        return token
+
+    async def validate(self, session_id: str, token: str) -> bool:
+        stored = self._tokens.get(session_id)
+        if stored is None:
+            return False
+        if stored[1] <= time.monotonic():
+            del self._tokens[session_id]
+            return False
+        # Constant-time comparison to prevent timing attacks
+        return secrets.compare_digest(stored[0], token)
+
+    async def sweep(self) -> int:
+        """Drop expired tokens; cost is proportional to the number expired"""
+        now = time.monotonic()
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, session_id = heapq.heappop(heap)
+            stored = self._tokens.get(session_id)
+            if stored is not None and stored[1] == expires_at:
+                del self._tokens[session_id]
+                removed += 1
+        return removed
+
+    def _pop_oldest(self):
+        while self._expiry_heap:
+            expires_at, session_id = heapq.heappop(self._expiry_heap)
+            stored = self._tokens.get(session_id)
+            if stored is not None and stored[1] == expires_at:
+                del self._tokens[session_id]
+                return
+
+    def _compact(self):
+        self._expiry_heap = [(expires_at, sid) for sid, (_, expires_at) in self._tokens.items()]
+        heapq.heapify(self._expiry_heap)
+
+
+class MongoCSRFTokenStore:
+    """Token store shared by all workers; only token hashes are stored"""
+
+    def __init__(self, collection, ttl_seconds: float = CSRF_TOKEN_EXPIRY_HOURS * 3600):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def issue(self, session_id: str) -> str:
+        token = secrets.token_urlsafe(32)
+        await self.collection.update_one(
+            {"_id": session_id},
+            {"$set": {
+                "token_hash": _hash_token(token),
+                "expires_at": datetime.utcfromtimestamp(time.time() + self.ttl_seconds)
+            }},
+            upsert=True
+        )
+        return token
+
+    async def validate(self, session_id: str, token: str) -> bool:
+        doc = await self.collection.find_one(
+            {"_id": session_id, "expires_at": {"$gt": datetime.utcnow()}},
+            {"token_hash": 1}
+        )
+        if not doc:
+            return False
+        return secrets.compare_digest(doc["token_hash"], _hash_token(token))
+
+    async def sweep(self) -> int:
+        # The TTL monitor removes expired tokens
+        return 0
+
+
+class SignedCSRFTokens:
+    """Stateless tokens: "<expiry>.<HMAC(session_id, expiry)>" """
+
+    def __init__(self, secret_key: Optional[str] = CSRF_SECRET_KEY, ttl_seconds: float = CSRF_TOKEN_EXPIRY_HOURS * 3600):
+        if not secret_key:
+            logger.warning("CSRF_SECRET_KEY not set; signed CSRF tokens are only valid on this worker")
+            secret_key = secrets.token_urlsafe(32)
+        self._key = secret_key.encode()
+        self.ttl_seconds = ttl_seconds
+
+    def _sign(self, session_id: str, expires_at: int) -> str:
+        message = f"{session_id}|{expires_at}".encode()
+        return hmac.new(self._key, message, hashlib.sha256).hexdigest()
+
+    async def issue(self, session_id: str) -> str:
+        expires_at = int(time.time() + self.ttl_seconds)
+        return f"{expires_at}.{self._sign(session_id, expires_at)}"
+
+    async def validate(self, session_id: str, token: str) -> bool:
+        expires_part, _, signature = token.partition(".")
+        if not expires_part.isdigit() or int(expires_part) <= time.time():
+            return False
+        return hmac.compare_digest(signature, self._sign(session_id, int(expires_part)))
 
+    async def sweep(self) -> int:
+        return 0
 
-def generate_csrf_token(session_id: str) -> str:
+
+# CSRF token store (replaced by init_csrf_store during startup)
+csrf_store = SignedCSRFTokens() if CSRF_TOKEN_MODE == "signed" else MemoryCSRFTokenStore()
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+async def init_csrf_store(db):
+    """Select the configured store (call from lifespan startup)"""
+    global csrf_store
+    if CSRF_TOKEN_MODE == "mongo":
+        csrf_store = MongoCSRFTokenStore(db.csrf_tokens)
+        await csrf_store.ensure_indexes()
+
+
+async def _sweep_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await csrf_store.sweep()
+            if removed:
+                logger.debug(f"Swept {removed} expired CSRF token(s)")
+        except Exception as e:
+            logger.error(f"CSRF token sweep failed: {e}")
+
+
+def start_csrf_sweeper(interval: float = CSRF_SWEEP_INTERVAL_SECONDS):
+    """Start the periodic expired-token sweeper (call from lifespan startup)"""
+    global _sweeper_task
+    if _sweeper_task is None:
+        _sweeper_task = asyncio.create_task(_sweep_forever(interval))
+
+
+async def stop_csrf_sweeper():
+    """Stop the sweeper (call from lifespan shutdown)"""
+    global _sweeper_task
+    if _sweeper_task is None:
+        return
+    _sweeper_task.cancel()
+    try:
+        await _sweeper_task
+    except asyncio.CancelledError:
+        pass
+    _sweeper_task = None
+
+
+async def generate_csrf_token(session_id: str) -> str:
     """Generate a new CSRF token for a session"""
-    token = secrets.token_urlsafe(32)
-    csrf_tokens[session_id] = {
-        'token': token,
-        'created_at': datetime.utcnow()
-    }
-    return token
-
-
-def validate_csrf_token(session_id: str, token: str) -> bool:
-    """Validate a CSRF token against the stored token"""
-    if session_id not in csrf_tokens:
-        return False
-    
-    stored = csrf_tokens[session_id]
-    
-    # Check expiry
-    if datetime.utcnow() - stored['created_at'] > timedelta(hours=CSRF_TOKEN_EXPIRY_HOURS):
-        del csrf_tokens[session_id]
-        return False
-    
-    # Constant-time comparison to prevent timing attacks
-    return secrets.compare_digest(stored['token'], token)
-
-
-def cleanup_expired_tokens():
-    """Remove expired CSRF tokens"""
-    now = datetime.utcnow()
-    expired = [
-        sid for sid, data in csrf_tokens.items()
-        if now - data['created_at'] > timedelta(hours=CSRF_TOKEN_EXPIRY_HOURS)
-    ]
-    for sid in expired:
-        del csrf_tokens[sid]
-
-
-async def csrf_protection_middleware(request: Request, call_next):
-    """Middleware to enforce CSRF protection on state-changing requests"""
-    # Skip CSRF check for safe methods
-    if request.method in ('GET', 'HEAD', 'OPTIONS'):
-        return await call_next(request)
-    
-    # Skip CSRF for certain paths (like initial login)
-    skip_paths = ['/api/auth/login', '/api/auth/refresh', '/api/auth/setup']
-    if any(request.url.path.startswith(path) for path in skip_paths):
-        return await call_next(request)
-    
-    # For API with JWT auth, the token itself provides CSRF protection
-    # (stateless, token required in header)
-    auth_header = request.headers.get('Authorization')
-    if auth_header and auth_header.startswith('Bearer '):
-        return await call_next(request)
-    
-    # For cookie-based auth, check CSRF token
-    csrf_token = request.headers.get('X-CSRF-Token')
-    session_id = request.cookies.get('session_id')
-    
-    if session_id and csrf_token:
-        if not validate_csrf_token(session_id, csrf_token):
-            logger.warning(f"Invalid CSRF token from IP: {request.client.host}")
-            return JSONResponse(
-                status_code=403,
-                content={"detail": "Invalid CSRF token"}
-            )
-    
-    return await call_next(request)
+    return await csrf_store.issue(session_id)
+
+
+async def validate_csrf_token(session_id: str, token: str) -> bool:
+    """Validate a CSRF token for a session"""
+    return await csrf_store.validate(session_id, token)
+
+
+# Paths that never require a CSRF token (like initial login)
+CSRF_SKIP_PATHS = ('/api/auth/login', '/api/auth/refresh', '/api/auth/setup')
+CSRF_SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class CSRFMiddleware:
+    """Pure ASGI middleware enforcing CSRF protection on state-changing requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requires_check(scope):
+            await self.app(scope, receive, send)
+            return
+
+        csrf_token = None
+        cookie_header = None
+        for name, value in scope["headers"]:
+            if name == b'x-csrf-token':
+                csrf_token = value.decode('latin-1')
+            elif name == b'cookie':
+                cookie_header = value.decode('latin-1')
+
+        session_id = cookie_parser(cookie_header).get('session_id') if cookie_header else None
+
+        if session_id and csrf_token and not await validate_csrf_token(session_id, csrf_token):
+            client = scope.get("client")
+            logger.warning(f"Invalid CSRF token from IP: {client[0] if client else 'unknown'}")
+            response = JSONResponse(status_code=403, content={"detail": "Invalid CSRF token"})
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _requires_check(scope) -> bool:
+        # Skip CSRF check for safe methods
+        if scope["method"] in CSRF_SAFE_METHODS:
+            return False
+
+        if scope["path"].startswith(CSRF_SKIP_PATHS):
+            return False
+
+        # For API with JWT auth, the token itself provides CSRF protection
+        # (stateless, token required in header)
+        for name, value in scope["headers"]:
+            if name == b'authorization':
+                return not value.startswith(b'Bearer ')
+        return True
@@ -0,0 +1,45 @@
+"""Request metrics middleware for TimeLov Admin API"""
+import time
+
+from services.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_RESPONSE_SIZE, HTTP_IN_FLIGHT
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording count, latency and response size per
+    route template (e.g. /api/cms/posts/public/{slug}), never per raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            route_template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, route_template, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route_template).observe(duration)
+            HTTP_RESPONSE_SIZE.labels(method, route_template).observe(response_size)
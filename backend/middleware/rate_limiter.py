@@ -1,20 +1,295 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+"""
+Rate limiting for TimeLov Admin API
+
+Sliding-window counters shared across workers through a Mongo collection
+(atomic $inc, TTL-expired), with a per-worker token bucket in front so
+clients well under their limit are admitted without a database round trip.
+"""
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from pymongo import ReturnDocument
+import asyncio
+import ipaddress
 import logging
+import os
+import re
+import time
 
 logger = logging.getLogger(__name__)
 
-# Create rate limiter instance
-limiter = Limiter(key_func=get_remote_address)
-
 # Rate limit configurations
 LOGIN_RATE_LIMIT = "5/15minutes"  # 5 attempts per 15 minutes for login
 API_RATE_LIMIT = "100/minute"      # 100 requests per minute for general API
 PASSWORD_RESET_RATE_LIMIT = "3/hour"  # 3 password reset requests per hour
 
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() != "false"
+# "mongo" shares counters across workers and restarts; "memory" is per process
+RATE_LIMIT_STORAGE = os.environ.get("RATE_LIMIT_STORAGE", "mongo")
+# Number of workers sharing the counters; sizes the local token grants
+RATE_LIMIT_WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+# Local tokens are only trusted for this long before syncing again
+LOCAL_SYNC_INTERVAL_SECONDS = 1.0
+MAX_LOCAL_BUCKETS = 10_000
+# Proxies (CDN / ingress addresses or CIDRs, comma-separated) whose
+# X-Forwarded-For is trusted to name the client
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(value.strip(), strict=False)
+    for value in os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "").split(",")
+    if value.strip()
+]
+# Anonymous landing-page reads served through the CDN and the single-flight
+# cache, plus the admin event stream (one long-lived request per client)
+RATE_LIMIT_EXEMPT_ROUTES = frozenset(("/api/cms/events/stream",))
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_LIMIT_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+
+class RateLimit(NamedTuple):
+    """Parsed rate limit: `amount` requests per `window` seconds"""
+    amount: int
+    window: int
+    spec: str
+
+
+def parse_rate_limit(spec: str) -> RateLimit:
+    """Parse limits like "100/minute" or "5/15minutes" """
+    match = _RATE_LIMIT_RE.match(spec)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {spec}")
+    amount, multiplier, period = match.groups()
+    return RateLimit(int(amount), int(multiplier or 1) * _PERIODS[period], spec)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a client exceeds a rate limit"""
+
+    def __init__(self, limit: RateLimit, retry_after: int):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.detail = f"{limit.spec} (retry after {retry_after}s)"
+        super().__init__(self.detail)
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def get_remote_address(request: Request) -> str:
+    """
+    Rate limit key: the client IP address. Behind a trusted proxy it is the
+    nearest X-Forwarded-For hop that is not itself a trusted proxy (earlier
+    hops are client-supplied and could be spoofed).
+    """
+    host = request.client.host if request.client else "127.0.0.1"
+    if not RATE_LIMIT_TRUSTED_PROXIES or not _is_trusted_proxy(host):
+        return host
+    forwarded = request.headers.get("x-forwarded-for", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return host
+
+
+def is_public_read(request: Request) -> bool:
+    """Whether the request is exempt from the general API limit"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    route = getattr(request.scope.get("route"), "path", "")
+    return "/public" in route or route in RATE_LIMIT_EXEMPT_ROUTES
+
+
+# ═══════════════════════════════════════
+# STORAGE BACKENDS
+# ═══════════════════════════════════════
+class MemoryRateLimitStorage:
+    """Per-process counters (single worker / development)"""
+
+    remote = False
+
+    def __init__(self):
+        self._counters: Dict[str, list] = {}
+
+    async def incr(self, key: str, amount: int, expire_at: float) -> int:
+        now = time.time()
+        if len(self._counters) > MAX_LOCAL_BUCKETS:
+            self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+        entry = self._counters.get(key)
+        if entry is None or entry[1] <= now:
+            entry = self._counters[key] = [0, expire_at]
+        entry[0] += amount
+        return entry[0]
+
+    async def get(self, key: str) -> int:
+        entry = self._counters.get(key)
+        return entry[0] if entry and entry[1] > time.time() else 0
+
+
+class MongoRateLimitStorage:
+    """Counters in a Mongo collection, shared by every worker"""
+
+    remote = True
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expire_at", expireAfterSeconds=0)
+
+    async def incr(self, key: str, amount: int, expire_at: float) -> int:
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            {
+                "$inc": {"count": amount},
+                "$setOnInsert": {"expire_at": datetime.utcfromtimestamp(expire_at)}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["count"]
+
+    async def get(self, key: str) -> int:
+        doc = await self.collection.find_one({"_id": key}, {"count": 1})
+        return doc["count"] if doc else 0
+
+
+# ═══════════════════════════════════════
+# LIMITER
+# ═══════════════════════════════════════
+class _LocalBucket:
+    __slots__ = ("window_id", "previous", "pending", "tokens", "synced_at")
+
+    def __init__(self, window_id: int, previous: int):
+        self.window_id = window_id
+        self.previous = previous
+        self.pending = 0
+        self.tokens = 0
+        self.synced_at = 0.0
+
+
+class RateLimiter:
+    """
+    Sliding-window-counter limiter. The estimate for the current window is
+    previous_count * (1 - elapsed_fraction) + current_count.
+
+    After each sync a worker is granted a share of the remaining headroom as
+    local tokens; while tokens last (and the sync is fresh) requests are
+    admitted locally and their hits are flushed with the next sync. Near the
+    limit no tokens are granted, so every request is checked exactly.
+    """
+
+    def __init__(self, key_func=get_remote_address, enabled: bool = True):
+        self.key_func = key_func
+        self.enabled = enabled
+        self.storage = MemoryRateLimitStorage()
+        self._buckets: Dict[str, _LocalBucket] = {}
+        # One rollover per bucket at a time, so pending hits are flushed once
+        self._roll_locks: Dict[str, asyncio.Lock] = {}
+
+    def init_storage(self, storage):
+        """Swap the counter storage (called from lifespan)"""
+        self.storage = storage
+        self._buckets.clear()
+        self._roll_locks.clear()
+
+    async def hit(self, scope: str, key: str, limit: RateLimit):
+        """Count one request; raises RateLimitExceeded when over the limit"""
+        now = time.time()
+        window_id = int(now // limit.window)
+        elapsed = now - window_id * limit.window
+        bucket_key = f"{scope}:{key}"
+
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None or bucket.window_id != window_id:
+            bucket = await self._roll_window(bucket_key, window_id, limit)
+
+        if (
+            self.storage.remote
+            and bucket.tokens > 0
+            and now - bucket.synced_at < LOCAL_SYNC_INTERVAL_SECONDS
+        ):
+            bucket.tokens -= 1
+            bucket.pending += 1
+            return
+
+        amount = bucket.pending + 1
+        bucket.pending = 0
+        current = await self.storage.incr(
+            f"{bucket_key}:{window_id}", amount, (window_id + 2) * limit.window
+        )
+        bucket.synced_at = now
+
+        estimated = bucket.previous * (1 - elapsed / limit.window) + current
+        if estimated > limit.amount:
+            bucket.tokens = 0
+            raise RateLimitExceeded(limit, max(1, int(limit.window - elapsed)))
+
+        bucket.tokens = int((limit.amount - estimated) / (2 * RATE_LIMIT_WORKERS))
+
+    async def _roll_window(self, bucket_key: str, window_id: int, limit: RateLimit) -> _LocalBucket:
+        lock = self._roll_locks.get(bucket_key)
+        if lock is None:
+            lock = self._roll_locks[bucket_key] = asyncio.Lock()
+        async with lock:
+            # Another request may have rolled the bucket while this one waited
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None and bucket.window_id >= window_id:
+                return bucket
+
+            # Flush hits admitted locally in the window that just ended
+            if bucket is not None and bucket.pending:
+                pending, bucket.pending = bucket.pending, 0
+                try:
+                    await self.storage.incr(
+                        f"{bucket_key}:{bucket.window_id}", pending, (bucket.window_id + 2) * limit.window
+                    )
+                except Exception:
+                    bucket.pending += pending
+                    raise
+            previous = await self.storage.get(f"{bucket_key}:{window_id - 1}")
+
+            if len(self._buckets) > MAX_LOCAL_BUCKETS:
+                self._buckets = {k: b for k, b in self._buckets.items() if b.window_id >= window_id - 1}
+                self._roll_locks = {
+                    k: roll_lock for k, roll_lock in self._roll_locks.items()
+                    if k in self._buckets or roll_lock.locked()
+                }
+
+            new_bucket = _LocalBucket(window_id, previous)
+            self._buckets[bucket_key] = new_bucket
+            return new_bucket
+
+    def limit(self, spec: str, scope: str, exempt: Optional[Callable[[Request], bool]] = None):
+        """
+        FastAPI dependency enforcing `spec` per client for a route or router;
+        requests for which `exempt` returns True are not counted
+        """
+        parsed = parse_rate_limit(spec)
+
+        async def rate_limit_dependency(request: Request):
+            if not self.enabled or (exempt is not None and exempt(request)):
+                return
+            await self.hit(scope, self.key_func(request), parsed)
+
+        return rate_limit_dependency
+
+
+# Create rate limiter instance
+limiter = RateLimiter(key_func=get_remote_address, enabled=RATE_LIMIT_ENABLED)
+
+
+def create_rate_limit_storage(db):
+    """Build the configured counter storage"""
+    if RATE_LIMIT_STORAGE == "memory":
+        return MemoryRateLimitStorage()
+    return MongoRateLimitStorage(db.rate_limits)
+
 
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
     """Custom handler for rate limit exceeded errors"""
@@ -26,10 +301,11 @@ async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded)
             "error": "Too many requests",
             "message": "Zbyt wiele prób. Spróbuj ponownie później.",
             "retry_after": exc.detail
-        }
+        },
+        headers={"Retry-After": str(exc.retry_after)}
     )
 
 
-def get_limiter() -> Limiter:
+def get_limiter() -> RateLimiter:
     """Get the rate limiter instance"""
     return limiter
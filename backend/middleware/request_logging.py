@@ -0,0 +1,93 @@
+"""Structured access logging middleware for TimeLov Admin API"""
+import json
+import logging
+import os
+import random
+import time
+import uuid
+
+from services.logging_config import ACCESS_LOGGER_NAME
+
+logger = logging.getLogger(ACCESS_LOGGER_NAME)
+
+# Fraction of successful, fast requests to high-volume public routes that are logged
+ACCESS_LOG_PUBLIC_SAMPLE_RATE = float(os.environ.get("ACCESS_LOG_PUBLIC_SAMPLE_RATE", "0.1"))
+# Fraction of all other successful, fast requests that are logged
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+# Requests at least this slow are always logged
+ACCESS_LOG_SLOW_MS = float(os.environ.get("ACCESS_LOG_SLOW_MS", "1000"))
+# Responses with at least this status are always logged
+ACCESS_LOG_ERROR_STATUS = 400
+
+HIGH_VOLUME_ROUTES = frozenset(("/api/", "/api/health", "/metrics"))
+
+
+def is_high_volume_route(route: str) -> bool:
+    """Anonymous landing-page routes plus health and scrape endpoints"""
+    return "/public" in route or route in HIGH_VOLUME_ROUTES
+
+
+class RequestLoggingMiddleware:
+    """
+    Pure ASGI access logger. Emits one JSON line per logged request with
+    method, route template, status, duration, response bytes and request ID.
+    The request ID is taken from X-Request-ID (or generated), echoed back in
+    the response and exposed to routes as request.state.request_id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if self._should_log(route, status_code, duration_ms):
+                logger.info(json.dumps({
+                    "ts": time.time(),
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "route": route,
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "bytes": response_bytes,
+                    "client": scope["client"][0] if scope.get("client") else None,
+                }, separators=(",", ":")))
+
+    @staticmethod
+    def _should_log(route: str, status_code: int, duration_ms: float) -> bool:
+        if status_code >= ACCESS_LOG_ERROR_STATUS or duration_ms >= ACCESS_LOG_SLOW_MS:
+            return True
+        rate = ACCESS_LOG_PUBLIC_SAMPLE_RATE if is_high_volume_route(route) else ACCESS_LOG_SAMPLE_RATE
+        return rate >= 1.0 or random.random() < rate
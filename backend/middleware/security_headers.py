@@ -1,43 +1,53 @@
 """Security Headers Middleware for TimeLov Admin API"""
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Header lists are encoded once; the middleware only appends them to the
+# raw ASGI header list on http.response.start
+SECURITY_HEADERS = [
+    (b'x-content-type-options', b'nosniff'),
+    (b'x-frame-options', b'DENY'),
+    (b'x-xss-protection', b'1; mode=block'),
+    (b'referrer-policy', b'strict-origin-when-cross-origin'),
+    (b'permissions-policy', b'geolocation=(), microphone=(), camera=()'),
+    # Content Security Policy (adjust for production)
+    # (b'content-security-policy', b"default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'"),
+]
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses"""
-    
-    async def dispatch(self, request: Request, call_next):
-        response: Response = await call_next(request)
-        
-        # Security headers
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        response.headers['X-Frame-Options'] = 'DENY'
-        response.headers['X-XSS-Protection'] = '1; mode=block'
-        response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
-        
-        # Content Security Policy (adjust for production)
-        # response.headers['Content-Security-Policy'] = "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'"
-        
-        # Cache control for sensitive endpoints
-        if '/auth/' in str(request.url.path):
-            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, private'
-            response.headers['Pragma'] = 'no-cache'
-        
-        return response
-
-
-async def add_security_headers(request: Request, call_next):
-    """Function-based middleware alternative"""
-    response = await call_next(request)
-    
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-    
-    return response
+# Cache control for sensitive endpoints
+NO_STORE_HEADERS = [
+    (b'cache-control', b'no-store, no-cache, must-revalidate, private'),
+    (b'pragma', b'no-cache'),
+]
+
+_SECURITY_HEADER_NAMES = frozenset(name for name, _ in SECURITY_HEADERS)
+_AUTH_HEADER_NAMES = _SECURITY_HEADER_NAMES | frozenset(name for name, _ in NO_STORE_HEADERS)
+_AUTH_HEADERS = SECURITY_HEADERS + NO_STORE_HEADERS
+
+
+class SecurityHeadersMiddleware:
+    """Add security headers to all responses (pure ASGI, no response wrapping)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if '/auth/' in scope["path"]:
+            names, extra = _AUTH_HEADER_NAMES, _AUTH_HEADERS
+        else:
+            names, extra = _SECURITY_HEADER_NAMES, SECURITY_HEADERS
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                # Our values win over anything the route already set
+                headers = [h for h in message.get("headers", []) if h[0].lower() not in names]
+                headers.extend(extra)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -57,6 +57,7 @@ class EntityType(str, Enum):
     PAGE = "page"
     POST = "post"
     WIDGET = "widget"
+    INTEGRATION = "integration"
     SETTING = "setting"
     USER = "user"
 
@@ -92,6 +93,8 @@ class AuditLogResponse(BaseModel):
     entity_id: Optional[str]
     old_values: Optional[Dict[str, Any]]
     new_values: Optional[Dict[str, Any]]
+    # Long text fields: [[old_start, old_segment, new_segment], ...] per field
+    text_diffs: Optional[Dict[str, Any]] = None
     ip_address: str
     user_agent: Optional[str]
     created_at: datetime
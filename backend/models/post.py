@@ -45,17 +45,23 @@ class Post(BaseModel):
         }
 
 
+# Polish characters and their ASCII equivalents (used for slugs and search)
+POLISH_CHAR_MAP = {
+    'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n',
+    'ó': 'o', 'ś': 's', 'ź': 'z', 'ż': 'z'
+}
+_POLISH_TRANSLATION = str.maketrans(POLISH_CHAR_MAP)
+
+
+def fold_polish(text: str) -> str:
+    """Lowercase and replace Polish characters (one output char per input char)"""
+    return text.lower().translate(_POLISH_TRANSLATION)
+
+
 def slugify(text: str) -> str:
     """Convert text to URL-friendly slug"""
-    # Convert to lowercase
-    text = text.lower()
-    # Replace Polish characters
-    polish_chars = {
-        'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n',
-        'ó': 'o', 'ś': 's', 'ź': 'z', 'ż': 'z'
-    }
-    for polish, ascii_char in polish_chars.items():
-        text = text.replace(polish, ascii_char)
+    # Convert to lowercase and replace Polish characters
+    text = fold_polish(text)
     # Replace spaces and special chars with hyphens
     text = re.sub(r'[^a-z0-9]+', '-', text)
     # Remove leading/trailing hyphens
@@ -20,6 +20,11 @@ class AdminUser(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    @classmethod
+    def from_db(cls, doc: dict) -> "AdminUser":
+        """Hydrate from a stored document without re-running validators"""
+        return cls.model_construct(**{k: v for k, v in doc.items() if k != "_id"})
+
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
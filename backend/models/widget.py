@@ -3,8 +3,10 @@ Widget and Third-Party Integration Models for TimeLov CMS
 Supports Elfsight, Frill, LiveAgent, Tacu.cool, Malcolm and more
 """
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple
+from collections import OrderedDict
 from datetime import datetime
+import hashlib
 import uuid
 from enum import Enum
 import re
@@ -99,6 +101,87 @@ TRUSTED_SOURCES = [
 ]
 
 
+DANGEROUS_PATTERNS = [
+    ('javascript:', 'JavaScript URLs are not allowed'),
+    ('data:', 'Data URLs are not allowed'),
+    ('vbscript:', 'VBScript URLs are not allowed'),
+]
+
+# One case-insensitive pass finds dangerous URL schemes and trusted sources
+# together, so the code is never lowercased or rescanned per pattern.
+# ASCII-only case folding: with Unicode folding "ſ" or "K" (Kelvin) would
+# match "s"/"k", which browsers do not do, and the match would not lowercase
+# back to a known pattern
+_WIDGET_CODE_SCANNER = re.compile(
+    '(?P<dangerous>' + '|'.join(re.escape(p) for p, _ in DANGEROUS_PATTERNS) + ')'
+    '|(?P<trusted>' + '|'.join(re.escape(s) for s in sorted(TRUSTED_SOURCES, key=len, reverse=True)) + ')',
+    re.IGNORECASE | re.ASCII
+)
+_DANGEROUS_MESSAGES = dict(DANGEROUS_PATTERNS)
+
+# Validation results keyed by code digest (stored code is validated once per process)
+WIDGET_CODE_CACHE_SIZE = 1024
+_widget_code_cache: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+widget_code_cache_stats = {"hits": 0, "misses": 0}
+
+
+class CodeViolation(NamedTuple):
+    """A dangerous pattern found in widget code"""
+    offset: int
+    pattern: str
+    message: str
+
+
+class WidgetCodeScan(NamedTuple):
+    """Result of scanning widget code"""
+    violations: List[CodeViolation]
+    has_trusted_source: bool
+
+    @property
+    def error(self) -> Optional[str]:
+        """Validation error message, or None if the code is allowed"""
+        if not self.violations or self.has_trusted_source:
+            return None
+        offsets: Dict[str, List[int]] = {}
+        for violation in self.violations:
+            offsets.setdefault(violation.pattern, []).append(violation.offset)
+        parts = []
+        for pattern, message in DANGEROUS_PATTERNS:
+            if pattern in offsets:
+                label = "offset" if len(offsets[pattern]) == 1 else "offsets"
+                parts.append(f"{message} ({label} {', '.join(map(str, offsets[pattern]))})")
+        return "; ".join(parts)
+
+
+def scan_widget_code(code: str) -> WidgetCodeScan:
+    """Scan widget code once, reporting every dangerous pattern with its offset"""
+    violations = []
+    has_trusted_source = False
+    for match in _WIDGET_CODE_SCANNER.finditer(code):
+        if match.lastgroup == 'trusted':
+            has_trusted_source = True
+        else:
+            pattern = match.group().lower()
+            violations.append(CodeViolation(match.start(), pattern, _DANGEROUS_MESSAGES[pattern]))
+    return WidgetCodeScan(violations, has_trusted_source)
+
+
+def _widget_code_error(code: str) -> Optional[str]:
+    """Get the (cached) validation error for widget code"""
+    key = hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    if key in _widget_code_cache:
+        widget_code_cache_stats["hits"] += 1
+        _widget_code_cache.move_to_end(key)
+        return _widget_code_cache[key]
+
+    widget_code_cache_stats["misses"] += 1
+    error = scan_widget_code(code).error
+    _widget_code_cache[key] = error
+    if len(_widget_code_cache) > WIDGET_CODE_CACHE_SIZE:
+        _widget_code_cache.popitem(last=False)
+    return error
+
+
 def validate_widget_code(code: str) -> str:
     """Validate and sanitize widget code"""
     if not code:
@@ -109,20 +192,9 @@ def validate_widget_code(code: str) -> str:
         raise ValueError('Widget code exceeds 100KB limit')
     
     # Check for dangerous patterns (but allow scripts from trusted sources)
-    code_lower = code.lower()
-    
-    dangerous_patterns = [
-        (r'javascript:', 'JavaScript URLs are not allowed'),
-        (r'data:', 'Data URLs are not allowed'),
-        (r'vbscript:', 'VBScript URLs are not allowed'),
-    ]
-    
-    for pattern, message in dangerous_patterns:
-        if re.search(pattern, code_lower):
-            # Check if it's from a trusted source
-            is_trusted = any(source in code_lower for source in TRUSTED_SOURCES)
-            if not is_trusted:
-                raise ValueError(message)
+    error = _widget_code_error(code)
+    if error:
+        raise ValueError(error)
     
     return code
 
@@ -170,6 +242,20 @@ class ThirdPartyIntegration(BaseModel):
     def validate_code(cls, v):
         return validate_widget_code(v)
     
+    @classmethod
+    def from_db(cls, doc: dict) -> "ThirdPartyIntegration":
+        """
+        Hydrate from a stored document without re-running validators.
+        Documents are validated on write; only enum fields are coerced back.
+        """
+        data = {k: v for k, v in doc.items() if k != "_id"}
+        data["integration_type"] = IntegrationType(data["integration_type"])
+        if data.get("section_name") is not None:
+            data["section_name"] = WidgetSection(data["section_name"])
+        if data.get("injection_position") is not None:
+            data["injection_position"] = InjectionPosition(data["injection_position"])
+        return cls.model_construct(**data)
+    
     def get_css_template(self) -> str:
         """Get automatic CSS template for this integration type"""
         from templates.css_templates import get_css_for_type
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, Query
-from datetime import datetime
-from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from datetime import datetime, timedelta
+from typing import Literal, Optional, List
 import logging
 import csv
 import io
@@ -8,11 +8,23 @@ from fastapi.responses import StreamingResponse
 
 from models.audit_log import AuditLogResponse, AuditAction, EntityType
 from middleware.auth_middleware import get_current_user
+from services.audit_analytics import audit_analytics, parquet_export
+from services.audit_codec import ReconstructionError, decode_entries, reconstruct_values
+from services.audit_rollups import aggregate_series, aggregate_totals, get_rollup_totals, get_rollup_series
+from services.audit_storage import entry_cursor, find_entries, iter_entries, parse_entry_cursor
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/cms/audit-logs", tags=["Audit Logs"])
 
+# Hourly buckets are kept for AUDIT_ROLLUP_HOURLY_RETENTION_DAYS (default 90)
+MAX_TIMESERIES_SPAN = {"hour": timedelta(days=31), "day": timedelta(days=3660)}
+MAX_ANALYTICS_SPAN = timedelta(days=366)
+EXPORT_MAX_ROWS = 10000
+EXPORT_CHUNK_ROWS = 500
+# Deeper pages use the `before` cursor (X-Next-Cursor) instead of an offset
+MAX_LIST_SKIP = 1000
+
 db = None
 
 def set_db(database):
@@ -22,16 +34,23 @@ def set_db(database):
 
 @router.get("", response_model=List[AuditLogResponse])
 async def list_audit_logs(
+    response: Response,
     action: Optional[AuditAction] = None,
     entity_type: Optional[EntityType] = None,
     admin_id: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = Query(100, le=500),
-    skip: int = 0,
+    skip: int = Query(0, ge=0, le=MAX_LIST_SKIP),
+    before: Optional[str] = Query(None, max_length=100, description="Cursor (X-Next-Cursor of the previous page)"),
     current_user: dict = Depends(get_current_user)
 ):
-    """List audit logs with filtering"""
+    """List audit logs with filtering; a full page sets X-Next-Cursor for the next one"""
+    try:
+        after = parse_entry_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Nieprawidłowy kursor")
+    
     query = {}
     
     if action:
@@ -40,39 +59,40 @@ async def list_audit_logs(
         query["entity_type"] = entity_type.value
     if admin_id:
         query["admin_id"] = admin_id
-    if start_date:
-        query["created_at"] = {"$gte": start_date}
-    if end_date:
-        if "created_at" in query:
-            query["created_at"]["$lte"] = end_date
-        else:
-            query["created_at"] = {"$lte": end_date}
     
-    logs = await db.audit_logs.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    # Only the monthly partitions overlapping the date range are queried
+    logs = await find_entries(db, query, start_date, end_date, skip=skip, limit=limit, before=after)
+    if logs and len(logs) == limit:
+        response.headers["X-Next-Cursor"] = entry_cursor(logs[-1])
     
-    return [AuditLogResponse(**log) for log in logs]
+    return [AuditLogResponse(**log) for log in await decode_entries(db, logs)]
 
 
 @router.get("/export")
 async def export_audit_logs(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    export_format: Literal["csv", "parquet"] = Query("csv", alias="format"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Export audit logs as CSV"""
-    query = {}
+    """Export audit logs as CSV (first EXPORT_MAX_ROWS) or Parquet (whole range); archived months included"""
+    filename = f"audit_logs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
     
-    if start_date:
-        query["created_at"] = {"$gte": start_date}
-    if end_date:
-        if "created_at" in query:
-            query["created_at"]["$lte"] = end_date
-        else:
-            query["created_at"] = {"$lte": end_date}
+    if export_format == "parquet":
+        return StreamingResponse(
+            parquet_export(db, start_date, end_date),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
     
-    logs = await db.audit_logs.find(query).sort("created_at", -1).to_list(10000)
-    
-    # Create CSV
+    return StreamingResponse(
+        _csv_rows(start_date, end_date),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+async def _csv_rows(start_date: Optional[datetime], end_date: Optional[datetime]):
     output = io.StringIO()
     writer = csv.writer(output)
     
@@ -82,7 +102,28 @@ async def export_audit_logs(
         "IP Address", "User Agent", "Created At"
     ])
     
-    # Data
+    # Data, streamed from the partitions and then the archive files in
+    # chunks (user agents are resolved once per chunk)
+    exported = 0
+    batch = []
+    async for log in iter_entries(db, {}, start_date, end_date, include_archives=True):
+        batch.append(log)
+        exported += 1
+        if len(batch) >= EXPORT_CHUNK_ROWS or exported >= EXPORT_MAX_ROWS:
+            _write_csv_rows(writer, await decode_entries(db, batch))
+            batch = []
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        if exported >= EXPORT_MAX_ROWS:
+            break
+    
+    if batch:
+        _write_csv_rows(writer, await decode_entries(db, batch))
+    yield output.getvalue()
+
+
+def _write_csv_rows(writer, logs: List[dict]):
     for log in logs:
         writer.writerow([
             log.get("id", ""),
@@ -94,39 +135,88 @@ async def export_audit_logs(
             log.get("user_agent", "")[:100] if log.get("user_agent") else "",
             log.get("created_at", "").isoformat() if log.get("created_at") else ""
         ])
-    
-    output.seek(0)
-    
-    filename = f"audit_logs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
 
 
 @router.get("/stats")
 async def get_audit_stats(current_user: dict = Depends(get_current_user)):
-    """Get audit log statistics"""
-    total = await db.audit_logs.count_documents({})
+    """Get audit log statistics (from the materialized rollups)"""
+    totals = await get_rollup_totals(db)
+    if totals is not None:
+        return totals
     
-    # Count by action type
-    pipeline = [
-        {"$group": {"_id": "$action", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    by_action = await db.audit_logs.aggregate(pipeline).to_list(100)
+    # Rollups miss the history written before they existed until the backfill
+    # has run (python -m services.audit_rollups --backfill); count the audit
+    # collections (partitions and legacy) directly meanwhile
+    logger.warning("Audit rollups not backfilled, aggregating audit collections")
+    return await aggregate_totals(db)
+
+
+@router.get("/stats/timeseries")
+async def get_audit_timeseries(
+    granularity: Literal["hour", "day"] = "day",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    dimension: Optional[Literal["action", "entity_type", "admin"]] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Audit entry counts per hour or day bucket, optionally split by one dimension"""
+    end_date = end_date or datetime.utcnow()
+    default_span = timedelta(days=2) if granularity == "hour" else timedelta(days=30)
+    start_date = start_date or end_date - default_span
+    if end_date - start_date > MAX_TIMESERIES_SPAN[granularity]:
+        raise HTTPException(status_code=400, detail="Zbyt szeroki zakres dat dla wybranej granulacji")
     
-    # Count by entity type
-    pipeline = [
-        {"$group": {"_id": "$entity_type", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    by_entity = await db.audit_logs.aggregate(pipeline).to_list(100)
+    series = await get_rollup_series(db, granularity, start_date, end_date, dimension)
+    if series is None:
+        # Not backfilled yet (see get_audit_stats): aggregate the range directly
+        logger.warning("Audit rollups not backfilled, aggregating audit collections")
+        series = await aggregate_series(db, granularity, start_date, end_date, dimension)
+    return {
+        "granularity": granularity,
+        "start_date": start_date,
+        "end_date": end_date,
+        "series": series
+    }
+
+
+@router.get("/analytics")
+async def get_audit_analytics(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Per-admin, per-action and per-hour activity aggregates over a date range"""
+    end_date = end_date or datetime.utcnow()
+    start_date = start_date or end_date - timedelta(days=7)
+    if end_date - start_date > MAX_ANALYTICS_SPAN:
+        raise HTTPException(status_code=400, detail="Zbyt szeroki zakres dat dla analizy")
+    
+    return await audit_analytics(db, start_date, end_date)
+
+
+@router.get("/{log_id}/values")
+async def get_audit_log_values(log_id: str, current_user: dict = Depends(get_current_user)):
+    """Full old/new values of an audit entry (text diffs rendered against the entity's history)"""
+    entries = await find_entries(db, {"id": log_id}, limit=1)
+    if not entries:
+        raise HTTPException(status_code=404, detail="Wpis audytu nie znaleziony")
+    entry = entries[0]
+    
+    later_entries = iter_entries(
+        db,
+        {"entity_type": entry.get("entity_type"), "entity_id": entry.get("entity_id")},
+        start=entry.get("created_at")
+    )
+    try:
+        values = await reconstruct_values(db, entry, later_entries)
+    except ReconstructionError as e:
+        raise HTTPException(status_code=409, detail=f"Nie można odtworzyć wartości: {e}")
     
     return {
-        "total": total,
-        "by_action": {item["_id"]: item["count"] for item in by_action if item["_id"]},
-        "by_entity": {item["_id"]: item["count"] for item in by_entity if item["_id"]}
+        "id": entry["id"],
+        "action": entry.get("action"),
+        "entity_type": entry.get("entity_type"),
+        "entity_id": entry.get("entity_id"),
+        "created_at": entry.get("created_at"),
+        **values
     }
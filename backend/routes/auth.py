@@ -10,6 +10,7 @@ from models.user import (
 )
 from models.audit_log import AuditLog, AuditAction, EntityType
 from services.auth_service import AuthService, EmailService
+from services.audit_writer import audit_writer
 from middleware.auth_middleware import get_current_user, add_to_blacklist
 from middleware.rate_limiter import limiter, LOGIN_RATE_LIMIT, PASSWORD_RESET_RATE_LIMIT
 
@@ -51,13 +52,16 @@ async def log_audit(
             user_agent=request.headers.get("user-agent"),
             additional_info=additional_info
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_writer.write(audit_log.dict())
     except Exception as e:
         logger.error(f"Failed to create audit log: {e}")
 
 
-@router.post("/login", response_model=TokenResponse)
-@limiter.limit(LOGIN_RATE_LIMIT)
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(limiter.limit(LOGIN_RATE_LIMIT, scope="admin_login"))]
+)
 async def login(request: Request, login_data: AdminUserLogin):
     """Authenticate admin user and return JWT tokens"""
     # Find user by email
@@ -77,7 +81,7 @@ async def login(request: Request, login_data: AdminUserLogin):
         )
         raise HTTPException(status_code=401, detail=generic_error)
     
-    user = AdminUser(**user_doc)
+    user = AdminUser.from_db(user_doc)
     
     # Check if account is locked
     if AuthService.is_account_locked(user.locked_until):
@@ -107,7 +111,7 @@ async def login(request: Request, login_data: AdminUserLogin):
         raise HTTPException(status_code=401, detail=generic_error)
     
     # Verify password
-    if not AuthService.verify_password(login_data.password, user.password_hash):
+    if not await AuthService.verify_password_async(login_data.password, user.password_hash):
         # Increment failed attempts
         new_attempts = user.failed_login_attempts + 1
         update_data = {
@@ -234,8 +238,10 @@ async def logout(request: Request, current_user: dict = Depends(get_current_user
     return {"success": True, "message": "Wylogowano pomyślnie"}
 
 
-@router.post("/forgot-password")
-@limiter.limit(PASSWORD_RESET_RATE_LIMIT)
+@router.post(
+    "/forgot-password",
+    dependencies=[Depends(limiter.limit(PASSWORD_RESET_RATE_LIMIT, scope="forgot_password"))]
+)
 async def forgot_password(request: Request, reset_data: PasswordResetRequest):
     """Request password reset - sends email with reset link"""
     # Always return success to prevent email enumeration
@@ -258,7 +264,7 @@ async def forgot_password(request: Request, reset_data: PasswordResetRequest):
         )
         return success_response
     
-    user = AdminUser(**user_doc)
+    user = AdminUser.from_db(user_doc)
     
     # Generate reset token
     reset_token, expires = AuthService.generate_password_reset_token()
@@ -290,7 +296,10 @@ async def forgot_password(request: Request, reset_data: PasswordResetRequest):
     return success_response
 
 
-@router.post("/reset-password")
+@router.post(
+    "/reset-password",
+    dependencies=[Depends(limiter.limit(PASSWORD_RESET_RATE_LIMIT, scope="reset_password"))]
+)
 async def reset_password(request: Request, reset_data: PasswordResetConfirm):
     """Reset password using token from email"""
     # Find user with valid reset token
@@ -305,7 +314,7 @@ async def reset_password(request: Request, reset_data: PasswordResetConfirm):
             detail="Nieprawidłowy lub wygasły token resetowania hasła"
         )
     
-    user = AdminUser(**user_doc)
+    user = AdminUser.from_db(user_doc)
     
     # Validate new password (minimum 8 chars)
     if len(reset_data.new_password) < 8:
@@ -315,7 +324,7 @@ async def reset_password(request: Request, reset_data: PasswordResetConfirm):
         )
     
     # Hash new password
-    new_hash = AuthService.hash_password(reset_data.new_password)
+    new_hash = await AuthService.hash_password_async(reset_data.new_password)
     
     # Update user
     await db.admin_users.update_one(
@@ -373,7 +382,7 @@ async def setup_admin(request: Request):
     admin_user = AdminUser(
         email=admin_email,
         username="admin",
-        password_hash=AuthService.hash_password(admin_password),
+        password_hash=await AuthService.hash_password_async(admin_password),
         is_active=True,
         is_superadmin=True
     )
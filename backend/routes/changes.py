@@ -0,0 +1,42 @@
+"""
+Change feed API - incremental sync for edge caches and admin clients
+
+    GET /api/cms/changes                 -> no changes, cursor for "now"
+    GET /api/cms/changes?since=<cursor>  -> changes after the cursor
+
+Each change is {type, id, operation, version, timestamp}; keep `next` and
+pass it as `since` on the following call. A 410 means the cursor expired
+and the consumer must re-fetch and start over.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+
+from middleware.auth_middleware import get_current_user
+from services.change_feed import change_feed, ChangeFeedExpired
+
+router = APIRouter(prefix="/cms/changes", tags=["Changes"])
+
+
+def set_db(database):
+    """Set the database reference"""
+    change_feed.set_db(database)
+
+
+@router.get("")
+async def list_changes(
+    since: Optional[str] = Query(None, max_length=1024),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    """Entity changes after the `since` cursor"""
+    try:
+        changes, next_cursor, has_more = await change_feed.read(since, limit)
+    except ChangeFeedExpired as e:
+        raise HTTPException(status_code=410, detail=f"Kursor wygasł, wymagana pełna synchronizacja ({e})")
+
+    return {
+        "changes": changes,
+        "next": next_cursor,
+        "has_more": has_more,
+        "mode": change_feed.mode
+    }
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends
 from middleware.auth_middleware import get_current_user
+from services.audit_rollups import get_rollup_totals
+from services.audit_storage import all_collections, find_entries
 
 router = APIRouter(prefix="/cms/dashboard", tags=["Dashboard"])
 
@@ -25,11 +27,18 @@ async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
     widgets_count = await db.widgets.count_documents({"deleted_at": None})
     active_widgets = await db.widgets.count_documents({"deleted_at": None, "is_active": True})
     
-    # Count audit logs
-    audit_count = await db.audit_logs.count_documents({})
+    # Count audit logs (all-time rollup; archived months included)
+    totals = await get_rollup_totals(db)
+    if totals is not None:
+        audit_count = totals["total"]
+    else:
+        # Rollups not backfilled yet: partitions plus the legacy collection
+        audit_count = sum([
+            await db[name].estimated_document_count() for name in await all_collections(db)
+        ])
     
     # Recent activity (last 10 logs)
-    recent_logs = await db.audit_logs.find({}).sort("created_at", -1).limit(10).to_list(10)
+    recent_logs = await find_entries(db, {}, limit=10)
     
     return {
         "pages": {
@@ -0,0 +1,71 @@
+"""
+Live admin updates over Server-Sent Events
+
+    GET /api/cms/events/stream
+
+Streams "audit" events (new audit log entries) and "change" events
+(content entity changes) from services.event_bus, a comment line as a
+heartbeat, and a "resync" event when the connection fell behind and
+events were dropped. The stream needs the Bearer token like every admin
+route, so clients read it with fetch() rather than EventSource.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+import json
+import logging
+
+from middleware.auth_middleware import get_current_user
+from services.event_bus import event_bus, StreamLimitReached, SSE_HEARTBEAT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/cms/events", tags=["Events"])
+
+# Client reconnect delay sent with the first message
+SSE_RETRY_MS = 5000
+
+
+def format_sse(event: dict) -> bytes:
+    """Encode an event in the text/event-stream format"""
+    lines = [f"event: {event['event']}"]
+    if event.get("id"):
+        lines.append(f"id: {event['id']}")
+    lines.append(f"data: {json.dumps(event['data'], default=str, ensure_ascii=False)}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+@router.get("/stream")
+async def stream_events(current_user: dict = Depends(get_current_user)):
+    """Stream audit entries and entity changes to the admin UI"""
+    try:
+        subscription = event_bus.subscribe()
+    except StreamLimitReached:
+        raise HTTPException(
+            status_code=503,
+            detail="Zbyt wiele aktywnych połączeń, spróbuj ponownie później",
+            headers={"Retry-After": "30"}
+        )
+
+    async def events():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+            while not subscription.closed:
+                # A client disconnect cancels this generator (StreamingResponse)
+                event = await subscription.next(SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield b": heartbeat\n\n"
+                elif event["event"] != "close":
+                    yield format_sse(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must not buffer the stream
+        headers={"X-Accel-Buffering": "no"},
+        # The generator's finally never runs if the client disconnects
+        # before the first chunk; the background task frees the slot then
+        background=BackgroundTask(event_bus.unsubscribe, subscription)
+    )
@@ -0,0 +1,63 @@
+"""
+Per-entity audit history
+
+    GET /api/cms/{posts,pages,widgets,integrations}/{id}/history
+        -> {entries, next, has_more}; pass `next` as `before` for older entries
+    GET /api/cms/{...}/{id}/history?at=<datetime>
+        -> {id, at, state}: the entity as it was at that time
+
+Included after the content routers, so their own routes take precedence.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import Optional
+
+from models.audit_log import AuditLogResponse
+from middleware.auth_middleware import get_current_user
+from services.audit_codec import ReconstructionError
+from services.entity_history import HISTORY_ENTITY_TYPES, MAX_HISTORY_LIMIT, entity_history, entity_state_at
+
+router = APIRouter(prefix="/cms", tags=["History"])
+
+db = None
+
+
+def set_db(database):
+    global db
+    db = database
+
+
+def _history_endpoint(collection: str):
+    async def get_entity_history(
+        entity_id: str,
+        before: Optional[str] = Query(None, max_length=100, description="Cursor (`next` of the previous page)"),
+        limit: int = Query(50, ge=1, le=MAX_HISTORY_LIMIT),
+        at: Optional[datetime] = Query(None, description="Reconstruct the entity state at this time"),
+        current_user: dict = Depends(get_current_user)
+    ):
+        """Audit trail of one entity (keyset-paginated), or its state at a past time"""
+        if at is not None:
+            try:
+                state = await entity_state_at(db, collection, entity_id, at)
+            except ReconstructionError as e:
+                raise HTTPException(status_code=409, detail=f"Nie można odtworzyć stanu: {e}")
+            if state is None:
+                raise HTTPException(status_code=404, detail="Obiekt nie istniał w podanym czasie")
+            return {"id": entity_id, "at": at, "state": state}
+
+        try:
+            entries, next_cursor = await entity_history(db, collection, entity_id, before, limit)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Nieprawidłowy kursor")
+        return {
+            "entries": [AuditLogResponse(**entry) for entry in entries],
+            "next": next_cursor,
+            "has_more": next_cursor is not None
+        }
+
+    get_entity_history.__name__ = f"get_{collection}_history"
+    return get_entity_history
+
+
+for _collection in HISTORY_ENTITY_TYPES:
+    router.add_api_route(f"/{_collection}/{{entity_id}}/history", _history_endpoint(_collection), methods=["GET"])
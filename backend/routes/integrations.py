@@ -13,13 +13,31 @@ from models.widget import (
     IntegrationType, WidgetSection, InjectionPosition, get_integration_type_info
 )
 from models.audit_log import AuditLog, AuditAction, EntityType
+from services.audit_writer import audit_writer
 from middleware.auth_middleware import get_current_user
-from templates.css_templates import get_css_for_type, get_all_css_types, generate_css_variables
+from templates.css_templates import get_css_for_type, get_all_css_types
+from services.branding_service import get_branding_css_variables
+from services.public_content import render_integration_group
+from services.single_flight import public_reads, invalidate_on_write
+from services.cdn_purge import purge_on_write
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/cms/integrations", tags=["Integrations"])
+# A write may change an integration's position or section, so every
+# integration write purges all integration responses. Cached renders are
+# invalidated on every worker before the purge is scheduled (dependency
+# teardown runs in reverse order)
+router = APIRouter(
+    prefix="/cms/integrations",
+    tags=["Integrations"],
+    dependencies=[
+        Depends(purge_on_write(lambda request: ["integrations"])),
+        Depends(invalidate_on_write("render_integrations_html"))
+    ]
+)
 
+# Database reference. Public reads here are CDN-purged and single-flight
+# invalidated on write, so they use the primary like everything else
 db = None
 
 def set_db(database):
@@ -42,14 +60,14 @@ async def log_audit(
             admin_id=admin_id,
             admin_email=admin_email,
             action=action,
-            entity_type=EntityType.WIDGET,
+            entity_type=EntityType.INTEGRATION,
             entity_id=entity_id,
             old_values=old_values,
             new_values=new_values,
             ip_address=request.client.host if request.client else "unknown",
             user_agent=request.headers.get("user-agent")
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_writer.write(audit_log.dict())
     except Exception as e:
         logger.error(f"Failed to create audit log: {e}")
 
@@ -74,9 +92,10 @@ async def get_css_templates():
     templates = {}
     for css_type in get_all_css_types():
         templates[css_type] = get_css_for_type(css_type)
+    css_variables, _ = await get_branding_css_variables(db)
     return {
         "templates": templates,
-        "css_variables": generate_css_variables()
+        "css_variables": css_variables
     }
 
 
@@ -167,7 +186,7 @@ async def list_integrations(
         integ.pop("_id", None)
         # Add computed fields
         try:
-            obj = ThirdPartyIntegration(**integ)
+            obj = ThirdPartyIntegration.from_db(integ)
             integ["css_template"] = obj.get_css_template()
         except:
             integ["css_template"] = ""
@@ -178,17 +197,17 @@ async def list_integrations(
 
 @router.get("/public")
 async def list_public_integrations(
-    section: Optional[str] = None,
-    position: Optional[str] = None
+    section: Optional[WidgetSection] = None,
+    position: Optional[InjectionPosition] = None
 ):
     """List active integrations for public rendering (no auth required)"""
     query = {"is_active": True}
     
     if section:
-        query["section_name"] = section
+        query["section_name"] = section.value
     
     if position:
-        query["injection_position"] = position
+        query["injection_position"] = position.value
     
     cursor = db.integrations.find(query).sort("priority_order", 1)
     integrations = await cursor.to_list(length=100)
@@ -197,7 +216,7 @@ async def list_public_integrations(
     for integ in integrations:
         integ.pop("_id", None)
         try:
-            obj = ThirdPartyIntegration(**integ)
+            obj = ThirdPartyIntegration.from_db(integ)
             result.append({
                 "id": obj.id,
                 "type": obj.integration_type.value,
@@ -216,35 +235,31 @@ async def list_public_integrations(
 
 
 @router.get("/render")
-async def render_integrations_html(position: Optional[str] = None):
+async def render_integrations_html(position: Optional[InjectionPosition] = None):
     """Get rendered HTML for all active integrations at given position"""
-    query = {"is_active": True}
-    
-    if position:
-        query["injection_position"] = position
+    position = position.value if position else None
     
-    cursor = db.integrations.find(query).sort("priority_order", 1)
-    integrations = await cursor.to_list(length=100)
-    
-    html_parts = []
-    css_parts = [generate_css_variables()]
-    
-    for integ in integrations:
-        try:
-            obj = ThirdPartyIntegration(**{k: v for k, v in integ.items() if k != "_id"})
-            css_parts.append(obj.get_final_css())
-            html_parts.append(obj.get_rendered_html())
-        except Exception as e:
-            logger.error(f"Error rendering integration: {e}")
-    
-    combined_css = "\n".join(css_parts)
-    combined_html = "\n".join(html_parts)
+    async def load():
+        query = {"is_active": True}
+        
+        if position:
+            query["injection_position"] = position
+        
+        cursor = db.integrations.find(query).sort("priority_order", 1)
+        integrations = await cursor.to_list(length=100)
+        
+        css_variables, _ = await get_branding_css_variables(db)
+        
+        integration_css, html_parts = render_integration_group(integrations)
+        css_parts = [css_variables, *integration_css]
+        
+        return {
+            "css": "\n".join(css_parts),
+            "html": "\n".join(html_parts),
+            "count": len(html_parts)
+        }
     
-    return {
-        "css": combined_css,
-        "html": combined_html,
-        "count": len(html_parts)
-    }
+    return await public_reads.get("render_integrations_html", position, load)
 
 
 @router.get("/{integration_id}")
@@ -261,7 +276,7 @@ async def get_integration(
     integ.pop("_id", None)
     
     try:
-        obj = ThirdPartyIntegration(**integ)
+        obj = ThirdPartyIntegration.from_db(integ)
         return {
             **integ,
             "css_template": obj.get_css_template(),
@@ -311,7 +326,7 @@ async def update_integration(
     updated.pop("_id", None)
     
     try:
-        obj = ThirdPartyIntegration(**updated)
+        obj = ThirdPartyIntegration.from_db(updated)
         return {
             "success": True,
             "message": "Integracja zaktualizowana",
@@ -407,7 +422,7 @@ async def preview_integration(
     integ.pop("_id", None)
     
     try:
-        obj = ThirdPartyIntegration(**integ)
+        obj = ThirdPartyIntegration.from_db(integ)
         
         html = f"""
 <!DOCTYPE html>
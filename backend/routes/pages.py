@@ -7,18 +7,41 @@ from models.page import (
     Page, PageCreate, PageUpdate, PageResponse, PageStatus
 )
 from models.audit_log import AuditLog, AuditAction, EntityType
+from services.audit_writer import audit_writer
+from services.cdn_purge import purge_on_write
+from services.search_service import (
+    SEARCH_FIELD, PAGE_SEARCH_SOURCES, search_fields, search_sources_changed,
+    text_search, highlight
+)
 from middleware.auth_middleware import get_current_user
+from middleware.cache_policy import add_surrogate_keys
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/cms/pages", tags=["Pages"])
+# Writes purge the CDN keys named by _purge_keys (below)
+router = APIRouter(prefix="/cms/pages", tags=["Pages"], dependencies=[
+    Depends(purge_on_write(lambda request: _purge_keys(request)))
+])
 
-# Database reference
+# Database references. read_db may be routed to secondaries (see
+# services/mongo_client.py) and only serves public search, which is neither
+# CDN-purged nor single-flight cached; every purged or invalidated public
+# read uses the primary, so a refetch after a write never sees older data
 db = None
+read_db = None
 
-def set_db(database):
-    global db
+def set_db(database, read_database=None):
+    global db, read_db
     db = database
+    read_db = read_database if read_database is not None else database
+
+
+def _purge_keys(request: Request) -> List[str]:
+    """CDN surrogate keys affected by a page write"""
+    page_id = request.path_params.get("page_id")
+    if page_id:
+        return [f"page:{page_id}", "pages:list"]
+    return ["pages:list"]
 
 
 async def log_audit(
@@ -42,7 +65,7 @@ async def log_audit(
             ip_address=request.client.host if request.client else "unknown",
             user_agent=request.headers.get("user-agent")
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_writer.write(audit_log.dict())
     except Exception as e:
         logger.error(f"Failed to create audit log: {e}")
 
@@ -61,6 +84,46 @@ async def list_pages(
     return [PageResponse(**p) for p in pages]
 
 
+@router.get("/search")
+async def search_pages(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[PageStatus] = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """Full-text search over pages, ranked by relevance"""
+    filters = {"deleted_at": None}
+    if status:
+        filters["status"] = status.value
+    
+    pages, total, terms = await text_search(
+        db.pages, q, filters,
+        {"id": 1, "slug": 1, "title": 1, "meta_description": 1, "content": 1,
+         "status": 1, "created_at": 1, "published_at": 1},
+        page, limit
+    )
+    
+    return {
+        "query": q,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "results": [{
+            "id": p["id"],
+            "slug": p["slug"],
+            "title": p["title"],
+            "title_highlighted": highlight(p["title"], terms),
+            "meta_description": p.get("meta_description"),
+            "snippet": highlight(p.get("content") or p.get("meta_description"), terms),
+            "status": p["status"],
+            "created_at": p["created_at"],
+            "published_at": p.get("published_at"),
+            "score": round(p["score"], 3)
+        } for p in pages]
+    }
+
+
 @router.get("/{page_id}", response_model=PageResponse)
 async def get_page(
     page_id: str,
@@ -97,7 +160,9 @@ async def create_page(
     if page_data.status == PageStatus.PUBLISHED:
         page.published_at = datetime.utcnow()
     
-    await db.pages.insert_one(page.dict())
+    page_doc = page.dict()
+    page_doc[SEARCH_FIELD] = search_fields(page_doc, PAGE_SEARCH_SOURCES)
+    await db.pages.insert_one(page_doc)
     
     await log_audit(
         action=AuditAction.PAGE_CREATE,
@@ -145,6 +210,9 @@ async def update_page(
                 update_data[field] = value
                 new_values[field] = value
     
+    if search_sources_changed(update_data, PAGE_SEARCH_SOURCES):
+        update_data[SEARCH_FIELD] = search_fields({**page, **update_data}, PAGE_SEARCH_SOURCES)
+    
     await db.pages.update_one({"id": page_id}, {"$set": update_data})
     
     await log_audit(
@@ -250,9 +318,38 @@ async def unpublish_page(
     return {"success": True, "message": "Strona cofnięta do wersji roboczej"}
 
 
-# Public endpoint for frontend
+# Public endpoints for frontend
+@router.get("/public/search")
+async def search_public_pages(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Full-text search over published pages (public endpoint)"""
+    pages, total, terms = await text_search(
+        read_db.pages, q,
+        {"status": PageStatus.PUBLISHED.value, "deleted_at": None},
+        {"slug": 1, "title": 1, "meta_description": 1, "content": 1},
+        page, limit
+    )
+    
+    return {
+        "query": q,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "results": [{
+            "slug": p["slug"],
+            "title": p["title"],
+            "title_highlighted": highlight(p["title"], terms),
+            "meta_description": p.get("meta_description"),
+            "snippet": highlight(p.get("content") or p.get("meta_description"), terms)
+        } for p in pages]
+    }
+
+
 @router.get("/public/{slug:path}")
-async def get_public_page(slug: str):
+async def get_public_page(slug: str, request: Request):
     """Get published page by slug (public endpoint)"""
     if not slug.startswith('/'):
         slug = '/' + slug
@@ -266,6 +363,7 @@ async def get_public_page(slug: str):
     if not page:
         raise HTTPException(status_code=404, detail="Strona nie znaleziona")
     
+    add_surrogate_keys(request, f"page:{page['id']}")
     return {
         "slug": page["slug"],
         "title": page["title"],
@@ -8,17 +8,48 @@ from models.post import (
     PostStatus, PostCategory, slugify
 )
 from models.audit_log import AuditLog, AuditAction, EntityType
+from services.audit_writer import audit_writer
+from services.search_service import (
+    SEARCH_FIELD, POST_SEARCH_SOURCES, search_fields, search_sources_changed,
+    text_search, highlight
+)
+from services.post_search_index import post_search_index
+from services.single_flight import public_reads, invalidate_on_write
+from services.cdn_purge import purge_on_write
 from middleware.auth_middleware import get_current_user
+from middleware.cache_policy import add_surrogate_keys
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/cms/posts", tags=["Posts"])
+# Writes purge the CDN keys named by _purge_keys (below); cached public reads
+# are invalidated on every worker before the purge is scheduled (dependency
+# teardown runs in reverse order)
+router = APIRouter(prefix="/cms/posts", tags=["Posts"], dependencies=[
+    Depends(purge_on_write(lambda request: _purge_keys(request))),
+    Depends(invalidate_on_write("get_public_post"))
+])
 
+# Database references. read_db may be routed to secondaries (see
+# services/mongo_client.py) and only serves public search, which is neither
+# CDN-purged nor single-flight cached; every purged or invalidated public
+# read uses the primary, so a refetch after a write never sees older data
 db = None
+read_db = None
 
-def set_db(database):
-    global db
+def set_db(database, read_database=None):
+    global db, read_db
     db = database
+    read_db = read_database if read_database is not None else database
+
+
+def _purge_keys(request: Request) -> List[str]:
+    """CDN surrogate keys affected by a post write"""
+    post_id = request.path_params.get("post_id")
+    if post_id:
+        return [f"post:{post_id}", "posts:list"]
+    if "/batch/" in request.url.path:
+        return ["posts"]
+    return ["posts:list"]
 
 
 async def log_audit(
@@ -42,7 +73,7 @@ async def log_audit(
             ip_address=request.client.host if request.client else "unknown",
             user_agent=request.headers.get("user-agent")
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_writer.write(audit_log.dict())
     except Exception as e:
         logger.error(f"Failed to create audit log: {e}")
 
@@ -66,6 +97,51 @@ async def list_posts(
     return [PostListResponse(**p) for p in posts]
 
 
+@router.get("/search")
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[PostStatus] = None,
+    category: Optional[PostCategory] = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """Full-text search over posts, ranked by relevance"""
+    filters = {"deleted_at": None}
+    if status:
+        filters["status"] = status.value
+    if category:
+        filters["category"] = category.value
+    
+    posts, total, terms = await text_search(
+        db.posts, q, filters,
+        {"id": 1, "slug": 1, "title": 1, "excerpt": 1, "content": 1, "category": 1,
+         "tags": 1, "status": 1, "created_at": 1, "published_at": 1},
+        page, limit
+    )
+    
+    return {
+        "query": q,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "results": [{
+            "id": p["id"],
+            "slug": p["slug"],
+            "title": p["title"],
+            "title_highlighted": highlight(p["title"], terms),
+            "excerpt": p.get("excerpt"),
+            "snippet": highlight(p.get("content") or p.get("excerpt"), terms),
+            "category": p["category"],
+            "tags": p.get("tags", []),
+            "status": p["status"],
+            "created_at": p["created_at"],
+            "published_at": p.get("published_at"),
+            "score": round(p["score"], 3)
+        } for p in posts]
+    }
+
+
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(
     post_id: str,
@@ -110,7 +186,10 @@ async def create_post(
     if post_data.status == PostStatus.PUBLISHED:
         post.published_at = datetime.utcnow()
     
-    await db.posts.insert_one(post.dict())
+    post_doc = post.dict()
+    post_doc[SEARCH_FIELD] = search_fields(post_doc, POST_SEARCH_SOURCES)
+    await db.posts.insert_one(post_doc)
+    post_search_index.apply(post_doc)
     
     await log_audit(
         action=AuditAction.POST_CREATE,
@@ -152,7 +231,11 @@ async def update_post(
                 update_data[field] = value
                 new_values[field] = value
     
+    if search_sources_changed(update_data, POST_SEARCH_SOURCES):
+        update_data[SEARCH_FIELD] = search_fields({**post, **update_data}, POST_SEARCH_SOURCES)
+    
     await db.posts.update_one({"id": post_id}, {"$set": update_data})
+    await post_search_index.refresh_post(post_id)
     
     await log_audit(
         action=AuditAction.POST_UPDATE,
@@ -184,6 +267,8 @@ async def delete_post(
         {"$set": {"deleted_at": datetime.utcnow(), "updated_at": datetime.utcnow()}}
     )
     
+    await post_search_index.refresh_post(post_id)
+    
     await log_audit(
         action=AuditAction.POST_DELETE,
         request=request,
@@ -216,6 +301,8 @@ async def publish_post(
         }}
     )
     
+    await post_search_index.refresh_post(post_id)
+    
     await log_audit(
         action=AuditAction.POST_PUBLISH,
         request=request,
@@ -246,6 +333,8 @@ async def archive_post(
         }}
     )
     
+    await post_search_index.refresh_post(post_id)
+    
     await log_audit(
         action=AuditAction.POST_ARCHIVE,
         request=request,
@@ -277,6 +366,8 @@ async def batch_publish(
         if result.modified_count > 0:
             updated += 1
     
+    await post_search_index.refresh_posts(post_ids)
+    
     return {"success": True, "message": f"Opublikowano {updated} postów"}
 
 
@@ -299,6 +390,8 @@ async def batch_archive(
         if result.modified_count > 0:
             updated += 1
     
+    await post_search_index.refresh_posts(post_ids)
+    
     return {"success": True, "message": f"Zarchiwizowano {updated} postów"}
 
 
@@ -327,28 +420,87 @@ async def list_public_posts(
     } for p in posts]
 
 
+@router.get("/public/search")
+async def search_public_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[PostCategory] = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Full-text search over published posts (public endpoint)"""
+    filters = {"status": PostStatus.PUBLISHED.value, "deleted_at": None}
+    if category:
+        filters["category"] = category.value
+    
+    posts, total, terms = await text_search(
+        read_db.posts, q, filters,
+        {"slug": 1, "title": 1, "excerpt": 1, "content": 1, "featured_image_url": 1,
+         "category": 1, "tags": 1, "published_at": 1},
+        page, limit
+    )
+    
+    return {
+        "query": q,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "results": [{
+            "slug": p["slug"],
+            "title": p["title"],
+            "title_highlighted": highlight(p["title"], terms),
+            "excerpt": p.get("excerpt"),
+            "snippet": highlight(p.get("content") or p.get("excerpt"), terms),
+            "featured_image_url": p.get("featured_image_url"),
+            "category": p["category"],
+            "tags": p.get("tags", []),
+            "published_at": p.get("published_at")
+        } for p in posts]
+    }
+
+
+@router.get("/public/quick-search")
+async def quick_search_public_posts(
+    q: str = Query("", max_length=100),
+    category: Optional[PostCategory] = None,
+    tag: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Type-ahead search with category/tag facets over published posts (public endpoint)"""
+    if not post_search_index.ready:
+        raise HTTPException(status_code=503, detail="Wyszukiwarka jest w trakcie uruchamiania")
+    return post_search_index.search(q, category.value if category else None, tag, limit)
+
+
 @router.get("/public/{slug}")
-async def get_public_post(slug: str):
+async def get_public_post(slug: str, request: Request):
     """Get published post by slug (public endpoint)"""
-    post = await db.posts.find_one({
-        "slug": slug,
-        "status": PostStatus.PUBLISHED.value,
-        "deleted_at": None
-    })
+    async def load():
+        post = await db.posts.find_one({
+            "slug": slug,
+            "status": PostStatus.PUBLISHED.value,
+            "deleted_at": None
+        })
+        if not post:
+            return None
+        return post["id"], {
+            "slug": post["slug"],
+            "title": post["title"],
+            "excerpt": post.get("excerpt"),
+            "content": post["content"],
+            "featured_image_url": post.get("featured_image_url"),
+            "category": post["category"],
+            "tags": post.get("tags", []),
+            "published_at": post.get("published_at")
+        }
     
-    if not post:
+    # Concurrent requests for the same slug share one query
+    cached = await public_reads.get("get_public_post", slug, load)
+    if cached is None:
         raise HTTPException(status_code=404, detail="Post nie znaleziony")
     
-    return {
-        "slug": post["slug"],
-        "title": post["title"],
-        "excerpt": post.get("excerpt"),
-        "content": post["content"],
-        "featured_image_url": post.get("featured_image_url"),
-        "category": post["category"],
-        "tags": post.get("tags", []),
-        "published_at": post.get("published_at")
-    }
+    post_id, post = cached
+    add_surrogate_keys(request, f"post:{post_id}")
+    return post
 
 
 # Get categories
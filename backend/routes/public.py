@@ -0,0 +1,27 @@
+"""
+Public landing-page bootstrap
+
+One request returns everything the landing page needs on first paint:
+public settings, navigation, the active widget of every section and the
+rendered integrations for every injection position.
+"""
+from fastapi import APIRouter, Request, Response
+
+from services.public_content import bootstrap_cache
+
+router = APIRouter(prefix="/public", tags=["Public"])
+
+
+def set_db(database):
+    """Set the database reference"""
+    bootstrap_cache.set_db(database)
+
+
+@router.get("/bootstrap")
+async def get_bootstrap(request: Request):
+    """Public settings, widgets, integrations and navigation in one payload"""
+    body, etag = await bootstrap_cache.get()
+    headers = {"ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,5 +1,5 @@
 """Comprehensive Site Settings Routes for TimeLov CMS"""
-from fastapi import APIRouter, HTTPException, Request, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Request, Depends, UploadFile, File, Response
 from datetime import datetime
 from typing import Optional, List
 import logging
@@ -16,12 +16,39 @@ from models.settings import (
     GeneralSettings, GeneralUpdate, CookieConsentSettings
 )
 from models.audit_log import AuditLog, AuditAction, EntityType
+from services.audit_writer import audit_writer
+from services.public_content import build_public_settings
+from services.single_flight import public_reads, invalidate_on_write
+from services.cdn_purge import purge_on_write
 from middleware.auth_middleware import get_current_user
+from services.branding_service import get_branding_css_variables
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/cms/settings", tags=["Settings"])
+PUBLIC_SETTINGS_SECTIONS = ("branding", "seo", "navigation", "general", "integrations")
 
+
+def _purge_keys(request: Request) -> List[str]:
+    """CDN surrogate keys affected by a settings write (section from the path)"""
+    section = request.url.path.split("/cms/settings/", 1)[-1].split("/", 1)[0]
+    if section in PUBLIC_SETTINGS_SECTIONS:
+        return [f"settings:{section}"]
+    if section == "reset":
+        return ["settings"]
+    # Uploads get new ids; nothing cached changes
+    return []
+
+
+# Cached public reads are invalidated on every worker before the CDN purge
+# is scheduled (dependency teardown runs in reverse order); integrations
+# render with the branding variables
+router = APIRouter(prefix="/cms/settings", tags=["Settings"], dependencies=[
+    Depends(purge_on_write(_purge_keys)),
+    Depends(invalidate_on_write("get_public_settings", "render_integrations_html"))
+])
+
+# Database reference. Public reads here are CDN-purged and single-flight
+# invalidated on write, so they use the primary like everything else
 db = None
 
 def set_db(database):
@@ -50,7 +77,7 @@ async def log_audit(
             ip_address=request.client.host if request.client else "unknown",
             user_agent=request.headers.get("user-agent")
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_writer.write(audit_log.dict())
     except Exception as e:
         logger.error(f"Failed to create audit log: {e}")
 
@@ -63,6 +90,7 @@ async def get_or_create_settings() -> dict:
         default = get_default_settings()
         settings_dict = default.dict()
         settings_dict["_type"] = "complete_settings"
+        settings_dict["version"] = 1
         await db.site_settings.insert_one(settings_dict)
         settings_doc = settings_dict
     
@@ -84,62 +112,32 @@ async def get_all_settings(current_user: dict = Depends(get_current_user)):
 @router.get("/public")
 async def get_public_settings():
     """Get public site settings (no auth required)"""
-    settings = await get_or_create_settings()
-    
-    # Build public settings response
-    public = {
-        "branding": {
-            "logo_url": settings.get("branding", {}).get("logo_url"),
-            "logo_alt": settings.get("branding", {}).get("logo_alt", "TimeLov"),
-            "favicon_url": settings.get("branding", {}).get("favicon_url"),
-            "primary_color": settings.get("branding", {}).get("primary_color", "#0066FF"),
-            "secondary_color": settings.get("branding", {}).get("secondary_color", "#00CC88"),
-            "accent_color": settings.get("branding", {}).get("accent_color", "#1A1A1A"),
-            "font_family": settings.get("branding", {}).get("font_family", "Inter"),
-            "site_tagline": settings.get("branding", {}).get("site_tagline", ""),
-        },
-        "seo": {
-            "meta_title": settings.get("seo", {}).get("meta_title", ""),
-            "meta_description": settings.get("seo", {}).get("meta_description", ""),
-            "meta_keywords": settings.get("seo", {}).get("meta_keywords", ""),
-            "og_title": settings.get("seo", {}).get("og_title"),
-            "og_description": settings.get("seo", {}).get("og_description"),
-            "og_image_url": settings.get("seo", {}).get("og_image_url"),
-            "twitter_title": settings.get("seo", {}).get("twitter_title"),
-            "twitter_description": settings.get("seo", {}).get("twitter_description"),
-            "twitter_image_url": settings.get("seo", {}).get("twitter_image_url"),
-        },
-        "navigation": {
-            "sections": [
-                s for s in settings.get("navigation", {}).get("sections", [])
-                if s.get("is_enabled", True)
-            ]
-        },
-        "general": {
-            "site_name": settings.get("general", {}).get("site_name", "TimeLov"),
-            "site_url": settings.get("general", {}).get("site_url", ""),
-            "maintenance_mode": settings.get("general", {}).get("maintenance_mode", False),
-            "maintenance_message": settings.get("general", {}).get("maintenance_message", ""),
-            "cookie_consent": settings.get("general", {}).get("cookie_consent", {}),
-        },
-        "integrations": {
-            "enabled": [
-                {
-                    "type": i.get("type"),
-                    "name": i.get("name"),
-                    "code_snippet": i.get("code_snippet"),
-                    "injection_position": i.get("injection_position"),
-                    "custom_css": i.get("custom_css") if i.get("whitelabel_enabled", True) else None,
-                    "url": i.get("url"),
-                    "priority": i.get("priority", 10),
-                }
-                for i in settings.get("integrations", {}).get("integrations", [])
-                if i.get("is_enabled", False)
-            ]
-        }
+    async def load():
+        settings = await db.site_settings.find_one({"_type": "complete_settings"})
+        if settings is None:
+            # Not created yet (or not replicated yet): create on the primary
+            settings = await get_or_create_settings()
+        return build_public_settings(settings)
+    
+    return await public_reads.get("get_public_settings", None, load)
+
+
+@router.get("/public/branding.css")
+async def get_branding_stylesheet(request: Request):
+    """Get branding CSS variables as a cacheable stylesheet (no auth required)"""
+    css, version = await get_branding_css_variables(db)
+    # No settings document yet is distinct from a legacy document (version 0)
+    etag = f'W/"branding-{version}"' if version is not None else 'W/"branding-none"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, no-cache"
     }
     
-    return public
+    # Clients revalidate on every use, so branding changes show up immediately
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=css, media_type="text/css", headers=headers)
 
 
 # ═══════════════════════════════════════
@@ -169,6 +167,7 @@ async def update_branding_settings(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "branding": new_branding,
                 "updated_at": datetime.utcnow(),
@@ -216,6 +215,7 @@ async def update_seo_settings(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "seo": new_seo,
                 "updated_at": datetime.utcnow(),
@@ -264,6 +264,7 @@ async def create_navigation_section(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "navigation.sections": sections,
                 "updated_at": datetime.utcnow(),
@@ -306,6 +307,7 @@ async def update_navigation_section(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "navigation.sections": sections,
                 "updated_at": datetime.utcnow(),
@@ -346,6 +348,7 @@ async def delete_navigation_section(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "navigation.sections": sections,
                 "updated_at": datetime.utcnow(),
@@ -392,6 +395,7 @@ async def create_integration(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "integrations.integrations": integrations,
                 "updated_at": datetime.utcnow(),
@@ -434,6 +438,7 @@ async def update_integration(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "integrations.integrations": integrations,
                 "updated_at": datetime.utcnow(),
@@ -474,6 +479,7 @@ async def delete_integration(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "integrations.integrations": integrations,
                 "updated_at": datetime.utcnow(),
@@ -514,6 +520,7 @@ async def toggle_integration(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "integrations.integrations": integrations,
                 "updated_at": datetime.utcnow(),
@@ -570,6 +577,7 @@ async def update_general_settings(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 "general": new_general,
                 "updated_at": datetime.utcnow(),
@@ -677,6 +685,7 @@ async def reset_to_defaults(
     await db.site_settings.update_one(
         {"_type": "complete_settings"},
         {
+            "$inc": {"version": 1},
             "$set": {
                 **default.dict(),
                 "_type": "complete_settings",
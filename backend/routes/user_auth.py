@@ -10,6 +10,9 @@ import os
 import logging
 import re
 
+from services.auth_service import run_password_task
+from middleware.rate_limiter import limiter, LOGIN_RATE_LIMIT
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth/user", tags=["User Auth"])
@@ -98,7 +101,7 @@ async def register_user(user_data: UserRegister, request: Request):
     user_doc = {
         "id": user_id,
         "email": user_data.email.lower(),
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await run_password_task(hash_password, user_data.password),
         "full_name": user_data.full_name,
         "company_name": user_data.company_name,
         "is_active": True,
@@ -122,13 +125,13 @@ async def register_user(user_data: UserRegister, request: Request):
     }
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(limiter.limit(LOGIN_RATE_LIMIT, scope="user_login"))])
 async def login_user(credentials: UserLogin, request: Request):
     """Login user and return tokens"""
     # Find user
     user = await db.app_users.find_one({"email": credentials.email.lower()})
     
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await run_password_task(verify_password, credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Nieprawidłowy email lub hasło")
 
     if not user.get("is_active", True):
@@ -8,13 +8,22 @@ from models.widget import (
     WidgetResponse, WidgetPublicResponse, WidgetSection
 )
 from models.audit_log import AuditLog, AuditAction, EntityType
+from services.audit_writer import audit_writer
+from services.cdn_purge import purge_on_write
 from middleware.auth_middleware import get_current_user, get_optional_user
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/cms/widgets", tags=["Widgets"])
+# Public widget responses are keyed by section; a write may move a widget
+# between sections, so every widget write purges them all
+router = APIRouter(
+    prefix="/cms/widgets",
+    tags=["Widgets"],
+    dependencies=[Depends(purge_on_write(lambda request: ["widgets"]))]
+)
 
-# Database reference
+# Database reference. Public reads here are CDN-purged and single-flight
+# invalidated on write, so they use the primary like everything else
 db = None
 
 def set_db(database):
@@ -45,22 +54,17 @@ async def log_audit(
             ip_address=request.client.host if request.client else "unknown",
             user_agent=request.headers.get("user-agent")
         )
-        await db.audit_logs.insert_one(audit_log.dict())
+        await audit_writer.write(audit_log.dict())
     except Exception as e:
         logger.error(f"Failed to create audit log: {e}")
 
 
 # Public endpoint - get widget for a section
 @router.get("/public/{section}", response_model=Optional[WidgetPublicResponse])
-async def get_public_widget(section: str):
+async def get_public_widget(section: WidgetSection):
     """Get active widget for a section (public endpoint for landing page)"""
-    try:
-        section_enum = WidgetSection(section)
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid section: {section}")
-    
     widget_doc = await db.widgets.find_one({
-        "section_name": section_enum.value,
+        "section_name": section.value,
         "is_active": True,
         "deleted_at": None
     })
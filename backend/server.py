@@ -1,17 +1,32 @@
-from fastapi import FastAPI, APIRouter, Request
+from fastapi import FastAPI, APIRouter, Depends, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 # Import rate limiter
-from middleware.rate_limiter import limiter, rate_limit_exceeded_handler
+from middleware.rate_limiter import (
+    limiter, rate_limit_exceeded_handler, create_rate_limit_storage,
+    RateLimitExceeded, API_RATE_LIMIT, is_public_read
+)
 from middleware.security_headers import SecurityHeadersMiddleware
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
+from middleware.cache_policy import CachePolicyMiddleware
+from middleware.request_logging import RequestLoggingMiddleware
+from middleware.metrics_middleware import MetricsMiddleware
+from services.metrics import register_cache, render_metrics, METRICS_CONTENT_TYPE
+from services.audit_writer import audit_writer
+from services.post_search_index import post_search_index
+from services.mongo_client import create_mongo_client, public_read_preference
+from services.indexes import start_index_build
+from services.logging_config import configure_logging
+from services.branding_service import css_variables_cache_stats
+from services.public_content import bootstrap_cache_stats, invalidate_public_content_on_write
+from services.single_flight import public_reads
+from services.cdn_purge import cdn_purger
+from services.event_bus import event_bus
+from models.widget import widget_code_cache_stats
 
 # Import routes
 from routes.auth import router as auth_router, set_db as set_auth_db
@@ -24,15 +39,16 @@ from routes.dashboard import router as dashboard_router, set_db as set_dashboard
 from routes.user_auth import router as user_auth_router, set_db as set_user_auth_db
 from routes.demo import router as demo_router, set_db as set_demo_db
 from routes.integrations import router as integrations_router, set_db as set_integrations_db
+from routes.public import router as public_router, set_db as set_public_db
+from routes.changes import router as changes_router, set_db as set_changes_db
+from routes.events import router as events_router
+from routes.history import router as history_router, set_db as set_history_db
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (records are written by a background QueueListener thread)
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 # MongoDB connection
@@ -41,62 +57,64 @@ db_name = os.environ.get('DB_NAME', 'timelov_admin')
 
 client = None
 db = None
+public_db = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global client, db
+    global client, db, public_db
     
     # Startup
     logger.info("Starting up...")
-    client = AsyncIOMotorClient(mongo_url)
+    client = create_mongo_client(mongo_url)
     db = client[db_name]
+    # Public search may be served by secondaries (bounded staleness); public
+    # reads that writes purge or invalidate stay on the primary
+    public_db = client.get_database(db_name, read_preference=public_read_preference())
     
     # Set database for routes
     set_auth_db(db)
     set_widgets_db(db)
-    set_pages_db(db)
-    set_posts_db(db)
+    set_pages_db(db, public_db)
+    set_posts_db(db, public_db)
     set_settings_db(db)
     set_audit_logs_db(db)
     set_dashboard_db(db)
     set_user_auth_db(db)
     set_demo_db(db)
     set_integrations_db(db)
+    set_public_db(db)
+    set_changes_db(db)
+    set_history_db(db)
+    public_reads.set_db(db)
     
-    # Create indexes
-    await db.admin_users.create_index("email", unique=True)
-    await db.admin_users.create_index("id", unique=True)
-    await db.audit_logs.create_index("created_at")
-    await db.audit_logs.create_index("admin_id")
-    await db.audit_logs.create_index("action")
-    await db.widgets.create_index("id", unique=True)
-    await db.widgets.create_index("section_name")
-    await db.pages.create_index("id", unique=True)
-    await db.pages.create_index("slug", unique=True)
-    await db.posts.create_index("id", unique=True)
-    await db.posts.create_index("slug", unique=True)
-    await db.settings.create_index("setting_key", unique=True)
+    # Index reconciliation runs in the background by default so the worker
+    # starts serving immediately (see services/indexes.py)
+    index_build = await start_index_build(db)
     
-    # Integrations indexes
-    await db.integrations.create_index("id", unique=True)
-    await db.integrations.create_index("integration_type")
-    await db.integrations.create_index("section_name")
-    await db.integrations.create_index("is_active")
+    # Rate limit counters shared by all workers
+    rate_limit_storage = create_rate_limit_storage(db)
+    if hasattr(rate_limit_storage, "ensure_indexes"):
+        await rate_limit_storage.ensure_indexes()
+    limiter.init_storage(rate_limit_storage)
     
-    # App user indexes
-    await db.app_users.create_index("email", unique=True)
-    await db.app_users.create_index("id", unique=True)
-    await db.demo_requests.create_index("id", unique=True)
-    await db.demo_requests.create_index("email")
-    await db.demo_requests.create_index("created_at")
+    logger.info("Database connected")
     
-    logger.info("Database connected and indexes created")
+    audit_writer.start(db)
+    event_bus.start(db)
+    post_search_index.start(db)
+    cdn_purger.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    if index_build is not None and not index_build.done():
+        index_build.cancel()
+    await cdn_purger.stop()
+    await event_bus.stop()
+    await post_search_index.stop()
+    await audit_writer.stop()
     if client:
         client.close()
 
@@ -108,8 +126,12 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add rate limiter to app
-app.state.limiter = limiter
+register_cache("widget_code_validation", widget_code_cache_stats)
+register_cache("branding_css_variables", css_variables_cache_stats)
+register_cache("public_bootstrap", bootstrap_cache_stats)
+register_cache("public_reads", public_reads.stats)
+
+# Rate limiting (per-route limits are declared as route/router dependencies)
 app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
 # Create API router
@@ -127,21 +149,49 @@ async def health_check():
         "database": "connected" if db is not None else "disconnected"
     }
 
-# Include routers
+# Include routers (auth routes carry their own, stricter limits). Public
+# landing-page reads are not limited: behind the CDN they arrive from a few
+# edge addresses shared by every visitor, and they are cached anyway
+api_rate_limit = [Depends(limiter.limit(API_RATE_LIMIT, scope="api", exempt=is_public_read))]
 api_router.include_router(auth_router)
 api_router.include_router(user_auth_router)
-api_router.include_router(demo_router)
-api_router.include_router(widgets_router)
-api_router.include_router(integrations_router)
-api_router.include_router(pages_router)
-api_router.include_router(posts_router)
-api_router.include_router(settings_router)
-api_router.include_router(audit_logs_router)
-api_router.include_router(dashboard_router)
+api_router.include_router(demo_router, dependencies=api_rate_limit)
+# Writes invalidate the cached bootstrap payload; the routers themselves
+# invalidate their single-flight entries (see services/single_flight.py)
+invalidate_public_content = [Depends(invalidate_public_content_on_write)]
+api_router.include_router(widgets_router, dependencies=api_rate_limit + invalidate_public_content)
+api_router.include_router(integrations_router, dependencies=api_rate_limit + invalidate_public_content)
+api_router.include_router(pages_router, dependencies=api_rate_limit)
+api_router.include_router(posts_router, dependencies=api_rate_limit)
+api_router.include_router(settings_router, dependencies=api_rate_limit + invalidate_public_content)
+api_router.include_router(public_router, dependencies=api_rate_limit)
+api_router.include_router(changes_router, dependencies=api_rate_limit)
+api_router.include_router(events_router, dependencies=api_rate_limit)
+api_router.include_router(audit_logs_router, dependencies=api_rate_limit)
+api_router.include_router(history_router, dependencies=api_rate_limit)
+api_router.include_router(dashboard_router, dependencies=api_rate_limit)
 
 # Include API router in main app
 app.include_router(api_router)
 
+
+# Prometheus scrape endpoint (outside /api so it is not exposed through the public ingress)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+# Middleware is pure ASGI throughout (no BaseHTTPMiddleware), so responses
+# stream straight through; each add_middleware() wraps the previous ones
+
+# CSRFMiddleware (middleware/csrf_middleware.py) is not installed: every
+# route authenticates with a Bearer token and no session cookie or CSRF
+# token is issued, so it would have nothing to check. Its token store
+# (init_csrf_store, start_csrf_sweeper) is only set up together with it
+
+# Per-route Cache-Control and surrogate keys for the CDN
+app.add_middleware(CachePolicyMiddleware)
+
 # Add Security Headers Middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
@@ -154,9 +204,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"{request.method} {request.url.path}")
-    response = await call_next(request)
-    return response
+# Structured, sampled access log (JSON lines on the "timelov.access" logger)
+app.add_middleware(RequestLoggingMiddleware)
+
+# Request metrics (added last so it wraps every other middleware)
+app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,336 @@
+"""
+Compact audit entry encoding
+
+Audit entries are encoded by the audit writer before they are queued:
+
+- old_values/new_values keep only the fields whose value changed. Long
+  strings (post/page `content`) are stored as a text diff in
+  `text_diffs: {field: [[old_start, old_segment, new_segment], ...]}`
+  instead of two full copies, so a typo fix in a 50KB article stores a
+  few bytes. Each hunk keeps both segments, so a diff can be applied to
+  the new text (to get the old one) as well as to the old text. Long
+  texts are matched line by line first and only the changed lines are
+  diffed character by character; this runs in a worker thread.
+- user agents are dictionary-encoded: the entry stores `user_agent_id`
+  (a hash of the string) and the string is kept once in
+  `audit_user_agents`.
+- IP addresses are stored as packed bytes (4 or 16) instead of text.
+
+`decode_entries` turns stored entries back into the API shape (IP and user
+agent strings); `reconstruct_values` renders the full old/new values of an
+entry by rewinding the entity's current document through the later
+entries' diffs. Entries written before this encoding are decoded as is.
+"""
+from difflib import SequenceMatcher
+from hashlib import blake2b
+from itertools import accumulate
+from typing import Dict, Iterable, List
+import asyncio
+import ipaddress
+import logging
+import os
+import re
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Strings at least this long are stored as text diffs
+AUDIT_TEXT_DIFF_MIN_CHARS = int(os.environ.get("AUDIT_TEXT_DIFF_MIN_CHARS", "512"))
+# Character-level matching is only run on changed blocks of lines up to this
+# size (it is quadratic); larger blocks are stored as one hunk
+AUDIT_TEXT_DIFF_MATCH_CHARS = int(os.environ.get("AUDIT_TEXT_DIFF_MATCH_CHARS", "1000"))
+
+# "Lines" for the first matching pass: content is HTML that is often a
+# single physical line, so tag ends and sentence ends also end a line
+_LINE_RE = re.compile(r"[^\n>.!?]*(?:[\n>]|[.!?]+|$)")
+
+USER_AGENT_COLLECTION = "audit_user_agents"
+USER_AGENT_CACHE_SIZE = 10_000
+
+# entity_type -> collection holding the entity's current state
+ENTITY_COLLECTIONS = {"post": "posts", "page": "pages"}
+
+
+class ReconstructionError(Exception):
+    """Stored diffs do not match the entity's history (e.g. an unaudited change)"""
+
+
+# ═══════════════════════════════════════
+# TEXT DIFFS
+# ═══════════════════════════════════════
+
+def _common_prefix(a: str, b: str) -> int:
+    # Binary search over slice comparisons (done in C) instead of a char loop
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    low, high = 0, min(len(a), len(b)) - limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _char_diff(start: int, a: str, b: str) -> List[list]:
+    if len(a) + len(b) > AUDIT_TEXT_DIFF_MATCH_CHARS:
+        return [[start, a, b]]
+    return [
+        [start + i1, a[i1:i2], b[j1:j2]]
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _split_lines(text: str) -> List[str]:
+    return [line for line in _LINE_RE.findall(text) if line]
+
+
+def text_diff(old: str, new: str) -> List[list]:
+    """Hunks [old_start, old_segment, new_segment] turning `old` into `new`"""
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, prefix)
+    a = old[prefix:len(old) - suffix]
+    b = new[prefix:len(new) - suffix]
+    if not a and not b:
+        return []
+    if len(a) + len(b) <= AUDIT_TEXT_DIFF_MATCH_CHARS:
+        return _char_diff(prefix, a, b)
+
+    # Match lines first, then refine each changed block of lines
+    a_lines, b_lines = _split_lines(a), _split_lines(b)
+    a_offsets = [0, *accumulate(map(len, a_lines))]
+    b_offsets = [0, *accumulate(map(len, b_lines))]
+    hunks = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a_lines, b_lines, autojunk=False).get_opcodes():
+        if tag != "equal":
+            a_start, b_start = a_offsets[i1], b_offsets[j1]
+            hunks.extend(_char_diff(
+                prefix + a_start, a[a_start:a_offsets[i2]], b[b_start:b_offsets[j2]]
+            ))
+    return hunks
+
+
+def apply_text_diff(old: str, hunks: List[list]) -> str:
+    """New text from the old text and its hunks"""
+    parts = []
+    position = 0
+    for start, old_segment, new_segment in hunks:
+        if old[start:start + len(old_segment)] != old_segment:
+            raise ReconstructionError("Text diff does not match the previous value")
+        parts.append(old[position:start])
+        parts.append(new_segment)
+        position = start + len(old_segment)
+    parts.append(old[position:])
+    return "".join(parts)
+
+
+def revert_text_diff(new: str, hunks: List[list]) -> str:
+    """Old text from the new text and its hunks"""
+    parts = []
+    position = 0
+    offset = 0
+    for start, old_segment, new_segment in hunks:
+        new_start = start + offset
+        if new[new_start:new_start + len(new_segment)] != new_segment:
+            raise ReconstructionError("Text diff does not match the current value")
+        parts.append(new[position:new_start])
+        parts.append(old_segment)
+        position = new_start + len(new_segment)
+        offset += len(new_segment) - len(old_segment)
+    parts.append(new[position:])
+    return "".join(parts)
+
+
+def _diff_size(hunks: List[list]) -> int:
+    return sum(len(old_segment) + len(new_segment) + 8 for _, old_segment, new_segment in hunks)
+
+
+# ═══════════════════════════════════════
+# IP ADDRESSES AND USER AGENTS
+# ═══════════════════════════════════════
+
+def encode_ip(ip):
+    """Packed bytes for a valid address; anything else ("unknown") is kept as is"""
+    if not isinstance(ip, str):
+        return ip
+    try:
+        return ipaddress.ip_address(ip).packed
+    except ValueError:
+        return ip
+
+
+def decode_ip(value) -> str:
+    if isinstance(value, (bytes, bytearray)):
+        return str(ipaddress.ip_address(bytes(value)))
+    return value or ""
+
+
+def user_agent_id(user_agent: str) -> str:
+    return blake2b(user_agent.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class UserAgentDictionary:
+    """
+    Maps user agent strings to short ids stored in audit entries. Ids are
+    content hashes, so encoding needs no database round trip; new strings
+    are saved by `flush` (called by the audit writer before inserting).
+    """
+
+    def __init__(self, cache_size: int = USER_AGENT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._known: Dict[str, str] = {}
+        self._pending: Dict[str, str] = {}
+
+    def _remember(self, ua_id: str, user_agent: str):
+        if len(self._known) >= self.cache_size:
+            self._known.clear()
+        self._known[ua_id] = user_agent
+
+    def encode(self, user_agent: str) -> str:
+        ua_id = user_agent_id(user_agent)
+        if ua_id not in self._known:
+            self._pending[ua_id] = user_agent
+        return ua_id
+
+    async def flush(self, db):
+        """Save user agents not yet known to be in the dictionary"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await db[USER_AGENT_COLLECTION].bulk_write([
+                UpdateOne({"_id": ua_id}, {"$setOnInsert": {"user_agent": user_agent}}, upsert=True)
+                for ua_id, user_agent in pending.items()
+            ], ordered=False)
+        except Exception:
+            # Retried with the next batch
+            for ua_id, user_agent in pending.items():
+                self._pending.setdefault(ua_id, user_agent)
+            raise
+        for ua_id, user_agent in pending.items():
+            self._remember(ua_id, user_agent)
+
+    async def resolve(self, db, ids: Iterable[str]) -> Dict[str, str]:
+        wanted = {ua_id for ua_id in ids if ua_id}
+        missing = [ua_id for ua_id in wanted if ua_id not in self._known and ua_id not in self._pending]
+        if missing:
+            async for doc in db[USER_AGENT_COLLECTION].find({"_id": {"$in": missing}}):
+                self._remember(doc["_id"], doc.get("user_agent"))
+        return {ua_id: self._known.get(ua_id) or self._pending.get(ua_id) for ua_id in wanted}
+
+
+user_agents = UserAgentDictionary()
+
+
+# ═══════════════════════════════════════
+# ENTRIES
+# ═══════════════════════════════════════
+
+def _is_long_text(old, new) -> bool:
+    return (
+        isinstance(old, str) and isinstance(new, str)
+        and max(len(old), len(new)) >= AUDIT_TEXT_DIFF_MIN_CHARS
+    )
+
+
+def _encode_values(doc: dict):
+    old_values = doc.get("old_values")
+    new_values = doc.get("new_values")
+    if not isinstance(old_values, dict) or not isinstance(new_values, dict):
+        return
+    text_diffs = {}
+    for field in [field for field in old_values if field in new_values]:
+        old, new = old_values[field], new_values[field]
+        if old == new:
+            del old_values[field], new_values[field]
+        elif _is_long_text(old, new):
+            hunks = text_diff(old, new)
+            if _diff_size(hunks) < len(old) + len(new):
+                text_diffs[field] = hunks
+                del old_values[field], new_values[field]
+    if text_diffs:
+        doc["text_diffs"] = text_diffs
+
+
+async def encode_entry(doc: dict) -> dict:
+    """Encode an audit document in place for storage"""
+    old_values = doc.get("old_values")
+    new_values = doc.get("new_values")
+    if (
+        isinstance(old_values, dict) and isinstance(new_values, dict)
+        and any(_is_long_text(old_values[field], new_values.get(field)) for field in old_values)
+    ):
+        # Diffing long texts is CPU-bound; keep it off the event loop
+        await asyncio.to_thread(_encode_values, doc)
+    else:
+        _encode_values(doc)
+
+    doc["ip_address"] = encode_ip(doc.get("ip_address"))
+    user_agent = doc.pop("user_agent", None)
+    if user_agent:
+        doc["user_agent_id"] = user_agents.encode(user_agent)
+    return doc
+
+
+async def decode_entries(db, docs: List[dict]) -> List[dict]:
+    """Stored audit documents in the API shape (IP and user agent strings)"""
+    resolved = await user_agents.resolve(db, (doc.get("user_agent_id") for doc in docs))
+    for doc in docs:
+        doc["ip_address"] = decode_ip(doc.get("ip_address"))
+        ua_id = doc.pop("user_agent_id", None)
+        doc["user_agent"] = resolved.get(ua_id) if ua_id else doc.get("user_agent")
+    return docs
+
+
+# ═══════════════════════════════════════
+# RECONSTRUCTION
+# ═══════════════════════════════════════
+
+def revert_entry(state: dict, entry: dict) -> dict:
+    """The audited fields of `state` as they were before `entry`"""
+    state = dict(state)
+    for field, hunks in (entry.get("text_diffs") or {}).items():
+        if not isinstance(state.get(field), str):
+            raise ReconstructionError(f"Missing current value of {field}")
+        state[field] = revert_text_diff(state[field], hunks)
+    for field, value in (entry.get("old_values") or {}).items():
+        state[field] = value
+    return state
+
+
+async def reconstruct_values(db, entry: dict, later_entries) -> dict:
+    """
+    Full old/new values of `entry`. Text diffs are resolved by rewinding the
+    entity's current document through `later_entries` (the entity's audit
+    entries after this one, newest first).
+    """
+    old_values = dict(entry.get("old_values") or {})
+    new_values = dict(entry.get("new_values") or {})
+    text_diffs = entry.get("text_diffs") or {}
+    if not text_diffs:
+        return {"old_values": old_values, "new_values": new_values}
+
+    collection = ENTITY_COLLECTIONS.get(entry.get("entity_type"))
+    current = await db[collection].find_one({"id": entry.get("entity_id")}) if collection else None
+    if current is None:
+        raise ReconstructionError("Entity no longer exists")
+    state = dict(current)
+    async for later in later_entries:
+        if later.get("id") != entry.get("id"):
+            state = revert_entry(state, later)
+    for field, hunks in text_diffs.items():
+        new_values[field] = state[field]
+        old_values[field] = revert_text_diff(state[field], hunks)
+    return {"old_values": old_values, "new_values": new_values}
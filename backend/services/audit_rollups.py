@@ -0,0 +1,282 @@
+"""
+Materialized audit log rollups
+
+Counts of audit entries per action, entity type and admin are kept in
+`audit_rollups`, one document per bucket:
+
+    {_id: "hour:2026101908", granularity: "hour", bucket: <datetime>,
+     total: 12, action: {"post_update": 7, ...}, entity_type: {...}, admin: {...}}
+
+plus one all-time document (_id "all"). The audit writer applies every
+written batch as a handful of $inc upserts, so stats and time-series
+charts read O(buckets) documents however large audit_logs grows. Hourly
+buckets expire after AUDIT_ROLLUP_HOURLY_RETENTION_DAYS; daily ones and
+the all-time totals are kept.
+
+Entries are stamped `rolled_up: true` when written. History written before
+rollups existed is counted once with (a deploy step; instant on an empty
+database):
+    python -m services.audit_rollups --backfill
+Until the backfill has completed (marker in `schema_meta`) the rollups
+miss that history, so `get_rollup_totals` and `get_rollup_series` return
+None and callers aggregate the audit collections directly.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import argparse
+import asyncio
+import logging
+import os
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ROLLUP_HOURLY_RETENTION_DAYS = int(os.environ.get("AUDIT_ROLLUP_HOURLY_RETENTION_DAYS", "90"))
+
+ROLLUP_COLLECTION = "audit_rollups"
+ROLLED_UP_FIELD = "rolled_up"
+ALL_TIME_ID = "all"
+BACKFILL_META_ID = "audit_rollups_backfill"
+GRANULARITIES = ("hour", "day")
+# $dateToString formats truncating created_at to a bucket
+_BUCKET_FORMATS = {"hour": "%Y%m%d%H", "day": "%Y%m%d"}
+# audit document field -> counter map in the rollup document
+DIMENSIONS = {"action": "action", "entity_type": "entity_type", "admin_id": "admin"}
+
+
+def bucket_start(created_at: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return created_at.replace(minute=0, second=0, microsecond=0)
+    return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_id(bucket: datetime, granularity: str) -> str:
+    return f"{granularity}:{bucket:%Y%m%d%H}"
+
+
+def _counter_key(value) -> str:
+    # Counter names become field names: no dots, no leading $
+    value = str(getattr(value, "value", value))
+    return value.replace(".", "_").lstrip("$") or "_"
+
+
+def rollup_updates(docs: Iterable[dict]) -> List[UpdateOne]:
+    """$inc upserts applying a batch of audit documents to the rollups"""
+    increments: Dict[tuple, Dict[str, int]] = {}
+    for doc in docs:
+        created_at = doc.get("created_at") or datetime.utcnow()
+        fields = ["total"]
+        for source, target in DIMENSIONS.items():
+            if doc.get(source):
+                fields.append(f"{target}.{_counter_key(doc[source])}")
+        targets = [(ALL_TIME_ID, None, None)]
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(created_at, granularity)
+            targets.append((bucket_id(bucket, granularity), granularity, bucket))
+        for target in targets:
+            counters = increments.setdefault(target, {})
+            for field in fields:
+                counters[field] = counters.get(field, 0) + 1
+
+    updates = []
+    for (_id, granularity, bucket), counters in increments.items():
+        update = {"$inc": counters}
+        if granularity is not None:
+            on_insert = {"granularity": granularity, "bucket": bucket}
+            if granularity == "hour":
+                on_insert["expire_at"] = bucket + timedelta(days=AUDIT_ROLLUP_HOURLY_RETENTION_DAYS)
+            update["$setOnInsert"] = on_insert
+        updates.append(UpdateOne({"_id": _id}, update, upsert=True))
+    return updates
+
+
+async def apply_rollups(db, docs: List[dict]):
+    """Count written audit documents into the rollups"""
+    updates = rollup_updates(docs)
+    if updates:
+        await db[ROLLUP_COLLECTION].bulk_write(updates, ordered=False)
+
+
+def _sorted_counts(counters: Optional[dict]) -> Dict[str, int]:
+    return dict(sorted((counters or {}).items(), key=lambda kv: -kv[1]))
+
+
+_backfilled = False
+
+
+async def is_backfilled(db) -> bool:
+    """Whether history written before rollups existed has been counted"""
+    global _backfilled
+    if not _backfilled:
+        _backfilled = await db.schema_meta.find_one({"_id": BACKFILL_META_ID}) is not None
+    return _backfilled
+
+
+async def get_rollup_totals(db) -> Optional[dict]:
+    """All-time totals, or None while the rollups are incomplete (not backfilled)"""
+    if not await is_backfilled(db):
+        return None
+    doc = await db[ROLLUP_COLLECTION].find_one({"_id": ALL_TIME_ID}) or {}
+    return {
+        "total": doc.get("total", 0),
+        "by_action": _sorted_counts(doc.get("action")),
+        "by_entity": _sorted_counts(doc.get("entity_type")),
+        "by_admin": _sorted_counts(doc.get("admin")),
+    }
+
+
+async def get_rollup_series(
+    db,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    dimension: Optional[str] = None
+) -> Optional[List[dict]]:
+    """
+    Buckets between start and end, with totals and optionally one
+    dimension's counts; None while the rollups are incomplete (not backfilled)
+    """
+    if not await is_backfilled(db):
+        return None
+    projection = {"_id": 0, "bucket": 1, "total": 1}
+    if dimension:
+        projection[dimension] = 1
+    cursor = db[ROLLUP_COLLECTION].find(
+        {"granularity": granularity, "bucket": {"$gte": bucket_start(start, granularity), "$lte": end}},
+        projection
+    ).sort("bucket", 1)
+    series = []
+    async for doc in cursor:
+        point = {"bucket": doc["bucket"], "total": doc.get("total", 0)}
+        if dimension:
+            point[dimension] = doc.get(dimension, {})
+        series.append(point)
+    return series
+
+
+async def aggregate_totals(db) -> dict:
+    """All-time totals aggregated from the audit collections (fallback before the backfill)"""
+    from services.audit_storage import all_collections
+
+    total = 0
+    counts = {"action": {}, "entity_type": {}, "admin": {}}
+    for name in await all_collections(db):
+        total += await db[name].estimated_document_count()
+        for source, target in DIMENSIONS.items():
+            pipeline = [{"$group": {"_id": f"${source}", "count": {"$sum": 1}}}]
+            async for item in db[name].aggregate(pipeline):
+                if item["_id"]:
+                    key = _counter_key(item["_id"])
+                    counts[target][key] = counts[target].get(key, 0) + item["count"]
+    return {
+        "total": total,
+        "by_action": _sorted_counts(counts["action"]),
+        "by_entity": _sorted_counts(counts["entity_type"]),
+        "by_admin": _sorted_counts(counts["admin"]),
+    }
+
+
+async def aggregate_series(
+    db,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    dimension: Optional[str] = None
+) -> List[dict]:
+    """Buckets aggregated from the audit collections (fallback before the backfill)"""
+    from services.audit_storage import partitions_for_range
+
+    # Whole buckets, like the rollup documents the series is read from otherwise
+    start = bucket_start(start, granularity)
+    stop = bucket_start(end, granularity) + (timedelta(hours=1) if granularity == "hour" else timedelta(days=1))
+    group_id = {"bucket": {"$dateToString": {"format": _BUCKET_FORMATS[granularity], "date": "$created_at"}}}
+    source = next((source for source, target in DIMENSIONS.items() if target == dimension), None)
+    if source:
+        group_id["key"] = f"${source}"
+    pipeline = [
+        {"$match": {"created_at": {"$gte": start, "$lt": stop}}},
+        {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+    ]
+    points: Dict[str, dict] = {}
+    for name in await partitions_for_range(db, start, stop):
+        async for item in db[name].aggregate(pipeline):
+            key = item["_id"]["bucket"]
+            point = points.get(key)
+            if point is None:
+                point = points[key] = {"bucket": datetime.strptime(key, _BUCKET_FORMATS[granularity]), "total": 0}
+                if dimension:
+                    point[dimension] = {}
+            point["total"] += item["count"]
+            if dimension and item["_id"].get("key"):
+                counter = _counter_key(item["_id"]["key"])
+                point[dimension][counter] = point[dimension].get(counter, 0) + item["count"]
+    return [points[key] for key in sorted(points)]
+
+
+async def backfill_rollups(db, batch_size: int = 1000) -> int:
+    """
+    Count audit entries written before rollups existed and record that the
+    backfill completed; returns the number counted
+    """
+    from services.audit_storage import all_collections
+
+    projection = {"_id": 1, "created_at": 1, **{field: 1 for field in DIMENSIONS}}
+    counted = 0
+    for name in await all_collections(db):
+        collection = db[name]
+        last_id = None
+        while True:
+            # Walk the _id index forward instead of rescanning from the start
+            query = {ROLLED_UP_FIELD: {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            docs = await collection.find(query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            last_id = docs[-1]["_id"]
+            # Mark only once counted: a failed rollup leaves the batch
+            # unmarked for the next run (a crash between the two steps
+            # counts one batch twice rather than losing it)
+            await apply_rollups(db, docs)
+            await collection.update_many(
+                {"_id": {"$in": [doc["_id"] for doc in docs]}},
+                {"$set": {ROLLED_UP_FIELD: True}}
+            )
+            counted += len(docs)
+            logger.info(f"Rolled up {counted} audit entries")
+    await db.schema_meta.update_one(
+        {"_id": BACKFILL_META_ID},
+        {"$set": {"completed_at": datetime.utcnow(), "counted": counted}},
+        upsert=True
+    )
+    return counted
+
+
+def main():
+    from dotenv import load_dotenv
+    from pathlib import Path
+    from services.mongo_client import create_mongo_client
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    parser = argparse.ArgumentParser(description="Audit log rollup maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Count audit entries written before rollups existed")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        return
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    async def run():
+        client = create_mongo_client(os.environ['MONGO_URL'])
+        try:
+            counted = await backfill_rollups(client[os.environ.get('DB_NAME', 'timelov_admin')])
+            print(f"Backfilled rollups for {counted} audit entries")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
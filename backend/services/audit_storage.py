@@ -0,0 +1,411 @@
+"""
+Time-partitioned audit log storage with retention and archival
+
+Audit entries are written to one collection per month (audit_logs_YYYYMM)
+so indexes stay small and old months can be dropped whole. Reads are
+routed to the partitions overlapping the requested date range, newest
+first; the original `audit_logs` collection is read as the oldest
+partition until its history has been archived.
+
+Months older than AUDIT_RETENTION_MONTHS are moved out of MongoDB by the
+archival job into gzip-compressed NDJSON files (Extended JSON, newest
+entry first) in AUDIT_ARCHIVE_DIR, which the export endpoint still reads.
+Archives older than AUDIT_ARCHIVE_RETENTION_MONTHS are deleted
+(0 keeps them forever). Archives hold the stored documents as they are
+(nested old/new values, text diffs, packed IPs), which Extended JSON keeps
+losslessly without a schema; flat columnar extracts for analysis come from
+the Parquet export (services/audit_analytics.py), which reads archives too.
+
+Run as a scheduled job:
+    python -m services.audit_storage --archive [--dry-run]
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import re
+import time
+
+from bson import json_util
+from bson.json_util import JSONOptions, JSONMode
+
+from services.indexes import INDEX_SPEC
+from services.mongo_client import COLLECTION_WRITE_CONCERNS
+
+logger = logging.getLogger(__name__)
+
+AUDIT_RETENTION_MONTHS = int(os.environ.get("AUDIT_RETENTION_MONTHS", "12"))
+AUDIT_ARCHIVE_RETENTION_MONTHS = int(os.environ.get("AUDIT_ARCHIVE_RETENTION_MONTHS", "0"))
+AUDIT_ARCHIVE_DIR = Path(os.environ.get("AUDIT_ARCHIVE_DIR", str(Path(__file__).parent.parent / "archive" / "audit_logs")))
+
+LEGACY_COLLECTION = "audit_logs"
+PARTITION_PREFIX = "audit_logs_"
+PARTITION_RE = re.compile(r"^audit_logs_(\d{6})$")
+ARCHIVE_RE = re.compile(r"^audit_logs_(\d{6})(?:\.legacy)?\.ndjson\.gz$")
+# How long the list of existing partitions is trusted before re-reading it
+PARTITION_CACHE_SECONDS = 60
+ARCHIVE_READ_CHUNK = 1000
+# Newest first; entries sharing a (millisecond) timestamp are ordered by id
+# so keyset cursors never skip or repeat them
+ENTRY_SORT = [("created_at", -1), ("id", -1)]
+
+_EPOCH = datetime(1970, 1, 1)
+
+_JSON_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=False)
+
+_partitions: Set[str] = set()
+_partitions_loaded_at = 0.0
+_legacy_present = True
+_indexed: Set[str] = set()
+
+
+# ═══════════════════════════════════════
+# PARTITION NAMES
+# ═══════════════════════════════════════
+
+def month_key(when: datetime) -> str:
+    return f"{when:%Y%m}"
+
+
+def partition_name(when: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month_key(when)}"
+
+
+def _month_start(key: str) -> datetime:
+    return datetime(int(key[:4]), int(key[4:]), 1)
+
+
+def _add_months(when: datetime, months: int) -> datetime:
+    index = when.year * 12 + when.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def retention_cutoff(now: Optional[datetime] = None, months: int = AUDIT_RETENTION_MONTHS) -> datetime:
+    """Start of the oldest month kept in MongoDB"""
+    now = now or datetime.utcnow()
+    return _add_months(datetime(now.year, now.month, 1), -(months - 1))
+
+
+def partition_collection(db, name: str):
+    """Partition handle with the audit log write concern"""
+    return db.get_collection(name, write_concern=COLLECTION_WRITE_CONCERNS.get(LEGACY_COLLECTION))
+
+
+async def _refresh_partitions(db, force: bool = False):
+    global _partitions_loaded_at, _legacy_present
+    if not force and time.monotonic() - _partitions_loaded_at < PARTITION_CACHE_SECONDS:
+        return
+    names = await db.list_collection_names(filter={"name": {"$regex": r"^audit_logs(_\d{6})?$"}})
+    _partitions.clear()
+    _partitions.update(name for name in names if PARTITION_RE.match(name))
+    _legacy_present = LEGACY_COLLECTION in names
+    _partitions_loaded_at = time.monotonic()
+
+
+async def partitions_for_range(
+    db,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[str]:
+    """Collections holding entries in [start, end], newest first (legacy last)"""
+    await _refresh_partitions(db)
+    low = month_key(start) if start else "000000"
+    high = month_key(end) if end else "999999"
+    # The current month may have been created by another worker since the
+    # last refresh; querying a missing collection is cheap
+    candidates = _partitions | {partition_name(datetime.utcnow())}
+    names = sorted(
+        (name for name in candidates if low <= PARTITION_RE.match(name).group(1) <= high),
+        reverse=True
+    )
+    if _legacy_present:
+        names.append(LEGACY_COLLECTION)
+    return names
+
+
+async def ensure_partition(db, name: str):
+    """Create a partition's indexes (once per worker) before writing to it"""
+    if name in _indexed:
+        return
+    await db[name].create_indexes(INDEX_SPEC[LEGACY_COLLECTION])
+    _indexed.add(name)
+    _partitions.add(name)
+
+
+# ═══════════════════════════════════════
+# WRITES
+# ═══════════════════════════════════════
+
+def group_by_partition(docs: List[dict]) -> Dict[str, List[dict]]:
+    groups: Dict[str, List[dict]] = {}
+    for doc in docs:
+        created_at = doc.get("created_at") or datetime.utcnow()
+        groups.setdefault(partition_name(created_at), []).append(doc)
+    return groups
+
+
+# ═══════════════════════════════════════
+# READS
+# ═══════════════════════════════════════
+
+def entry_cursor(entry: dict) -> str:
+    """Keyset cursor after an entry: "<created_at in ms>_<id>" """
+    millis = (entry["created_at"] - _EPOCH) // timedelta(milliseconds=1)
+    return f"{millis}_{entry.get('id', '')}"
+
+
+def parse_entry_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(created_at, id) of a cursor; raises ValueError when malformed"""
+    millis, separator, entry_id = cursor.partition("_")
+    if not separator:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return _EPOCH + timedelta(milliseconds=int(millis)), entry_id
+
+
+def date_filter(start: Optional[datetime], end: Optional[datetime]) -> dict:
+    created_at = {}
+    if start:
+        created_at["$gte"] = start
+    if end:
+        created_at["$lte"] = end
+    return {"created_at": created_at} if created_at else {}
+
+
+async def find_entries(
+    db,
+    query: dict,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 100,
+    projection: Optional[dict] = None,
+    before: Optional[Tuple[datetime, str]] = None
+) -> List[dict]:
+    """
+    Entries matching `query` in [start, end], in ENTRY_SORT order, after the
+    keyset cursor `before` (created_at, id) if given. Partitions are
+    disjoint and ordered, so results are concatenated partition by
+    partition; partitions wholly covered by `skip` are skipped by a count
+    bounded by `skip` (keep it small; page deep with `before`).
+    """
+    query = {**query, **date_filter(start, end)}
+    if before is not None:
+        before_at, before_id = before
+        query["$or"] = [
+            {"created_at": {"$lt": before_at}},
+            {"created_at": before_at, "id": {"$lt": before_id}},
+        ]
+        end = min(end, before_at) if end else before_at
+    results: List[dict] = []
+    for name in await partitions_for_range(db, start, end):
+        need = limit - len(results)
+        if need <= 0:
+            break
+        docs = await db[name].find(query, projection).sort(ENTRY_SORT).skip(skip).limit(need).to_list(need)
+        if not docs and skip:
+            skip = max(0, skip - await db[name].count_documents(query, limit=skip))
+            continue
+        skip = 0
+        results.extend(docs)
+    return results
+
+
+async def iter_entries(
+    db,
+    query: dict,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    projection: Optional[dict] = None,
+    include_archives: bool = False
+) -> AsyncIterator[dict]:
+    """Stream entries in [start, end], newest first, optionally continuing into the archives"""
+    query = {**query, **date_filter(start, end)}
+    for name in await partitions_for_range(db, start, end):
+        async for doc in db[name].find(query, projection).sort("created_at", -1):
+            yield doc
+    if include_archives:
+        async for doc in iter_archived_entries(start, end):
+            yield doc
+
+
+async def all_collections(db) -> List[str]:
+    """Every audit collection (partitions newest first, then legacy)"""
+    await _refresh_partitions(db, force=True)
+    return await partitions_for_range(db)
+
+
+# ═══════════════════════════════════════
+# ARCHIVES
+# ═══════════════════════════════════════
+
+def archive_files(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Path]:
+    """Archive files overlapping [start, end], newest month first"""
+    if not AUDIT_ARCHIVE_DIR.is_dir():
+        return []
+    low = month_key(start) if start else "000000"
+    high = month_key(end) if end else "999999"
+    files = []
+    for path in AUDIT_ARCHIVE_DIR.iterdir():
+        match = ARCHIVE_RE.match(path.name)
+        if match and low <= match.group(1) <= high:
+            files.append((match.group(1), ".legacy" not in path.name, path))
+    # Newest month first; within a month the partition file precedes the
+    # legacy one (legacy entries predate partitioning)
+    return [path for _, _, path in sorted(files, reverse=True)]
+
+
+def _read_archive_chunks(path: Path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        chunk = []
+        for line in f:
+            chunk.append(json_util.loads(line, json_options=_JSON_OPTIONS))
+            if len(chunk) >= ARCHIVE_READ_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+async def iter_archived_entries(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> AsyncIterator[dict]:
+    """Stream archived entries in [start, end], newest first (file reads off the event loop)"""
+    for path in archive_files(start, end):
+        chunks = _read_archive_chunks(path)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            for doc in chunk:
+                created_at = doc.get("created_at")
+                if start and created_at and created_at < start:
+                    continue
+                if end and created_at and created_at > end:
+                    continue
+                yield doc
+
+
+def _count_lines(path: Path) -> int:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def _fsync(path: Path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+async def _archive_query(db, collection: str, query: dict, path: Path, dry_run: bool) -> int:
+    """Write matching entries to `path` (newest first); returns how many were written"""
+    if dry_run:
+        count = await db[collection].count_documents(query)
+        if count:
+            logger.info(f"[dry-run] would archive {count} entries from {collection} to {path.name}")
+        return count
+
+    tmp = path.with_name(path.name + ".tmp")
+    out = await asyncio.to_thread(gzip.open, tmp, "wt", encoding="utf-8")
+    count = 0
+    try:
+        lines = []
+        async for doc in db[collection].find(query).sort("created_at", -1):
+            lines.append(json_util.dumps(doc, json_options=_JSON_OPTIONS) + "\n")
+            if len(lines) >= ARCHIVE_READ_CHUNK:
+                await asyncio.to_thread(out.write, "".join(lines))
+                count += len(lines)
+                lines = []
+        if lines:
+            await asyncio.to_thread(out.write, "".join(lines))
+            count += len(lines)
+    finally:
+        await asyncio.to_thread(out.close)
+
+    if count == 0:
+        tmp.unlink()
+        return 0
+    # Only remove from MongoDB what was verifiably written
+    written = await asyncio.to_thread(_count_lines, tmp)
+    if written != count:
+        raise RuntimeError(f"Archive {tmp} has {written} entries, expected {count}")
+    await asyncio.to_thread(_fsync, tmp)
+    os.replace(tmp, path)
+    logger.info(f"Archived {count} entries from {collection} to {path}")
+    return count
+
+
+async def archive_expired(db, now: Optional[datetime] = None, dry_run: bool = False) -> Dict[str, int]:
+    """Move months older than the retention window from MongoDB into archive files"""
+    cutoff = retention_cutoff(now)
+    AUDIT_ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    archived: Dict[str, int] = {}
+    collections = await all_collections(db)
+
+    for name in collections:
+        match = PARTITION_RE.match(name)
+        if not match or _month_start(match.group(1)) >= cutoff:
+            continue
+        path = AUDIT_ARCHIVE_DIR / f"{name}.ndjson.gz"
+        count = await _archive_query(db, name, {}, path, dry_run)
+        if not dry_run:
+            await db[name].drop()
+            _partitions.discard(name)
+            _indexed.discard(name)
+        archived[name] = count
+
+    if LEGACY_COLLECTION in collections:
+        # Split pre-partitioning history into monthly archives as it expires
+        oldest = await db[LEGACY_COLLECTION].find_one({}, {"created_at": 1}, sort=[("created_at", 1)])
+        month = datetime(oldest["created_at"].year, oldest["created_at"].month, 1) if oldest else cutoff
+        while month < cutoff:
+            next_month = _add_months(month, 1)
+            query = {"created_at": {"$gte": month, "$lt": next_month}}
+            path = AUDIT_ARCHIVE_DIR / f"{partition_name(month)}.legacy.ndjson.gz"
+            count = await _archive_query(db, LEGACY_COLLECTION, query, path, dry_run)
+            if count and not dry_run:
+                await db[LEGACY_COLLECTION].delete_many(query)
+            if count:
+                archived[f"{LEGACY_COLLECTION}:{month_key(month)}"] = count
+            month = next_month
+
+    if AUDIT_ARCHIVE_RETENTION_MONTHS > 0:
+        archive_cutoff = month_key(retention_cutoff(now, AUDIT_ARCHIVE_RETENTION_MONTHS))
+        for path in archive_files():
+            if ARCHIVE_RE.match(path.name).group(1) < archive_cutoff:
+                logger.info(f"{'[dry-run] would delete' if dry_run else 'Deleting'} expired archive {path.name}")
+                if not dry_run:
+                    path.unlink()
+    return archived
+
+
+def main():
+    from dotenv import load_dotenv
+    from services.mongo_client import create_mongo_client
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    parser = argparse.ArgumentParser(description="Audit log retention and archival")
+    parser.add_argument("--archive", action="store_true", help="Archive months older than AUDIT_RETENTION_MONTHS")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be archived")
+    args = parser.parse_args()
+    if not args.archive:
+        parser.print_help()
+        return
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    async def run():
+        client = create_mongo_client(os.environ['MONGO_URL'])
+        try:
+            archived = await archive_expired(client[os.environ.get('DB_NAME', 'timelov_admin')], dry_run=args.dry_run)
+            print(f"Archived: {archived or 'nothing to archive'}")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
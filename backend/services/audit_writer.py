@@ -0,0 +1,120 @@
+"""Background audit log writer - batches audit entries off the request path"""
+from typing import Optional
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError
+
+from services.audit_codec import encode_entry, user_agents
+from services.audit_rollups import apply_rollups, ROLLED_UP_FIELD
+from services.event_bus import event_bus
+from services.audit_storage import ensure_partition, group_by_partition, partition_collection
+from services.metrics import AUDIT_WRITER_BACKLOG, AUDIT_WRITER_WRITTEN, AUDIT_WRITER_FAILURES
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = 10_000
+AUDIT_BATCH_SIZE = 200
+
+
+class AuditWriter:
+    """
+    Queues audit log documents and writes them with insert_many from a
+    single background task. When the writer is not running, or the queue
+    is full, entries are written inline so nothing is dropped.
+    """
+
+    def __init__(self, queue_size: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.db = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def backlog(self) -> int:
+        """Number of entries waiting to be written"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self, db):
+        """Start the background writer (call from lifespan startup)"""
+        self.db = db
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush queued entries and stop the writer (call from lifespan shutdown)"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def write(self, doc: dict):
+        """Queue an audit log document for writing and publish it to live streams"""
+        event_bus.publish_audit(doc)
+        # Compact before queuing: queued entries hold diffs, not full bodies
+        await encode_entry(doc)
+        if self._task is not None:
+            try:
+                self._queue.put_nowait(doc)
+                return
+            except asyncio.QueueFull:
+                logger.warning("Audit writer queue full, writing inline")
+        await self._insert([doc])
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._insert(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _insert(self, docs: list):
+        for doc in docs:
+            doc[ROLLED_UP_FIELD] = True
+        try:
+            # Dictionary entries first, so every stored user_agent_id resolves
+            await user_agents.flush(self.db)
+        except Exception as e:
+            logger.error(f"Failed to save audit user agents: {e}")
+        written = []
+        # One insert_many per monthly partition (a batch rarely spans two)
+        for name, partition_docs in group_by_partition(docs).items():
+            written.extend(await self._insert_partition(name, partition_docs))
+        if not written:
+            return
+        try:
+            await apply_rollups(self.db, written)
+        except Exception as e:
+            logger.error(f"Failed to update audit rollups for {len(written)} log(s): {e}")
+
+    async def _insert_partition(self, name: str, docs: list) -> list:
+        """Insert into one partition; returns the documents actually written"""
+        try:
+            await ensure_partition(self.db, name)
+            await partition_collection(self.db, name).insert_many(docs, ordered=False)
+            AUDIT_WRITER_WRITTEN.inc(len(docs))
+            return docs
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            AUDIT_WRITER_WRITTEN.inc(len(docs) - len(failed))
+            AUDIT_WRITER_FAILURES.inc(len(failed))
+            logger.error(f"Failed to write {len(failed)} audit log(s): {e}")
+            return [doc for i, doc in enumerate(docs) if i not in failed]
+        except Exception as e:
+            AUDIT_WRITER_FAILURES.inc(len(docs))
+            logger.error(f"Failed to write {len(docs)} audit log(s): {e}")
+            return []
+
+
+audit_writer = AuditWriter()
+AUDIT_WRITER_BACKLOG.set_function(lambda: audit_writer.backlog)
@@ -1,11 +1,16 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import secrets
+import threading
 import os
 import logging
 
+from services.metrics import BCRYPT_QUEUE_DEPTH, BCRYPT_IN_FLIGHT
+
 logger = logging.getLogger(__name__)
 
 # Password hashing configuration
@@ -23,6 +28,34 @@ REMEMBER_ME_EXPIRE_DAYS = 30
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION_MINUTES = 15
 
+# bcrypt at 12 rounds takes ~250ms of CPU; run it off the event loop
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", "4"))
+_password_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+
+async def run_password_task(func: Callable[..., Any], *args) -> Any:
+    """Run a bcrypt hash/verify call in the password executor"""
+    BCRYPT_QUEUE_DEPTH.inc()
+    BCRYPT_IN_FLIGHT.inc()
+    # Whoever takes this first leaves the queue: the task when it starts, or
+    # the finally below for a request cancelled while its job was queued
+    # (the executor drops a cancelled job without running it)
+    started = threading.Lock()
+
+    def leave_queue():
+        if started.acquire(blocking=False):
+            BCRYPT_QUEUE_DEPTH.dec()
+
+    def task():
+        leave_queue()
+        return func(*args)
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, task)
+    finally:
+        leave_queue()
+        BCRYPT_IN_FLIGHT.dec()
+
 
 class AuthService:
     """Service for handling authentication operations"""
@@ -41,6 +74,16 @@ class AuthService:
             logger.error(f"Password verification error: {e}")
             return False
     
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Hash a password in the bcrypt executor"""
+        return await run_password_task(AuthService.hash_password, password)
+    
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verify a password in the bcrypt executor"""
+        return await run_password_task(AuthService.verify_password, plain_password, hashed_password)
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token"""
@@ -131,39 +174,25 @@ class AuthService:
         return failed_attempts >= MAX_LOGIN_ATTEMPTS
 
 
-# Email mock service (simulates sending emails to console)
+# Email mock service (simulates sending emails via the log)
 class EmailService:
-    """Mock email service - prints to console instead of sending"""
+    """Mock email service - logs instead of sending"""
     
     @staticmethod
     def send_password_reset_email(email: str, reset_token: str, reset_url: str):
-        """Mock: Send password reset email (prints to console)"""
-        logger.info("="*60)
-        logger.info("[MOCK EMAIL] Password Reset Request")
-        logger.info(f"To: {email}")
-        logger.info(f"Subject: Reset your password - TimeLov Admin")
-        logger.info(f"")
-        logger.info(f"Click the link below to reset your password:")
-        logger.info(f"{reset_url}?token={reset_token}")
-        logger.info(f"")
-        logger.info(f"This link expires in 1 hour.")
-        logger.info(f"If you didn't request this, ignore this email.")
-        logger.info("="*60)
-        print(f"\n[MOCK EMAIL] Password reset link sent to {email}")
-        print(f"Reset URL: {reset_url}?token={reset_token}\n")
+        """Mock: Send password reset email (logs a single line)"""
+        logger.info(
+            "[MOCK EMAIL] Password reset to=%s subject=%r link=%s?token=%s expires_in=1h",
+            email, "Reset your password - TimeLov Admin", reset_url, reset_token
+        )
         return True
     
     @staticmethod
     def send_login_alert_email(email: str, ip_address: str, user_agent: str):
-        """Mock: Send login alert email (prints to console)"""
-        logger.info("="*60)
-        logger.info("[MOCK EMAIL] New Login Alert")
-        logger.info(f"To: {email}")
-        logger.info(f"Subject: New login to your TimeLov Admin account")
-        logger.info(f"")
-        logger.info(f"A new login was detected:")
-        logger.info(f"IP Address: {ip_address}")
-        logger.info(f"Device: {user_agent}")
-        logger.info(f"Time: {datetime.utcnow().isoformat()}")
-        logger.info("="*60)
+        """Mock: Send login alert email (logs a single line)"""
+        logger.info(
+            "[MOCK EMAIL] Login alert to=%s subject=%r ip=%s device=%r time=%s",
+            email, "New login to your TimeLov Admin account", ip_address, user_agent,
+            datetime.utcnow().isoformat()
+        )
         return True
@@ -0,0 +1,51 @@
+"""Branding CSS service - CSS variables generated from live site settings"""
+from typing import Optional, Tuple
+import logging
+
+from templates.css_templates import generate_css_variables
+
+logger = logging.getLogger(__name__)
+
+# Single-slot cache: only the current settings version is ever useful
+_EMPTY = object()
+_css_variables_cache: dict = {"version": _EMPTY, "css": None}
+css_variables_cache_stats = {"hits": 0, "misses": 0}
+
+
+def settings_version(settings_doc: Optional[dict]) -> Optional[int]:
+    """
+    Version of the settings document: None when there is no document,
+    0 for documents written before versioning (new ones start at 1)
+    """
+    if not settings_doc:
+        return None
+    return settings_doc.get("version", 0)
+
+
+def get_css_variables_for_version(branding: Optional[dict], version: Optional[int]) -> str:
+    """Return the `:root {}` block for a settings version, formatting it once"""
+    if _css_variables_cache["version"] == version and _css_variables_cache["css"] is not None:
+        css_variables_cache_stats["hits"] += 1
+        return _css_variables_cache["css"]
+
+    css_variables_cache_stats["misses"] += 1
+    css = generate_css_variables(branding)
+    _css_variables_cache["version"] = version
+    _css_variables_cache["css"] = css
+    return css
+
+
+async def get_branding_css_variables(db) -> Tuple[str, Optional[int]]:
+    """Get CSS variables for the stored branding settings and the settings version
+
+    Only the branding section and version counter are read, so the lookup stays
+    cheap; the CSS itself is formatted once per settings version.
+    """
+    settings_doc = await db.site_settings.find_one(
+        {"_type": "complete_settings"},
+        {"_id": 0, "branding": 1, "version": 1}
+    )
+
+    version = settings_version(settings_doc)
+    branding = settings_doc.get("branding") if settings_doc else None
+    return get_css_variables_for_version(branding, version), version
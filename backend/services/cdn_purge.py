@@ -0,0 +1,158 @@
+"""
+CDN purge by surrogate key
+
+Write routes name the surrogate keys their change affects (see
+middleware/cache_policy.py); keys are collected and sent to the purge
+backend in batches from a background task, so a write never waits on the
+CDN. A failed purge is retried on the next flush; the responses' short
+s-maxage bounds staleness if the CDN stays unreachable.
+
+Backends are pluggable (set_purge_backend). With CDN_PURGE_URL set, keys
+are POSTed as JSON ({"surrogate_keys": [...], "tags": [...]}) with a
+Surrogate-Key header, which a small adapter or the local stand-in
+(python -m benchmarks.purge_endpoint) can accept.
+"""
+from typing import Callable, Iterable, List, Optional, Set
+import asyncio
+import logging
+import os
+
+import requests
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+CDN_PURGE_URL = os.environ.get("CDN_PURGE_URL", "")
+CDN_PURGE_TOKEN = os.environ.get("CDN_PURGE_TOKEN", "")
+# Writes arriving within this window are purged in one request; it also
+# gives every worker time to drop its cached public reads first (see
+# PUBLIC_READ_VERSION_CHECK_SECONDS in services/single_flight.py)
+CDN_PURGE_BATCH_SECONDS = float(os.environ.get("CDN_PURGE_BATCH_SECONDS", "0.5"))
+CDN_PURGE_TIMEOUT_SECONDS = float(os.environ.get("CDN_PURGE_TIMEOUT_SECONDS", "5"))
+MAX_KEYS_PER_REQUEST = 256
+MAX_PENDING_KEYS = 10_000
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class NullPurgeBackend:
+    """No CDN configured: purges are only logged"""
+
+    async def purge(self, keys: List[str]):
+        logger.debug(f"CDN purge (no backend): {keys}")
+
+
+class HttpPurgeBackend:
+    """POST the keys to a purge endpoint"""
+
+    def __init__(self, url: str, token: str = "", timeout: float = CDN_PURGE_TIMEOUT_SECONDS):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def _post(self, keys: List[str]):
+        headers = {"Surrogate-Key": " ".join(keys)}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        response = requests.post(
+            self.url,
+            json={"surrogate_keys": keys, "tags": keys},
+            headers=headers,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    async def purge(self, keys: List[str]):
+        await asyncio.to_thread(self._post, keys)
+
+
+def create_purge_backend():
+    """Backend selected by CDN_PURGE_URL"""
+    if CDN_PURGE_URL:
+        return HttpPurgeBackend(CDN_PURGE_URL, CDN_PURGE_TOKEN)
+    return NullPurgeBackend()
+
+
+class CdnPurger:
+    """Collects surrogate keys and flushes them to the backend in batches"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_purge_backend()
+        self._pending: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"purged_keys": 0, "requests": 0, "failures": 0}
+
+    def set_backend(self, backend):
+        self.backend = backend
+
+    def start(self):
+        """Start the background flusher (lifespan startup)"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush pending keys and stop (lifespan shutdown)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    def purge(self, *keys: str):
+        """Schedule keys for purging; returns immediately"""
+        if self._task is None:
+            return
+        if len(self._pending) + len(keys) > MAX_PENDING_KEYS:
+            logger.warning("CDN purge backlog full, dropping keys")
+            return
+        self._pending.update(keys)
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(CDN_PURGE_BATCH_SECONDS)
+            self._wakeup.clear()
+            if not await self.flush():
+                # Backend down: keep the keys and back off before retrying
+                await asyncio.sleep(CDN_PURGE_BATCH_SECONDS * 10)
+                self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Send all pending keys now; returns False if a request failed"""
+        keys = sorted(self._pending)
+        self._pending.clear()
+        for start in range(0, len(keys), MAX_KEYS_PER_REQUEST):
+            batch = keys[start:start + MAX_KEYS_PER_REQUEST]
+            try:
+                await self.backend.purge(batch)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error(f"CDN purge failed for {len(batch)} keys: {e}")
+                self._pending.update(keys[start:])
+                return False
+            self.stats["requests"] += 1
+            self.stats["purged_keys"] += len(batch)
+        return True
+
+
+cdn_purger = CdnPurger()
+
+
+def set_purge_backend(backend):
+    """Replace the purge backend (e.g. a provider-specific client)"""
+    cdn_purger.set_backend(backend)
+
+
+def purge_on_write(keys_for: Callable[[Request], Iterable[str]]):
+    """Router dependency: purge the keys named by `keys_for` after a successful write"""
+    async def dependency(request: Request):
+        yield
+        if request.method not in SAFE_METHODS:
+            cdn_purger.purge(*keys_for(request))
+    return dependency
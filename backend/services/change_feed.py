@@ -0,0 +1,252 @@
+"""
+Incremental change feed over the content collections
+
+Consumers (edge caches, the admin SPA) keep an opaque cursor and ask for
+the changes after it, so they do work proportional to the number of
+changes rather than re-fetching whole collections.
+
+On a replica set the feed is one MongoDB change stream over posts, pages,
+widgets, integrations and site_settings, and the cursor is its resume
+token. A standalone server has no change streams, so the feed falls back
+to polling the `(updated_at, _id)` indexes; the cursor is then the last
+change seen ("t<milliseconds>_<collection>/<_id>"), so changes sharing a
+timestamp are never skipped or split badly across pages. `updated_at` is
+set before a write commits, so a slow write can become visible after a
+faster one with a later timestamp; polling only returns changes older
+than CHANGE_FEED_POLL_LAG_MS, which leaves in-flight writes time to
+commit. Polling cannot see hard deletes (integrations are deleted
+outright) - consumers that need them should run against a replica set.
+
+Delete events carry the entity id only if pre-images are enabled on the
+collection (collMod changeStreamPreAndPostImages, MongoDB 6.0+);
+otherwise the MongoDB _id is reported.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# "auto": change streams when available, else polling
+CHANGE_FEED_MODE = os.environ.get("CHANGE_FEED_MODE", "auto")
+# How long a change stream read waits for new events before returning
+CHANGE_STREAM_AWAIT_MS = int(os.environ.get("CHANGE_STREAM_AWAIT_MS", "200"))
+# Polling skips changes newer than this; a write must commit within it
+CHANGE_FEED_POLL_LAG_MS = int(os.environ.get("CHANGE_FEED_POLL_LAG_MS", "1000"))
+
+# collection -> entity type reported in the feed
+FEED_COLLECTIONS: Dict[str, str] = {
+    "posts": "post",
+    "pages": "page",
+    "widgets": "widget",
+    "integrations": "integration",
+    "site_settings": "settings",
+}
+
+POLLING_CURSOR_PREFIX = "t"
+POLLING_SORT = [("updated_at", 1), ("_id", 1)]
+_COLLECTION_RANKS = {collection: rank for rank, collection in enumerate(FEED_COLLECTIONS)}
+
+# Change streams are not supported (standalone server)
+_NO_CHANGE_STREAMS = 40573
+# Resume token is invalid, or too old for the oplog
+_LOST_HISTORY_CODES = (260, 280, 286)
+
+_OPERATIONS = {"insert": "create", "update": "update", "replace": "update", "delete": "delete"}
+
+_STREAM_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": list(FEED_COLLECTIONS)},
+        "operationType": {"$in": list(_OPERATIONS)},
+    }},
+    {"$project": {
+        "operationType": 1, "ns": 1, "documentKey": 1, "clusterTime": 1, "wallTime": 1,
+        "fullDocument.id": 1, "fullDocument._type": 1, "fullDocument.version": 1,
+        "fullDocument.updated_at": 1, "fullDocument.deleted_at": 1,
+        "fullDocumentBeforeChange.id": 1, "fullDocumentBeforeChange._type": 1,
+    }},
+]
+
+
+class ChangeFeedExpired(Exception):
+    """The cursor can no longer be resumed; the consumer must resync"""
+
+
+def _entity_id(doc: Optional[dict], document_key: dict) -> str:
+    doc = doc or {}
+    return str(doc.get("id") or doc.get("_type") or document_key.get("_id"))
+
+
+def _to_millis(value: datetime) -> int:
+    return int((value - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _from_millis(millis: int) -> datetime:
+    return datetime.utcfromtimestamp(millis / 1000)
+
+
+def _polling_cursor(after: datetime, collection: Optional[str] = None, key: Any = None) -> str:
+    """Cursor after (updated_at, collection, _id); no collection: after every change at `after`"""
+    cursor = f"{POLLING_CURSOR_PREFIX}{_to_millis(after)}"
+    return f"{cursor}_{collection}/{key}" if collection else cursor
+
+
+def _parse_polling_cursor(cursor: str) -> Tuple[datetime, Optional[str], Any]:
+    """(updated_at, collection, _id) of a polling cursor; raises ValueError when malformed"""
+    millis, separator, position = cursor[len(POLLING_CURSOR_PREFIX):].partition("_")
+    after = _from_millis(int(millis))
+    if not separator:
+        # Timestamp-only cursor (earlier format)
+        return after, None, None
+    collection, separator, key = position.partition("/")
+    if not separator or collection not in FEED_COLLECTIONS:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return after, collection, ObjectId(key) if ObjectId.is_valid(key) else key
+
+
+def _polling_query(
+    collection: str,
+    after: datetime,
+    after_collection: Optional[str],
+    after_key: Any,
+    settled: datetime
+) -> dict:
+    """
+    Documents of `collection` after the cursor position, in POLLING_SORT
+    order with ties between collections broken by FEED_COLLECTIONS order,
+    up to `settled`
+    """
+    if after_collection is None or _COLLECTION_RANKS[collection] < _COLLECTION_RANKS[after_collection]:
+        return {"updated_at": {"$gt": after, "$lte": settled}}
+    if collection != after_collection:
+        return {"updated_at": {"$gte": after, "$lte": settled}}
+    return {
+        "updated_at": {"$gte": after, "$lte": settled},
+        "$or": [{"updated_at": {"$gt": after}}, {"_id": {"$gt": after_key}}],
+    }
+
+
+def _stream_change(event: dict) -> dict:
+    collection = event["ns"]["coll"]
+    doc = event.get("fullDocument")
+    operation = _OPERATIONS[event["operationType"]]
+    if operation == "update" and (doc or {}).get("deleted_at") is not None:
+        # Soft delete (deleted_at set)
+        operation = "delete"
+    if operation == "delete" and doc is None:
+        doc = event.get("fullDocumentBeforeChange")
+    cluster_time = event["clusterTime"]
+    return {
+        "type": FEED_COLLECTIONS[collection],
+        "id": _entity_id(doc, event["documentKey"]),
+        "operation": operation,
+        # Monotonic across the feed: cluster time as a 64-bit integer
+        "version": (cluster_time.time << 32) | cluster_time.inc,
+        "timestamp": event.get("wallTime") or datetime.utcfromtimestamp(cluster_time.time),
+    }
+
+
+def _polled_change(collection: str, doc: dict) -> dict:
+    operation = "update"
+    if doc.get("deleted_at") is not None:
+        operation = "delete"
+    elif doc.get("created_at") is not None and doc.get("created_at") == doc.get("updated_at"):
+        operation = "create"
+    return {
+        "type": FEED_COLLECTIONS[collection],
+        "id": _entity_id(doc, {"_id": doc.get("_id")}),
+        "operation": operation,
+        # Polling mode: updated_at in milliseconds
+        "version": _to_millis(doc["updated_at"]),
+        "timestamp": doc["updated_at"],
+    }
+
+
+class ChangeFeed:
+    """Reads changes after a cursor, from change streams or by polling"""
+
+    def __init__(self, mode: str = CHANGE_FEED_MODE):
+        self.mode = mode
+        self.db = None
+
+    def set_db(self, db):
+        self.db = db
+
+    async def read(self, since: Optional[str], limit: int) -> Tuple[List[dict], str, bool]:
+        """
+        Changes after `since` (None: start from now). Returns (changes,
+        next cursor, whether more changes are already available).
+        """
+        polling_cursor = since is not None and since.startswith(POLLING_CURSOR_PREFIX)
+        if self.mode != "polling" and not polling_cursor:
+            try:
+                return await self._read_stream(since, limit)
+            except OperationFailure as e:
+                if e.code in _LOST_HISTORY_CODES:
+                    raise ChangeFeedExpired(str(e))
+                if e.code != _NO_CHANGE_STREAMS or self.mode == "change_stream":
+                    raise
+                logger.info("Change streams unavailable (standalone MongoDB), using updated_at polling")
+                self.mode = "polling"
+                if since is not None:
+                    raise ChangeFeedExpired("Change stream cursor given but change streams are unavailable")
+        return await self._read_polling(since, limit)
+
+    async def _read_stream(self, since: Optional[str], limit: int) -> Tuple[List[dict], str, bool]:
+        changes = []
+        async with self.db.watch(
+            _STREAM_PIPELINE,
+            full_document="updateLookup",
+            full_document_before_change="whenAvailable",
+            resume_after={"_data": since} if since else None,
+            max_await_time_ms=CHANGE_STREAM_AWAIT_MS,
+        ) as stream:
+            while len(changes) < limit:
+                event = await stream.try_next()
+                if event is None:
+                    break
+                changes.append(_stream_change(event))
+            has_more = len(changes) >= limit
+            return changes, stream.resume_token["_data"], has_more
+
+    async def _read_polling(self, since: Optional[str], limit: int) -> Tuple[List[dict], str, bool]:
+        # Writes older than the lag have committed; newer ones may still be in flight
+        settled = _from_millis(_to_millis(datetime.utcnow()) - CHANGE_FEED_POLL_LAG_MS)
+        if since is None:
+            return [], _polling_cursor(settled), False
+        try:
+            after, after_collection, after_key = _parse_polling_cursor(since)
+        except ValueError:
+            raise ChangeFeedExpired(f"Invalid cursor: {since}")
+
+        projection = {"_id": 1, "id": 1, "_type": 1, "created_at": 1, "updated_at": 1, "deleted_at": 1}
+        results = await asyncio.gather(*(
+            self.db[collection].find(
+                _polling_query(collection, after, after_collection, after_key, settled), projection
+            ).sort(POLLING_SORT).limit(limit + 1).to_list(limit + 1)
+            for collection in FEED_COLLECTIONS
+        ))
+        # Each collection's documents are already in _id order within a timestamp
+        docs = sorted(
+            (
+                (doc["updated_at"], _COLLECTION_RANKS[collection], position, collection, doc)
+                for collection, collection_docs in zip(FEED_COLLECTIONS, results)
+                for position, doc in enumerate(collection_docs)
+            ),
+            key=lambda item: item[:3]
+        )
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if not docs:
+            return [], since, False
+        *_, last_collection, last = docs[-1]
+        next_cursor = _polling_cursor(last["updated_at"], last_collection, last["_id"])
+        return [_polled_change(item[3], item[4]) for item in docs], next_cursor, has_more
+
+
+change_feed = ChangeFeed()
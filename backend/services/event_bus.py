@@ -0,0 +1,191 @@
+"""
+In-process event bus for live admin updates (Server-Sent Events)
+
+Every audit entry queued by services.audit_writer is published here as an
+"audit" event and, when it concerns a content entity, as a "change" event
+(entity type, id, action), so the dashboard and audit log views can
+update incrementally instead of re-running their queries.
+
+Each stream subscribes with a bounded queue. Publishing never waits: when
+a subscriber falls behind (slow network, stalled tab) its queue fills up,
+further events for it are dropped and it receives one "resync" event
+telling the client to re-fetch. The number of streams per worker is
+capped (SSE_MAX_STREAMS).
+
+The bus is per worker. With several workers (WEB_CONCURRENCY > 1) a relay
+also tails the audit log partitions so entries written by other workers reach this
+worker's streams; already-published ids are skipped.
+"""
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Optional, Set
+import asyncio
+import logging
+import os
+
+from services.audit_storage import find_entries
+
+logger = logging.getLogger(__name__)
+
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", "50"))
+SSE_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", "100"))
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RELAY_SECONDS = float(os.environ.get("SSE_RELAY_SECONDS", "2"))
+SSE_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# Audit entries are queued before they are written, so the relay re-reads
+# a little before its watermark and de-duplicates by id
+RELAY_OVERLAP = timedelta(seconds=5)
+RECENT_IDS = 10_000
+
+CONTENT_ENTITY_TYPES = frozenset(("page", "post", "widget", "integration", "setting"))
+
+
+class StreamLimitReached(Exception):
+    """The worker already serves SSE_MAX_STREAMS streams"""
+
+
+class Subscription:
+    """One stream's bounded event queue"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+        self.closed = False
+
+    def offer(self, event: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Next event, or None on timeout (time for a heartbeat)"""
+        if self.overflowed and self.queue.empty():
+            self.overflowed = False
+            return {"event": "resync", "data": {"reason": "Zbyt wiele zdarzeń, odśwież dane"}}
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _value(value):
+    # Queued documents still hold enum members; stored ones hold plain strings
+    return getattr(value, "value", value)
+
+
+def audit_events(doc: dict) -> list:
+    """SSE events for an audit log document"""
+    created_at = doc.get("created_at")
+    entry = {
+        "id": doc.get("id"),
+        "action": _value(doc.get("action")),
+        "admin_email": doc.get("admin_email"),
+        "entity_type": _value(doc.get("entity_type")),
+        "entity_id": doc.get("entity_id"),
+        "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+    }
+    events = [{"event": "audit", "id": entry["id"], "data": entry}]
+    if entry["entity_type"] in CONTENT_ENTITY_TYPES:
+        events.append({"event": "change", "id": entry["id"], "data": {
+            "type": entry["entity_type"],
+            "id": entry["entity_id"],
+            "action": entry["action"],
+            "created_at": entry["created_at"],
+        }})
+    return events
+
+
+class EventBus:
+    """Fan-out of audit/change events to SSE subscribers"""
+
+    def __init__(self, max_streams: int = SSE_MAX_STREAMS, queue_size: int = SSE_QUEUE_SIZE):
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self.db = None
+        self._subscribers: Set[Subscription] = set()
+        self._recent: Deque[str] = deque(maxlen=RECENT_IDS)
+        self._recent_set: Set[str] = set()
+        self._relay_task: Optional[asyncio.Task] = None
+
+    @property
+    def streams(self) -> int:
+        return len(self._subscribers)
+
+    # ───────────────────────────────────────
+    # Lifecycle
+    # ───────────────────────────────────────
+    def start(self, db):
+        """Start the cross-worker relay if there are other workers (lifespan startup)"""
+        self.db = db
+        if SSE_WORKERS > 1 and SSE_RELAY_SECONDS > 0:
+            self._relay_task = asyncio.create_task(self._relay())
+
+    async def stop(self):
+        """End all streams and stop the relay (lifespan shutdown)"""
+        for subscription in list(self._subscribers):
+            subscription.closed = True
+            subscription.overflowed = False
+            # Wake the stream so it notices it is closed
+            subscription.offer({"event": "close", "data": {}})
+        if self._relay_task is not None:
+            self._relay_task.cancel()
+            try:
+                await self._relay_task
+            except asyncio.CancelledError:
+                pass
+            self._relay_task = None
+
+    # ───────────────────────────────────────
+    # Subscriptions
+    # ───────────────────────────────────────
+    def subscribe(self) -> Subscription:
+        if len(self._subscribers) >= self.max_streams:
+            raise StreamLimitReached()
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    # ───────────────────────────────────────
+    # Publishing
+    # ───────────────────────────────────────
+    def publish_audit(self, doc: dict):
+        """Publish an audit log document (called by the audit writer)"""
+        audit_id = doc.get("id")
+        if audit_id:
+            if audit_id in self._recent_set:
+                return
+            if len(self._recent) == self._recent.maxlen:
+                self._recent_set.discard(self._recent[0])
+            self._recent.append(audit_id)
+            self._recent_set.add(audit_id)
+        if not self._subscribers:
+            return
+        for event in audit_events(doc):
+            for subscription in self._subscribers:
+                subscription.offer(event)
+
+    async def _relay(self):
+        watermark = datetime.utcnow()
+        while True:
+            await asyncio.sleep(SSE_RELAY_SECONDS)
+            if not self._subscribers:
+                watermark = datetime.utcnow()
+                continue
+            try:
+                started = datetime.utcnow()
+                docs = await find_entries(self.db, {}, start=watermark - RELAY_OVERLAP, limit=1000)
+                # find_entries returns newest first; publish in write order
+                for doc in reversed(docs):
+                    self.publish_audit(doc)
+                watermark = started
+            except Exception as e:
+                logger.error(f"Event relay failed: {e}")
+
+
+event_bus = EventBus()
@@ -0,0 +1,338 @@
+"""
+Declarative MongoDB index specification for TimeLov Admin API
+
+Indexes are declared once in INDEX_SPEC and reconciled with one
+create_indexes batch per collection, all collections concurrently. The
+hash of the spec is stored in `schema_meta`, so workers that start after
+a successful build skip the work entirely.
+
+Run as a deploy step (workers can then start with INDEX_BUILD_MODE=skip):
+    python -m services.indexes [--force] [--prune]
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from services.search_service import SEARCH_TEXT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# "background": build after startup without blocking traffic (default)
+# "blocking": build before the app accepts requests
+# "skip": indexes are managed by the CLI step
+INDEX_BUILD_MODE = os.environ.get("INDEX_BUILD_MODE", "background")
+
+INDEX_SPEC_META_ID = "index_spec"
+
+# Index option conflicts (same keys or name with different options)
+_CONFLICT_CODES = (85, 86)
+
+
+# Soft-deleted documents are never listed, so indexes led by an equality
+# field (status, ...) are partial on deleted_at: null. Shapes filtering only
+# on deleted_at lead with it instead so the predicate itself is indexed.
+NOT_DELETED = {"deleted_at": None}
+
+
+def _search_text_index(fields) -> IndexModel:
+    """Weighted text index over the normalized search fields"""
+    return IndexModel(
+        [(f"search.{field}", TEXT) for field in fields],
+        name="search_text",
+        weights={f"search.{field}": SEARCH_TEXT_WEIGHTS[f"search.{field}"] for field in fields},
+        default_language="none"
+    )
+
+
+INDEX_SPEC: Dict[str, List[IndexModel]] = {
+    "admin_users": [
+        IndexModel([("email", ASCENDING)], name="email_1", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+    ],
+    "audit_logs": [
+        # Reads sort by (created_at, id) (audit_storage.ENTRY_SORT), so every
+        # sorted shape ends with both keys
+        # list_audit_logs / export_audit_logs / dashboard: newest first, optional date range
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_-1_id_-1"),
+        # list_audit_logs filtered by admin, action or entity type
+        IndexModel(
+            [("admin_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="admin_id_1_created_at_-1_id_-1"
+        ),
+        IndexModel(
+            [("action", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="action_1_created_at_-1_id_-1"
+        ),
+        IndexModel(
+            [("entity_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="entity_type_1_created_at_-1_id_-1"
+        ),
+        # /cms/{posts,pages,widgets,integrations}/{id}/history, get_audit_log_values
+        IndexModel(
+            [("entity_type", ASCENDING), ("entity_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="entity_type_1_entity_id_1_created_at_-1_id_-1"
+        ),
+        # get_audit_log_values: one entry by id
+        IndexModel([("id", ASCENDING)], name="id_1"),
+    ],
+    "audit_rollups": [
+        # get_audit_timeseries: buckets of one granularity in a date range
+        IndexModel([("granularity", ASCENDING), ("bucket", ASCENDING)], name="granularity_1_bucket_1"),
+        # Hourly buckets expire (AUDIT_ROLLUP_HOURLY_RETENTION_DAYS)
+        IndexModel([("expire_at", ASCENDING)], name="expire_at_1", expireAfterSeconds=0),
+    ],
+    "widgets": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        # get_public_widget / create_widget: active widget of a section
+        IndexModel([("section_name", ASCENDING)], name="section_name_1"),
+        # list_widgets and dashboard counts
+        IndexModel([("deleted_at", ASCENDING), ("display_order", ASCENDING)], name="deleted_at_1_display_order_1"),
+        # change feed polling fallback
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_1__id_1"),
+    ],
+    "pages": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        IndexModel([("slug", ASCENDING)], name="slug_1", unique=True),
+        # list_pages and dashboard counts
+        IndexModel([("deleted_at", ASCENDING), ("created_at", DESCENDING)], name="deleted_at_1_created_at_-1"),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING)],
+            name="status_1_created_at_-1_live",
+            partialFilterExpression=NOT_DELETED
+        ),
+        # search_pages / search_public_pages
+        _search_text_index(("title", "excerpt", "content")),
+        # change feed polling fallback
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_1__id_1"),
+    ],
+    "posts": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        IndexModel([("slug", ASCENDING)], name="slug_1", unique=True),
+        # list_public_posts, with and without a category
+        IndexModel(
+            [("status", ASCENDING), ("published_at", DESCENDING)],
+            name="status_1_published_at_-1_live",
+            partialFilterExpression=NOT_DELETED
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("category", ASCENDING), ("published_at", DESCENDING)],
+            name="status_1_category_1_published_at_-1_live",
+            partialFilterExpression=NOT_DELETED
+        ),
+        # list_posts (admin) and dashboard counts
+        IndexModel([("deleted_at", ASCENDING), ("created_at", DESCENDING)], name="deleted_at_1_created_at_-1"),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING)],
+            name="status_1_created_at_-1_live",
+            partialFilterExpression=NOT_DELETED
+        ),
+        # search_posts / search_public_posts
+        _search_text_index(("title", "excerpt", "content", "tags")),
+        # post search index sync and change feed polling fallback
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_1__id_1"),
+    ],
+    "settings": [
+        IndexModel([("setting_key", ASCENDING)], name="setting_key_1", unique=True),
+    ],
+    "site_settings": [
+        IndexModel([("_type", ASCENDING)], name="_type_1"),
+    ],
+    "uploaded_files": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+    ],
+    "integrations": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        IndexModel([("integration_type", ASCENDING)], name="integration_type_1"),
+        IndexModel([("section_name", ASCENDING)], name="section_name_1"),
+        # list_public_integrations / render_integrations_html / list_integrations
+        IndexModel([("is_active", ASCENDING), ("priority_order", ASCENDING)], name="is_active_1_priority_order_1"),
+        # list_integrations?include_inactive=true
+        IndexModel([("priority_order", ASCENDING)], name="priority_order_1"),
+        # change feed polling fallback
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_1__id_1"),
+    ],
+    "app_users": [
+        IndexModel([("email", ASCENDING)], name="email_1", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+    ],
+    "demo_requests": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_1"),
+        IndexModel([("created_at", ASCENDING)], name="created_at_1"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_1_created_at_-1"),
+    ],
+}
+
+
+# Collections split into partitions sharing the base collection's indexes
+# (audit_logs_YYYYMM, see services/audit_storage.py)
+PARTITIONED_COLLECTIONS: Dict[str, str] = {
+    "audit_logs": r"^audit_logs_\d{6}$",
+}
+
+
+# Indexes superseded by a compound index with the same prefix; dropped on reconcile
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "audit_logs": [
+        "action_1", "admin_id_1",
+        # superseded by the (created_at, id) variants
+        "created_at_1", "admin_id_1_created_at_-1", "action_1_created_at_-1",
+        "entity_type_1_created_at_-1", "entity_type_1_entity_id_1_created_at_-1",
+    ],
+    # updated_at_1: superseded by (updated_at, _id), the change feed polling order
+    "integrations": ["is_active_1", "updated_at_1"],
+    "widgets": ["updated_at_1"],
+    "pages": ["updated_at_1"],
+    "posts": ["updated_at_1"],
+}
+
+
+def _retired_indexes(collection: str) -> List[str]:
+    for base, pattern in PARTITIONED_COLLECTIONS.items():
+        if re.match(pattern, collection):
+            return RETIRED_INDEXES.get(base, [])
+    return RETIRED_INDEXES.get(collection, [])
+
+
+def spec_hash(spec: Dict[str, List[IndexModel]] = INDEX_SPEC) -> str:
+    """Stable hash of the index spec"""
+    canonical = {
+        collection: [
+            {k: (list(map(list, v.items())) if k == "key" else v) for k, v in sorted(model.document.items())}
+            for model in models
+        ]
+        for collection, models in sorted(spec.items())
+    }
+    payload = json.dumps(canonical, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _index_options(info: dict) -> dict:
+    return {k: v for k, v in info.items() if k not in ("key", "v", "ns", "background")}
+
+
+def _matches_spec(info: dict, spec: dict) -> bool:
+    """Whether an existing index (index_information entry) matches its spec"""
+    if TEXT in spec["key"].values():
+        # Text indexes are stored with internal _fts/_ftsx keys
+        return (
+            info.get("weights") == spec.get("weights")
+            and info.get("default_language", "english") == spec.get("default_language", "english")
+        )
+    return list(info["key"]) == list(spec["key"].items()) and _index_options(info) == {
+        k: v for k, v in spec.items() if k not in ("key", "name")
+    }
+
+
+async def _reconcile_collection(db, collection: str, models: List[IndexModel], prune: bool) -> List[str]:
+    """Create the collection's indexes in one batch, replacing conflicting ones"""
+    coll = db[collection]
+    wanted = {model.document["name"]: model.document for model in models}
+    existing = await coll.index_information()
+
+    for name, info in existing.items():
+        if name == "_id_":
+            continue
+        spec = wanted.get(name)
+        if spec is None:
+            # Same keys under another name would conflict with the spec's index
+            same_keys = any(list(info["key"]) == list(s["key"].items()) for s in wanted.values())
+            if prune or same_keys or name in _retired_indexes(collection):
+                logger.info(f"Dropping index {collection}.{name}")
+                await coll.drop_index(name)
+        elif not _matches_spec(info, spec):
+            logger.info(f"Rebuilding index {collection}.{name} (definition changed)")
+            await coll.drop_index(name)
+
+    try:
+        return await coll.create_indexes(models)
+    except OperationFailure as e:
+        if e.code not in _CONFLICT_CODES:
+            raise
+        logger.warning(f"Index conflict on {collection}, retrying after drop: {e}")
+        for model in models:
+            try:
+                await coll.drop_index(model.document["name"])
+            except OperationFailure:
+                pass
+        return await coll.create_indexes(models)
+
+
+async def ensure_indexes(db, force: bool = False, prune: bool = False) -> bool:
+    """
+    Reconcile all indexes with INDEX_SPEC. Returns False when skipped
+    because the stored spec hash already matches.
+    """
+    current = spec_hash()
+    if not force:
+        meta = await db.schema_meta.find_one({"_id": INDEX_SPEC_META_ID})
+        if meta and meta.get("hash") == current:
+            logger.info("Indexes up to date (spec hash matches)")
+            return False
+
+    targets = dict(INDEX_SPEC)
+    for base, pattern in PARTITIONED_COLLECTIONS.items():
+        for partition in await db.list_collection_names(filter={"name": {"$regex": pattern}}):
+            targets[partition] = INDEX_SPEC[base]
+    await asyncio.gather(*(
+        _reconcile_collection(db, collection, models, prune)
+        for collection, models in targets.items()
+    ))
+    await db.schema_meta.update_one(
+        {"_id": INDEX_SPEC_META_ID},
+        {"$set": {"hash": current}},
+        upsert=True
+    )
+    logger.info(f"Indexes reconciled for {len(INDEX_SPEC)} collections")
+    return True
+
+
+async def _build_in_background(db):
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Background index build failed: {e}")
+
+
+async def start_index_build(db):
+    """Apply INDEX_BUILD_MODE at startup; returns the background task, if any"""
+    if INDEX_BUILD_MODE == "skip":
+        return None
+    if INDEX_BUILD_MODE == "blocking":
+        await ensure_indexes(db)
+        return None
+    return asyncio.create_task(_build_in_background(db))
+
+
+def main():
+    from dotenv import load_dotenv
+    from pathlib import Path
+    from services.mongo_client import create_mongo_client
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    parser = argparse.ArgumentParser(description="Reconcile MongoDB indexes with the declared spec")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the stored spec hash matches")
+    parser.add_argument("--prune", action="store_true", help="Drop indexes that are not in the spec")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    async def run():
+        client = create_mongo_client(os.environ['MONGO_URL'])
+        try:
+            await ensure_indexes(client[os.environ.get('DB_NAME', 'timelov_admin')], force=args.force, prune=args.prune)
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
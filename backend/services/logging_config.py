@@ -0,0 +1,49 @@
+"""Logging configuration for TimeLov Admin API
+
+All log records are handed to a QueueHandler and written by a
+QueueListener thread, so formatting and stream I/O never run on the
+event loop. Access log records (logger "timelov.access") are already
+JSON and are written verbatim; everything else uses the usual format.
+"""
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import logging
+import queue
+
+ACCESS_LOGGER_NAME = "timelov.access"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+
+class _RoutingFormatter(logging.Formatter):
+    """Write access log records as-is, format everything else normally"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if record.name == ACCESS_LOGGER_NAME:
+            return record.getMessage()
+        return super().format(record)
+
+
+def configure_logging(level: int = logging.INFO) -> QueueListener:
+    """Route all logging through a background writer thread (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue: queue.Queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(_RoutingFormatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
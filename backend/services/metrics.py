@@ -0,0 +1,228 @@
+"""Prometheus metrics for TimeLov Admin API"""
+from typing import Dict
+import logging
+import threading
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════
+# HTTP
+# ═══════════════════════════════════════
+HTTP_REQUESTS = Counter(
+    "timelov_http_requests_total",
+    "HTTP requests by route template and status",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "timelov_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "timelov_http_response_size_bytes",
+    "HTTP response body size by route template",
+    ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+HTTP_IN_FLIGHT = Gauge(
+    "timelov_http_requests_in_flight",
+    "HTTP requests currently being served"
+)
+
+# ═══════════════════════════════════════
+# MONGODB
+# ═══════════════════════════════════════
+MONGO_COMMAND_DURATION = Histogram(
+    "timelov_mongo_command_duration_seconds",
+    "MongoDB command latency by command and collection",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "timelov_mongo_command_failures_total",
+    "Failed MongoDB commands by command and collection",
+    ["command", "collection"]
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "timelov_mongo_pool_connections",
+    "Open connections in the MongoDB pool by server",
+    ["address"]
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "timelov_mongo_pool_checked_out",
+    "MongoDB connections currently checked out by server",
+    ["address"]
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "timelov_mongo_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["address"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "timelov_mongo_pool_checkout_failures_total",
+    "Failed connection check-outs by server and reason",
+    ["address", "reason"]
+)
+MONGO_POOL_CLEARED = Counter(
+    "timelov_mongo_pool_cleared_total",
+    "Times a server's connection pool was cleared",
+    ["address"]
+)
+
+# ═══════════════════════════════════════
+# BACKGROUND WORK
+# ═══════════════════════════════════════
+BCRYPT_QUEUE_DEPTH = Gauge(
+    "timelov_bcrypt_queue_depth",
+    "Password hashing tasks waiting for a bcrypt executor thread"
+)
+BCRYPT_IN_FLIGHT = Gauge(
+    "timelov_bcrypt_in_flight",
+    "Password hashing tasks submitted and not yet finished"
+)
+AUDIT_WRITER_BACKLOG = Gauge(
+    "timelov_audit_writer_backlog",
+    "Audit log entries queued and not yet written"
+)
+AUDIT_WRITER_WRITTEN = Counter(
+    "timelov_audit_writer_written_total",
+    "Audit log entries written by the background writer"
+)
+AUDIT_WRITER_FAILURES = Counter(
+    "timelov_audit_writer_failures_total",
+    "Audit log entries the background writer failed to write"
+)
+
+
+# ═══════════════════════════════════════
+# CACHES
+# ═══════════════════════════════════════
+# In-process caches keep plain {"hits": int, "misses": int} dicts so the
+# modules that own them do not depend on prometheus_client
+_cache_stats: Dict[str, dict] = {}
+
+
+def register_cache(name: str, stats: dict):
+    """Expose a cache's hit/miss counters under the given name"""
+    _cache_stats[name] = stats
+
+
+class CacheStatsCollector:
+    """Collects hit/miss counters and hit ratios from registered caches"""
+
+    def collect(self):
+        hits = CounterMetricFamily("timelov_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("timelov_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("timelov_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        for name, stats in _cache_stats.items():
+            cache_hits = stats.get("hits", 0)
+            cache_misses = stats.get("misses", 0)
+            total = cache_hits + cache_misses
+            hits.add_metric([name], cache_hits)
+            misses.add_metric([name], cache_misses)
+            ratio.add_metric([name], cache_hits / total if total else 0.0)
+        yield hits
+        yield misses
+        yield ratio
+
+
+REGISTRY.register(CacheStatsCollector())
+
+
+# ═══════════════════════════════════════
+# MONGODB COMMAND LISTENER
+# ═══════════════════════════════════════
+class MongoCommandMetrics(monitoring.CommandListener):
+    """PyMongo command listener recording per-command latency"""
+
+    def __init__(self):
+        # (connection_id, request_id) -> collection, filled on start
+        self._collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection", "")
+        self._collections[(event.connection_id, event.request_id)] = target
+
+    def succeeded(self, event):
+        self._observe(event, failed=False)
+
+    def failed(self, event):
+        self._observe(event, failed=True)
+
+    def _observe(self, event, failed: bool):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        if failed:
+            MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """PyMongo pool listener tracking connections, check-outs and wait time"""
+
+    def __init__(self):
+        # Check-out events fire on the thread performing the check-out
+        self._local = threading.local()
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        MONGO_POOL_CLEARED.labels(self._address(event)).inc()
+
+    def pool_closed(self, event):
+        address = self._address(event)
+        MONGO_POOL_CONNECTIONS.labels(address).set(0)
+        MONGO_POOL_CHECKED_OUT.labels(address).set(0)
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(self._address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        address = self._address(event)
+        MONGO_POOL_CHECKED_OUT.labels(address).inc()
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(address).observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).dec()
+
+
+def render_metrics() -> bytes:
+    """Render all metrics in the Prometheus text format"""
+    return generate_latest(REGISTRY)
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
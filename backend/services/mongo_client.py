@@ -0,0 +1,86 @@
+"""MongoDB client configuration for TimeLov Admin API
+
+Pool sizes, timeouts, wire compression, the read preference used for
+public search reads and per-collection write concerns are all set
+here from environment variables, so deployments can tune them without
+touching route code.
+"""
+from importlib.util import find_spec
+from typing import Dict, List
+import logging
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import WriteConcern
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from services.metrics import MongoCommandMetrics, MongoPoolMetrics
+
+logger = logging.getLogger(__name__)
+
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+# Preferred order; compressors whose Python package is missing are skipped
+MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+
+# Public search reads (never purged or cached in-process): "secondaryPreferred" or "primary"
+MONGO_PUBLIC_READ_PREFERENCE = os.environ.get("MONGO_PUBLIC_READ_PREFERENCE", "secondaryPreferred")
+# Secondaries lagging more than this are not used (MongoDB minimum is 90s)
+MONGO_PUBLIC_MAX_STALENESS_SECONDS = max(90, int(os.environ.get("MONGO_PUBLIC_MAX_STALENESS_SECONDS", "120")))
+
+# Collections whose writes do not need majority acknowledgement
+COLLECTION_WRITE_CONCERNS: Dict[str, WriteConcern] = {
+    "audit_logs": WriteConcern(w=1),
+}
+
+_COMPRESSOR_PACKAGES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def available_compressors() -> List[str]:
+    """Configured compressors whose codec package is importable"""
+    compressors = []
+    for name in (c.strip() for c in MONGO_COMPRESSORS.split(",")):
+        package = _COMPRESSOR_PACKAGES.get(name)
+        if package and find_spec(package) is not None:
+            compressors.append(name)
+        elif name:
+            logger.info(f"MongoDB compressor '{name}' unavailable, skipping")
+    return compressors
+
+
+def create_mongo_client(mongo_url: str) -> AsyncIOMotorClient:
+    """Create the shared Motor client with pool, timeout and compression settings"""
+    options = dict(
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()],
+    )
+    compressors = available_compressors()
+    if compressors:
+        options["compressors"] = compressors
+    return AsyncIOMotorClient(mongo_url, **options)
+
+
+def public_read_preference():
+    """Read preference for public search (routes that are purged on write read the primary)"""
+    if MONGO_PUBLIC_READ_PREFERENCE == "secondaryPreferred":
+        return SecondaryPreferred(max_staleness=MONGO_PUBLIC_MAX_STALENESS_SECONDS)
+    return Primary()
+
+
+def get_collection(db, name: str):
+    """Collection handle carrying its configured write concern, if any"""
+    write_concern = COLLECTION_WRITE_CONCERNS.get(name)
+    if write_concern is None:
+        return db[name]
+    return db.get_collection(name, write_concern=write_concern)
@@ -0,0 +1,315 @@
+"""
+In-process inverted index over published posts
+
+Serves type-ahead search and category/tag facets for the public blog
+without a MongoDB round trip per keystroke. Only the short fields are
+indexed (title, excerpt, tags, category), terms are normalized like the
+Mongo text search (services.search_service), and memory is bounded by a
+cap on indexed posts and on terms per post.
+
+The index is built in the background at startup. Writes made by this
+worker are applied immediately through refresh_post(s); writes made by
+other workers are picked up by a periodic sync on posts.updated_at.
+"""
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+import asyncio
+import heapq
+import logging
+import os
+
+from models.post import PostStatus
+from services.search_service import normalize_search_text, search_terms
+
+logger = logging.getLogger(__name__)
+
+POST_INDEX_MAX_POSTS = int(os.environ.get("POST_INDEX_MAX_POSTS", "20000"))
+POST_INDEX_SYNC_SECONDS = float(os.environ.get("POST_INDEX_SYNC_SECONDS", "5"))
+# Re-read a little before the last sync so writes committed late are not missed
+SYNC_OVERLAP = timedelta(seconds=2)
+MAX_TERMS_PER_POST = 256
+# A prefix expanding to more terms than this is matched on the first ones only
+MAX_PREFIX_EXPANSION = 500
+FACET_TAG_LIMIT = 20
+
+# Field weights used for ranking
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+EXCERPT_WEIGHT = 1
+
+_PROJECTION = {
+    "_id": 0, "id": 1, "slug": 1, "title": 1, "excerpt": 1, "featured_image_url": 1,
+    "category": 1, "tags": 1, "status": 1, "published_at": 1, "updated_at": 1, "deleted_at": 1
+}
+
+
+class IndexedPost(NamedTuple):
+    slug: str
+    title: str
+    excerpt: Optional[str]
+    featured_image_url: Optional[str]
+    category: str
+    tags: List[str]
+    published_at: Optional[datetime]
+    terms: Dict[str, int]  # term -> best field weight
+
+
+def _is_live(doc: dict) -> bool:
+    return doc.get("status") == PostStatus.PUBLISHED.value and doc.get("deleted_at") is None
+
+
+def _post_terms(doc: dict) -> Dict[str, int]:
+    terms: Dict[str, int] = {}
+    fields = (
+        (doc.get("title") or "", TITLE_WEIGHT),
+        (" ".join(doc.get("tags") or []), TAG_WEIGHT),
+        (doc.get("excerpt") or "", EXCERPT_WEIGHT),
+    )
+    for text, weight in fields:
+        for term in normalize_search_text(text).split():
+            if terms.get(term, 0) < weight:
+                if term not in terms and len(terms) >= MAX_TERMS_PER_POST:
+                    continue
+                terms[term] = weight
+    return terms
+
+
+class PostSearchIndex:
+    """Inverted index: term -> {post_id: weight}, plus category and tag sets"""
+
+    def __init__(self, max_posts: int = POST_INDEX_MAX_POSTS):
+        self.max_posts = max_posts
+        self.ready = False
+        self.db = None
+        self._posts: Dict[str, IndexedPost] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._sorted_terms: List[str] = []
+        self._terms_dirty = False
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    # ───────────────────────────────────────
+    # Lifecycle
+    # ───────────────────────────────────────
+    def start(self, db):
+        """Build the index and keep it in sync in the background (lifespan startup)"""
+        self.db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background sync (lifespan shutdown)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Post search index build failed: {e}")
+        while True:
+            await asyncio.sleep(POST_INDEX_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Post search index sync failed: {e}")
+
+    async def rebuild(self):
+        """Load the newest published posts, up to max_posts"""
+        started = datetime.utcnow()
+        cursor = self.db.posts.find(
+            {"status": PostStatus.PUBLISHED.value, "deleted_at": None}, _PROJECTION
+        ).sort("published_at", -1).limit(self.max_posts)
+        docs = await cursor.to_list(self.max_posts)
+
+        self._posts.clear()
+        self._postings.clear()
+        self._by_category.clear()
+        self._by_tag.clear()
+        for doc in docs:
+            self._add(doc)
+        self._terms_dirty = True
+        self._watermark = started - SYNC_OVERLAP
+        self.ready = True
+        logger.info(f"Post search index built: {len(self._posts)} posts, {len(self._postings)} terms")
+
+    async def sync(self):
+        """Apply posts changed since the last sync (writes from other workers)"""
+        if self._watermark is None:
+            return
+        started = datetime.utcnow()
+        cursor = self.db.posts.find({"updated_at": {"$gt": self._watermark}}, _PROJECTION)
+        async for doc in cursor:
+            self.apply(doc)
+        self._watermark = started - SYNC_OVERLAP
+
+    async def refresh_post(self, post_id: str):
+        """Re-read one post after a write and update the index"""
+        await self.refresh_posts([post_id])
+
+    async def refresh_posts(self, post_ids: Iterable[str]):
+        """Re-read posts after a write and update the index"""
+        if not self.ready:
+            return
+        async for doc in self.db.posts.find({"id": {"$in": list(post_ids)}}, _PROJECTION):
+            self.apply(doc)
+
+    # ───────────────────────────────────────
+    # Index maintenance
+    # ───────────────────────────────────────
+    def apply(self, doc: dict):
+        """Index a post document, or remove it if it is no longer published"""
+        self._remove(doc["id"])
+        if _is_live(doc):
+            self._add(doc)
+            self._evict_over_capacity()
+
+    def _add(self, doc: dict):
+        post_id = doc["id"]
+        terms = _post_terms(doc)
+        tags = list(doc.get("tags") or [])
+        self._posts[post_id] = IndexedPost(
+            slug=doc["slug"],
+            title=doc["title"],
+            excerpt=doc.get("excerpt"),
+            featured_image_url=doc.get("featured_image_url"),
+            category=doc.get("category", ""),
+            tags=tags,
+            published_at=doc.get("published_at"),
+            terms=terms,
+        )
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._terms_dirty = True
+            postings[post_id] = weight
+        self._by_category.setdefault(doc.get("category", ""), set()).add(post_id)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(post_id)
+
+    def _remove(self, post_id: str):
+        post = self._posts.pop(post_id, None)
+        if post is None:
+            return
+        for term in post.terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(post_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._terms_dirty = True
+        self._discard(self._by_category, post.category, post_id)
+        for tag in post.tags:
+            self._discard(self._by_tag, tag, post_id)
+
+    @staticmethod
+    def _discard(groups: Dict[str, Set[str]], key: str, post_id: str):
+        members = groups.get(key)
+        if members is not None:
+            members.discard(post_id)
+            if not members:
+                del groups[key]
+
+    def _evict_over_capacity(self):
+        while len(self._posts) > self.max_posts:
+            oldest = min(self._posts, key=lambda pid: self._posts[pid].published_at or datetime.min)
+            self._remove(oldest)
+
+    # ───────────────────────────────────────
+    # Queries
+    # ───────────────────────────────────────
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        terms = self._sorted_terms
+        start = bisect_left(terms, prefix)
+        end = start
+        while end < len(terms) and end - start < MAX_PREFIX_EXPANSION and terms[end].startswith(prefix):
+            end += 1
+        return terms[start:end]
+
+    def search(
+        self,
+        query: str = "",
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 10
+    ) -> dict:
+        """
+        Prefix search (every query term matches as a prefix, all terms must
+        match) with optional category/tag filters. Returns ranked results and
+        category/tag facet counts over the matching posts.
+        """
+        scores: Optional[Dict[str, int]] = None
+        for term in search_terms(query):
+            term_scores: Dict[str, int] = {}
+            for expanded in self._expand_prefix(term):
+                # Exact matches rank above prefix matches
+                bonus = 1 if expanded == term else 0
+                postings = self._postings[expanded]
+                if not term_scores:
+                    term_scores = {pid: weight * 2 + bonus for pid, weight in postings.items()}
+                    continue
+                for post_id, weight in postings.items():
+                    score = weight * 2 + bonus
+                    if term_scores.get(post_id, 0) < score:
+                        term_scores[post_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                small, large = (scores, term_scores) if len(scores) <= len(term_scores) else (term_scores, scores)
+                scores = {pid: s + large[pid] for pid, s in small.items() if pid in large}
+            if not scores:
+                break
+
+        matches = set(self._posts) if scores is None else set(scores)
+        if category:
+            matches &= self._by_category.get(category, set())
+        if tag:
+            matches &= self._by_tag.get(tag, set())
+
+        category_counts: Dict[str, int] = {}
+        tag_counts: Dict[str, int] = {}
+        for post_id in matches:
+            post = self._posts[post_id]
+            category_counts[post.category] = category_counts.get(post.category, 0) + 1
+            for post_tag in post.tags:
+                tag_counts[post_tag] = tag_counts.get(post_tag, 0) + 1
+
+        def rank(post_id: str):
+            published = self._posts[post_id].published_at or datetime.min
+            return ((scores or {}).get(post_id, 0), published)
+
+        top = heapq.nlargest(limit, matches, key=rank)
+        return {
+            "total": len(matches),
+            "results": [{
+                "slug": self._posts[pid].slug,
+                "title": self._posts[pid].title,
+                "excerpt": self._posts[pid].excerpt,
+                "featured_image_url": self._posts[pid].featured_image_url,
+                "category": self._posts[pid].category,
+                "tags": self._posts[pid].tags,
+                "published_at": self._posts[pid].published_at,
+            } for pid in top],
+            "facets": {
+                "categories": category_counts,
+                "tags": dict(sorted(tag_counts.items(), key=lambda kv: (-kv[1], kv[0]))[:FACET_TAG_LIMIT]),
+            },
+        }
+
+
+post_search_index = PostSearchIndex()
@@ -0,0 +1,209 @@
+"""
+Public landing-page content
+
+Builds the public views of site settings and rendered integrations, and
+the single cached payload served by GET /api/public/bootstrap.
+
+The bootstrap payload is assembled from one query per collection
+(site_settings, widgets, integrations), serialized once and served as
+bytes until a write invalidates it. Invalidation bumps a shared version
+document, so every worker notices a write made on any other worker
+within BOOTSTRAP_VERSION_CHECK_SECONDS.
+"""
+from typing import List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
+
+from models.widget import ThirdPartyIntegration, WidgetSection, InjectionPosition
+from services.branding_service import get_css_variables_for_version, settings_version
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_VERSION_CHECK_SECONDS = 1.0
+CACHE_VERSION_ID = "public_content"
+
+bootstrap_cache_stats = {"hits": 0, "misses": 0}
+
+
+def build_public_settings(settings: dict) -> dict:
+    """Public subset of the complete site settings document"""
+    public = {
+        "branding": {
+            "logo_url": settings.get("branding", {}).get("logo_url"),
+            "logo_alt": settings.get("branding", {}).get("logo_alt", "TimeLov"),
+            "favicon_url": settings.get("branding", {}).get("favicon_url"),
+            "primary_color": settings.get("branding", {}).get("primary_color", "#0066FF"),
+            "secondary_color": settings.get("branding", {}).get("secondary_color", "#00CC88"),
+            "accent_color": settings.get("branding", {}).get("accent_color", "#1A1A1A"),
+            "font_family": settings.get("branding", {}).get("font_family", "Inter"),
+            "site_tagline": settings.get("branding", {}).get("site_tagline", ""),
+        },
+        "seo": {
+            "meta_title": settings.get("seo", {}).get("meta_title", ""),
+            "meta_description": settings.get("seo", {}).get("meta_description", ""),
+            "meta_keywords": settings.get("seo", {}).get("meta_keywords", ""),
+            "og_title": settings.get("seo", {}).get("og_title"),
+            "og_description": settings.get("seo", {}).get("og_description"),
+            "og_image_url": settings.get("seo", {}).get("og_image_url"),
+            "twitter_title": settings.get("seo", {}).get("twitter_title"),
+            "twitter_description": settings.get("seo", {}).get("twitter_description"),
+            "twitter_image_url": settings.get("seo", {}).get("twitter_image_url"),
+        },
+        "navigation": {
+            "sections": [
+                s for s in settings.get("navigation", {}).get("sections", [])
+                if s.get("is_enabled", True)
+            ]
+        },
+        "general": {
+            "site_name": settings.get("general", {}).get("site_name", "TimeLov"),
+            "site_url": settings.get("general", {}).get("site_url", ""),
+            "maintenance_mode": settings.get("general", {}).get("maintenance_mode", False),
+            "maintenance_message": settings.get("general", {}).get("maintenance_message", ""),
+            "cookie_consent": settings.get("general", {}).get("cookie_consent", {}),
+        },
+        "integrations": {
+            "enabled": [
+                {
+                    "type": i.get("type"),
+                    "name": i.get("name"),
+                    "code_snippet": i.get("code_snippet"),
+                    "injection_position": i.get("injection_position"),
+                    "custom_css": i.get("custom_css") if i.get("whitelabel_enabled", True) else None,
+                    "url": i.get("url"),
+                    "priority": i.get("priority", 10),
+                }
+                for i in settings.get("integrations", {}).get("integrations", [])
+                if i.get("is_enabled", False)
+            ]
+        }
+    }
+
+    return public
+
+
+def render_integration_group(integrations: List[dict]) -> Tuple[List[str], List[str]]:
+    """Final CSS and rendered HTML for integration documents (in the given order)"""
+    css_parts = []
+    html_parts = []
+    for integ in integrations:
+        try:
+            obj = ThirdPartyIntegration.from_db(integ)
+            css_parts.append(obj.get_final_css())
+            html_parts.append(obj.get_rendered_html())
+        except Exception as e:
+            logger.error(f"Error rendering integration: {e}")
+    return css_parts, html_parts
+
+
+async def build_bootstrap_payload(db) -> dict:
+    """Assemble the landing-page bootstrap data with one query per collection"""
+    settings, widgets, integrations = await asyncio.gather(
+        db.site_settings.find_one({"_type": "complete_settings"}),
+        db.widgets.find(
+            {"is_active": True, "deleted_at": None},
+            {"_id": 0, "section_name": 1, "widget_code": 1, "widget_name": 1, "is_active": 1}
+        ).sort("display_order", 1).to_list(len(WidgetSection) * 10),
+        db.integrations.find({"is_active": True}).sort("priority_order", 1).to_list(500),
+    )
+    version = settings_version(settings)
+    settings = settings or {}
+
+    public = build_public_settings(settings)
+    navigation = public.pop("navigation")
+
+    widgets_by_section = {section.value: None for section in WidgetSection}
+    for widget in widgets:
+        if widgets_by_section.get(widget["section_name"], False) is None:
+            widgets_by_section[widget["section_name"]] = widget
+
+    integrations_by_position = {}
+    for position in InjectionPosition:
+        group = [i for i in integrations if i.get("injection_position") == position.value]
+        css_parts, html_parts = render_integration_group(group)
+        integrations_by_position[position.value] = {
+            "css": "\n".join(css_parts),
+            "html": "\n".join(html_parts),
+            "count": len(html_parts),
+        }
+
+    return {
+        "settings": public,
+        "navigation": navigation,
+        "widgets": widgets_by_section,
+        "integrations": integrations_by_position,
+        "css_variables": get_css_variables_for_version(settings.get("branding"), version),
+    }
+
+
+class BootstrapCache:
+    """Prebuilt, serialized bootstrap payload with cross-worker invalidation"""
+
+    def __init__(self):
+        self.db = None
+        self._payload: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def set_db(self, db):
+        self.db = db
+
+    async def _shared_version(self) -> int:
+        doc = await self.db.cache_versions.find_one({"_id": CACHE_VERSION_ID})
+        return doc["version"] if doc else 0
+
+    async def get(self) -> Tuple[bytes, str]:
+        """Serialized payload and its ETag, rebuilding if a write invalidated it"""
+        now = time.monotonic()
+        if self._payload is not None and now - self._checked_at < BOOTSTRAP_VERSION_CHECK_SECONDS:
+            bootstrap_cache_stats["hits"] += 1
+            return self._payload, self._etag
+
+        async with self._lock:
+            version = await self._shared_version()
+            self._checked_at = time.monotonic()
+            if self._payload is not None and version == self._version:
+                bootstrap_cache_stats["hits"] += 1
+                return self._payload, self._etag
+
+            bootstrap_cache_stats["misses"] += 1
+            payload = await build_bootstrap_payload(self.db)
+            body = json.dumps(jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False).encode()
+            self._payload = body
+            self._etag = f'W/"bootstrap-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            self._version = version
+            return self._payload, self._etag
+
+    async def invalidate(self):
+        """Drop the cached payload on every worker"""
+        self._payload = None
+        if self.db is None:
+            return
+        await self.db.cache_versions.find_one_and_update(
+            {"_id": CACHE_VERSION_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+
+bootstrap_cache = BootstrapCache()
+
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+async def invalidate_public_content_on_write(request: Request):
+    """Router dependency: invalidate public content after a successful write"""
+    yield
+    if request.method not in SAFE_METHODS:
+        await bootstrap_cache.invalidate()
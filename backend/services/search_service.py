@@ -0,0 +1,196 @@
+"""
+Full-text search over posts and pages
+
+MongoDB has no Polish text analyzer and does not fold letters such as
+"ł", so each searchable document carries a normalized copy of its text in
+a `search` sub-document (lowercased, Polish characters folded with the
+slugify map, HTML stripped). A weighted text index covers those fields
+and queries are normalized the same way before they reach $text.
+
+Documents written before search existed can be backfilled with:
+    python -m services.search_service --backfill
+"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import html
+import logging
+import os
+import re
+
+from pymongo import UpdateOne
+
+from models.post import fold_polish
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELD = "search"
+
+# Relative weights of the normalized fields in the text index
+SEARCH_TEXT_WEIGHTS = {
+    "search.title": 10,
+    "search.tags": 6,
+    "search.excerpt": 4,
+    "search.content": 1,
+}
+
+# search sub-field -> source field of the stored document
+POST_SEARCH_SOURCES = {"title": "title", "excerpt": "excerpt", "content": "content", "tags": "tags"}
+PAGE_SEARCH_SOURCES = {"title": "title", "excerpt": "meta_description", "content": "content"}
+
+MAX_QUERY_TERMS = 10
+SNIPPET_LENGTH = 200
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def strip_html(text: str) -> str:
+    """Plain text of an HTML fragment, whitespace collapsed"""
+    return " ".join(html.unescape(_TAG_RE.sub(" ", text)).split())
+
+
+def normalize_search_text(text: str) -> str:
+    """Text as stored in the search fields and matched by queries"""
+    return _NON_WORD_RE.sub(" ", fold_polish(strip_html(text))).strip()
+
+
+def search_fields(doc: dict, sources: Dict[str, str]) -> dict:
+    """Build the `search` sub-document for a post or page"""
+    fields = {}
+    for target, source in sources.items():
+        value = doc.get(source) or ""
+        if isinstance(value, list):
+            value = " ".join(value)
+        fields[target] = normalize_search_text(value)
+    return fields
+
+
+def search_sources_changed(update_data: dict, sources: Dict[str, str]) -> bool:
+    """Whether an update touches any field the search document is built from"""
+    return any(source in update_data for source in sources.values())
+
+
+def search_terms(query: str) -> List[str]:
+    """Normalized, de-duplicated query terms"""
+    terms = []
+    for term in normalize_search_text(query).split():
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def highlight(text: Optional[str], terms: List[str], length: int = SNIPPET_LENGTH) -> str:
+    """
+    HTML-escaped snippet of `text` around the first matching term, with
+    every whole-word match wrapped in <mark>. Matching runs on the folded
+    text, which has the same length as the original, so offsets line up.
+    """
+    plain = strip_html(text or "")
+    folded = fold_polish(plain)
+    if not terms or len(folded) != len(plain):
+        return html.escape(plain[:length])
+
+    pattern = re.compile(r'(?<![a-z0-9])(?:' + "|".join(map(re.escape, terms)) + r')(?![a-z0-9])')
+    first = pattern.search(folded)
+    start = 0
+    if first and first.start() > length // 3:
+        start = plain.rfind(" ", 0, first.start() - length // 3) + 1
+    end = min(len(plain), start + length)
+
+    parts = ["…"] if start > 0 else []
+    cursor = start
+    for match in pattern.finditer(folded, start, end):
+        parts.append(html.escape(plain[cursor:match.start()]))
+        parts.append(f"<mark>{html.escape(plain[match.start():match.end()])}</mark>")
+        cursor = match.end()
+    parts.append(html.escape(plain[cursor:end]))
+    if end < len(plain):
+        parts.append("…")
+    return "".join(parts)
+
+
+async def text_search(
+    collection,
+    query: str,
+    filters: dict,
+    projection: dict,
+    page: int,
+    limit: int
+) -> Tuple[List[dict], int, List[str]]:
+    """
+    Run a weighted $text search. Returns (documents with a `score`,
+    total matches, normalized terms).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], 0, terms
+
+    mongo_filter = {**filters, "$text": {"$search": " ".join(terms)}}
+    projection = {**projection, "_id": 0, "score": {"$meta": "textScore"}}
+    cursor = (
+        collection.find(mongo_filter, projection)
+        .sort([("score", {"$meta": "textScore"})])
+        .skip((page - 1) * limit)
+        .limit(limit)
+    )
+    docs, total = await asyncio.gather(
+        cursor.to_list(limit),
+        collection.count_documents(mongo_filter)
+    )
+    return docs, total, terms
+
+
+async def backfill_search_fields(db, batch_size: int = 500) -> Dict[str, int]:
+    """Add the `search` sub-document to posts and pages that lack it"""
+    counts = {}
+    for name, sources in (("posts", POST_SEARCH_SOURCES), ("pages", PAGE_SEARCH_SOURCES)):
+        collection = db[name]
+        projection = {"_id": 1, **{source: 1 for source in sources.values()}}
+        updated = 0
+        batch = []
+        async for doc in collection.find({SEARCH_FIELD: {"$exists": False}}, projection):
+            batch.append((doc["_id"], search_fields(doc, sources)))
+            if len(batch) >= batch_size:
+                updated += await _write_search_batch(collection, batch)
+                batch = []
+        if batch:
+            updated += await _write_search_batch(collection, batch)
+        counts[name] = updated
+    return counts
+
+
+async def _write_search_batch(collection, batch) -> int:
+    result = await collection.bulk_write(
+        [UpdateOne({"_id": _id}, {"$set": {SEARCH_FIELD: fields}}) for _id, fields in batch],
+        ordered=False
+    )
+    return result.modified_count
+
+
+def main():
+    from dotenv import load_dotenv
+    from pathlib import Path
+    from services.mongo_client import create_mongo_client
+
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    parser = argparse.ArgumentParser(description="Search field maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Build missing search fields for posts and pages")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        return
+
+    async def run():
+        client = create_mongo_client(os.environ['MONGO_URL'])
+        try:
+            counts = await backfill_search_fields(client[os.environ.get('DB_NAME', 'timelov_admin')])
+            print(f"Backfilled search fields: {counts}")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
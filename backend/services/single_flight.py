@@ -0,0 +1,213 @@
+"""
+Single-flight read cache for hot public endpoints
+
+Concurrent identical reads (same route and parameters) share one in-flight
+query instead of each hitting MongoDB, which matters right after a deploy
+or an invalidation when hundreds of requests miss at once. Results are
+kept for PUBLIC_READ_TTL_SECONDS; after that they are still served for up
+to PUBLIC_READ_STALE_SECONDS while a single background refresh runs
+(stale-while-revalidate).
+
+Entries are per worker. A write drops the affected routes' entries on
+its own worker immediately and bumps the routes' counters in the shared
+cache_versions collection (the same mechanism as the bootstrap payload in
+services/public_content.py); every other worker compares those counters
+at most PUBLIC_READ_VERSION_CHECK_SECONDS before serving from cache and
+drops the routes that changed. The check interval is kept below
+CDN_PURGE_BATCH_SECONDS and writes bump the counters before their CDN
+purge is scheduled, so a refetch triggered by the purge never finds the
+pre-write value on any worker.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from fastapi import Request
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_READ_TTL_SECONDS = float(os.environ.get("PUBLIC_READ_TTL_SECONDS", "5"))
+PUBLIC_READ_STALE_SECONDS = float(os.environ.get("PUBLIC_READ_STALE_SECONDS", "30"))
+PUBLIC_READ_MAX_ENTRIES = int(os.environ.get("PUBLIC_READ_MAX_ENTRIES", "2000"))
+# Must stay below CDN_PURGE_BATCH_SECONDS (services/cdn_purge.py)
+PUBLIC_READ_VERSION_CHECK_SECONDS = float(os.environ.get("PUBLIC_READ_VERSION_CHECK_SECONDS", "0.25"))
+CACHE_VERSION_ID = "public_reads"
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+CacheKey = Tuple[str, Hashable]
+
+
+class _Entry(NamedTuple):
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class SingleFlightCache:
+    """(route, params) -> value, with coalesced loads and stale-while-revalidate"""
+
+    def __init__(
+        self,
+        ttl: float = PUBLIC_READ_TTL_SECONDS,
+        stale_ttl: float = PUBLIC_READ_STALE_SECONDS,
+        max_entries: int = PUBLIC_READ_MAX_ENTRIES,
+        version_check: float = PUBLIC_READ_VERSION_CHECK_SECONDS
+    ):
+        self.db = None
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.version_check = version_check
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+        # Bumped by invalidate(); loads started before a write are not stored
+        self._generation = 0
+        # Per-route write counters last seen in cache_versions
+        self._versions: Dict[str, int] = {}
+        self._checked_at = float("-inf")
+        self._check_lock = asyncio.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "coalesced": 0}
+
+    def set_db(self, db):
+        self.db = db
+
+    async def _check_versions(self):
+        """Drop the routes another worker wrote to since the last check"""
+        if self.db is None or time.monotonic() - self._checked_at < self.version_check:
+            return
+        async with self._check_lock:
+            started = time.monotonic()
+            if started - self._checked_at < self.version_check:
+                return
+            try:
+                doc = await self.db.cache_versions.find_one({"_id": CACHE_VERSION_ID})
+            except Exception as e:
+                logger.warning(f"Public read version check failed: {e}")
+                self._checked_at = started
+                return
+            versions = (doc or {}).get("routes", {})
+            changed = [route for route, version in versions.items() if self._versions.get(route) != version]
+            if changed:
+                self.invalidate(*changed)
+            self._versions = dict(versions)
+            # A write committed before the query started is now visible here
+            self._checked_at = started
+
+    async def get(self, route: str, params: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value for (route, params), loading it with `loader` on a miss.
+        Concurrent misses await the same load; a failed load is raised to
+        every waiter and nothing is cached.
+        """
+        await self._check_versions()
+        key = (route, params)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None and now < entry.fresh_until:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.value
+
+        if entry is not None and now < entry.stale_until:
+            self.stats["stale"] += 1
+            if key not in self._inflight:
+                self._start_load(key, loader)
+            return entry.value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            inflight = self._start_load(key, loader)
+        # A cancelled request must not cancel the load other requests wait on
+        return await asyncio.shield(inflight)
+
+    def _start_load(self, key: CacheKey, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.create_task(loader())
+        self._inflight[key] = task
+        generation = self._generation
+        task.add_done_callback(lambda t: self._finish_load(key, t, generation))
+        return task
+
+    def _finish_load(self, key: CacheKey, task: asyncio.Task, generation: int):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            if generation == self._generation:
+                self._store(key, task.result())
+        elif key in self._entries:
+            logger.warning(f"Refresh of {key[0]} failed, serving stale value: {error}")
+
+    def _store(self, key: CacheKey, value: Any):
+        now = time.monotonic()
+        self._entries[key] = _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *routes: str):
+        """
+        Drop every entry of the given routes (all routes if none given).
+        After a write the old value must not be served, not even as stale
+        (a CDN refetch would cache it for s-maxage + SWR); concurrent readers
+        still share a single reload. Stale-while-revalidate only applies to
+        entries that expired by TTL.
+        """
+        self._generation += 1
+        for key in list(self._entries):
+            if not routes or key[0] in routes:
+                del self._entries[key]
+        # Loads already in flight may have read pre-write data; later readers start a new one
+        for key in list(self._inflight):
+            if not routes or key[0] in routes:
+                del self._inflight[key]
+
+    async def invalidate_shared(self, *routes: str):
+        """Invalidate the routes here and on every other worker"""
+        try:
+            if self.db is not None and routes:
+                doc = await self.db.cache_versions.find_one_and_update(
+                    {"_id": CACHE_VERSION_ID},
+                    {"$inc": {f"routes.{route}": 1 for route in routes}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                # Our own bump needs no second invalidation when this worker
+                # next checks; earlier bumps by others are covered because
+                # the local entries are dropped after the counters moved
+                for route in routes:
+                    self._versions[route] = doc["routes"][route]
+        finally:
+            self.invalidate(*routes)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._inflight.clear()
+
+
+public_reads = SingleFlightCache()
+
+
+def invalidate_on_write(*routes: str):
+    """
+    Router dependency: drop the routes' cached reads on every worker after a
+    successful write. List it after purge_on_write in a router's
+    dependencies: teardown runs in reverse, so the shared counters are
+    bumped before the CDN purge is scheduled.
+    """
+    async def dependency(request: Request):
+        yield
+        if request.method not in SAFE_METHODS:
+            await public_reads.invalidate_shared(*routes)
+    return dependency
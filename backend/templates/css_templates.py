@@ -10,6 +10,8 @@ TimeLOV Branding:
 - Border Radius: 8px
 - Box Shadow: 0 2px 8px rgba(0,0,0,0.1)
 """
+import re
+from typing import Optional
 
 # ═══════════════════════════════════════
 # CSS TEMPLATES BY INTEGRATION TYPE
@@ -722,7 +724,6 @@ def get_all_css_types() -> list:
 
 def minify_css(css: str) -> str:
     """Minify CSS by removing extra whitespace and comments"""
-    import re
     # Remove comments
     css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
     # Remove extra whitespace
@@ -757,6 +758,7 @@ TIMELOVE_BRANDING = {
     "secondary_color": "#00CC88",
     "accent_color": "#0066FF",
     "font_family": "'Inter', -apple-system, BlinkMacSystemFont, sans-serif",
+    "base_font_size": "16px",
     "border_radius": "8px",
     "border_radius_lg": "12px",
     "box_shadow": "0 2px 8px rgba(0,0,0,0.1)",
@@ -765,18 +767,46 @@ TIMELOVE_BRANDING = {
 }
 
 
-def generate_css_variables() -> str:
-    """Generate CSS custom properties for TimeLOV branding"""
+def _css_value(value: str) -> str:
+    """Strip characters that could break out of a CSS declaration"""
+    return re.sub(r'[;{}<>\\]', '', str(value)).strip()
+
+
+def resolve_branding(branding: Optional[dict] = None) -> dict:
+    """Merge stored branding settings over the TimeLOV defaults"""
+    values = dict(TIMELOVE_BRANDING)
+    if not branding:
+        return values
+    
+    for key in ("primary_color", "secondary_color", "accent_color", "base_font_size"):
+        if branding.get(key):
+            values[key] = _css_value(branding[key])
+    
+    if branding.get("font_family"):
+        font = _css_value(branding["font_family"]).strip("'\"")
+        values["font_family"] = f"'{font}', -apple-system, BlinkMacSystemFont, sans-serif"
+    
+    return values
+
+
+def generate_css_variables(branding: Optional[dict] = None) -> str:
+    """Generate CSS custom properties for TimeLOV branding
+    
+    `branding` is the `branding` section of site settings; missing keys fall
+    back to TIMELOVE_BRANDING.
+    """
+    values = resolve_branding(branding)
     return f"""
 :root {{
-    --timelove-primary: {TIMELOVE_BRANDING['primary_color']};
-    --timelove-secondary: {TIMELOVE_BRANDING['secondary_color']};
-    --timelove-accent: {TIMELOVE_BRANDING['accent_color']};
-    --timelove-font: {TIMELOVE_BRANDING['font_family']};
-    --timelove-radius: {TIMELOVE_BRANDING['border_radius']};
-    --timelove-radius-lg: {TIMELOVE_BRANDING['border_radius_lg']};
-    --timelove-shadow: {TIMELOVE_BRANDING['box_shadow']};
-    --timelove-shadow-lg: {TIMELOVE_BRANDING['box_shadow_lg']};
-    --timelove-shadow-xl: {TIMELOVE_BRANDING['box_shadow_xl']};
+    --timelove-primary: {values['primary_color']};
+    --timelove-secondary: {values['secondary_color']};
+    --timelove-accent: {values['accent_color']};
+    --timelove-font: {values['font_family']};
+    --timelove-font-size: {values['base_font_size']};
+    --timelove-radius: {values['border_radius']};
+    --timelove-radius-lg: {values['border_radius_lg']};
+    --timelove-shadow: {values['box_shadow']};
+    --timelove-shadow-lg: {values['box_shadow_lg']};
+    --timelove-shadow-xl: {values['box_shadow_xl']};
 }}
 """
@@ -0,0 +1,165 @@
+"""Minimal in-memory stand-in for the Motor API used by the services under test"""
+import copy
+import re
+from typing import Dict, List
+
+
+def _compare(value, operator, operand):
+    if operator == "$lt":
+        return value is not None and value < operand
+    if operator == "$lte":
+        return value is not None and value <= operand
+    if operator == "$gt":
+        return value is not None and value > operand
+    if operator == "$gte":
+        return value is not None and value >= operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$exists":
+        return (value is not None) == operand
+    raise NotImplementedError(operator)
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _parent(doc: dict, path: str):
+    *parents, key = path.split(".")
+    for name in parents:
+        doc = doc.setdefault(name, {})
+    return doc, key
+
+
+class FakeCursor:
+    def __init__(self, docs: List[dict]):
+        self._docs = docs
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda doc: doc.get(field), reverse=order < 0)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self) -> List[dict]:
+        docs = self._docs[self._skip:]
+        return docs[:self._limit] if self._limit else docs
+
+    async def to_list(self, length=None):
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, db: "FakeDatabase", name: str):
+        self.db = db
+        self.name = name
+
+    @property
+    def docs(self) -> List[dict]:
+        return self.db.collections.setdefault(self.name, [])
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([copy.deepcopy(doc) for doc in self.docs if matches(doc, query or {})])
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        cursor = self.find(query)
+        if sort:
+            cursor.sort(sort)
+        docs = await cursor.to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, query, limit=0):
+        count = sum(1 for doc in self.docs if matches(doc, query))
+        return min(count, limit) if limit else count
+
+    async def insert_one(self, doc):
+        self.docs.append(copy.deepcopy(doc))
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(copy.deepcopy(doc) for doc in docs)
+
+    async def update_one(self, query, update, upsert=False):
+        await self.find_one_and_update(query, update, upsert=upsert)
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False, **kwargs):
+        doc = next((doc for doc in self.docs if matches(doc, query)), None)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = {key: value for key, value in query.items() if not key.startswith("$")}
+            self.docs.append(doc)
+        before = copy.deepcopy(doc)
+        for path, value in update.get("$set", {}).items():
+            parent, key = _parent(doc, path)
+            parent[key] = value
+        for path, value in update.get("$inc", {}).items():
+            parent, key = _parent(doc, path)
+            parent[key] = parent.get(key, 0) + value
+        return copy.deepcopy(doc) if return_document else before
+
+    async def create_indexes(self, indexes):
+        self.docs
+
+    async def drop(self):
+        self.db.collections.pop(self.name, None)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections: Dict[str, List[dict]] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return FakeCollection(self, name)
+
+    def get_collection(self, name: str, **kwargs) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    async def list_collection_names(self, filter=None):
+        names = list(self.collections)
+        if filter:
+            pattern = re.compile(filter["name"]["$regex"])
+            names = [name for name in names if pattern.match(name)]
+        return names
@@ -0,0 +1,132 @@
+"""Audit entry encoding: text diffs, IP packing and reconstruction"""
+import asyncio
+import ipaddress
+
+import pytest
+
+from services.audit_codec import (
+    AUDIT_TEXT_DIFF_MIN_CHARS, ReconstructionError,
+    text_diff, apply_text_diff, revert_text_diff, encode_ip, decode_ip,
+    encode_entry, revert_entry
+)
+
+
+ARTICLE = "".join(
+    f"<p>Akapit {i}. Zdanie pierwsze! Czy drugie? Tak.</p>\n" for i in range(40)
+)
+
+
+def assert_round_trip(old, new):
+    hunks = text_diff(old, new)
+    assert apply_text_diff(old, hunks) == new
+    assert revert_text_diff(new, hunks) == old
+    return hunks
+
+
+@pytest.mark.parametrize("old,new", [
+    ("", ""),
+    ("", "nowy tekst"),
+    ("stary tekst", ""),
+    ("bez zmian", "bez zmian"),
+    ("Ala ma kota.", "Ala ma psa."),
+    ("Pierwsze zdanie. Drugie zdanie!", "Pierwsze zdanie. Trzecie zdanie?"),
+    ("<p>a</p><p>b</p>", "<p>a</p><p>c</p><p>b</p>"),
+    ("zażółć gęślą jaźń", "zażółć gęślą jaźń 😀"),
+    ("日本語のテキスト。", "日本語の新しいテキスト。"),
+])
+def test_text_diff_round_trip(old, new):
+    assert_round_trip(old, new)
+
+
+def test_text_diff_identical_texts_have_no_hunks():
+    assert text_diff(ARTICLE, ARTICLE) == []
+
+
+def test_text_diff_long_text_stores_only_the_changes():
+    new = ARTICLE.replace("Akapit 3.", "Akapit trzeci.").replace("Akapit 30.", "Akapit 30 — ćma!")
+    hunks = assert_round_trip(ARTICLE, new)
+    assert sum(len(old) + len(new) for _, old, new in hunks) < 40
+
+
+def test_text_diff_long_text_across_sentence_and_tag_boundaries():
+    new = ARTICLE.replace("Czy drugie? Tak.</p>\n<p>Akapit 7.", "Nie.</p><p>Łączony akapit 7!")
+    new = new[:100] + "<br>\n" + new[100:]
+    assert_round_trip(ARTICLE, new)
+    assert_round_trip(new, ARTICLE)
+
+
+def test_text_diff_rewritten_text():
+    assert_round_trip(ARTICLE, ARTICLE[::-1])
+
+
+def test_apply_text_diff_rejects_a_different_base():
+    hunks = text_diff("Ala ma kota.", "Ala ma psa.")
+    with pytest.raises(ReconstructionError):
+        apply_text_diff("Ola ma konia.", hunks)
+    with pytest.raises(ReconstructionError):
+        revert_text_diff("Ola ma konia.", hunks)
+
+
+@pytest.mark.parametrize("ip,size", [
+    ("192.168.1.20", 4),
+    ("2001:db8::8a2e:370:7334", 16),
+    ("::ffff:10.0.0.1", 16),
+])
+def test_encode_ip_packs_addresses(ip, size):
+    packed = encode_ip(ip)
+    assert isinstance(packed, bytes) and len(packed) == size
+    assert decode_ip(packed) == str(ipaddress.ip_address(ip))
+
+
+@pytest.mark.parametrize("value", ["unknown", "", "999.1.1.1", "localhost", None])
+def test_encode_ip_keeps_non_ip_values(value):
+    assert encode_ip(value) == value
+
+
+def test_decode_ip_of_missing_value_is_empty():
+    assert decode_ip(None) == ""
+
+
+def encode(doc):
+    return asyncio.run(encode_entry(doc))
+
+
+def test_revert_entry_through_create_update_delete():
+    content_v1 = ARTICLE
+    content_v2 = ARTICLE.replace("Akapit 12.", "Akapit dwunasty, poprawiony.")
+    assert len(content_v1) >= AUDIT_TEXT_DIFF_MIN_CHARS
+
+    create = encode({
+        "action": "post_create",
+        "new_values": {"title": "Wpis", "slug": "wpis", "status": "draft"},
+    })
+    update = encode({
+        "action": "post_update",
+        "old_values": {"title": "Wpis", "content": content_v1, "status": "draft"},
+        "new_values": {"title": "Wpis 2", "content": content_v2, "status": "draft"},
+    })
+    delete = encode({
+        "action": "post_delete",
+        "old_values": {"slug": "wpis", "title": "Wpis 2"},
+    })
+    # Unchanged fields are dropped and the long text is stored as a diff
+    assert update["old_values"] == {"title": "Wpis"}
+    assert "content" in update["text_diffs"]
+
+    current = {"title": "Wpis 2", "slug": "wpis", "status": "draft", "content": content_v2}
+    before_delete = revert_entry(current, delete)
+    assert before_delete == current
+    before_update = revert_entry(before_delete, update)
+    assert before_update == {**current, "title": "Wpis", "content": content_v1}
+    assert revert_entry(before_update, create) == before_update
+    # Reverting never mutates the state it is given
+    assert current["content"] == content_v2
+
+
+def test_revert_entry_without_current_text():
+    update = encode({
+        "old_values": {"content": ARTICLE},
+        "new_values": {"content": ARTICLE + "<p>Dopisek.</p>"},
+    })
+    with pytest.raises(ReconstructionError):
+        revert_entry({"title": "Wpis"}, update)
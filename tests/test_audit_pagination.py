@@ -0,0 +1,99 @@
+"""Keyset (created_at, id) cursors and paging across audit partitions"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import audit_storage
+from services.audit_storage import (
+    entry_cursor, parse_entry_cursor, find_entries, partition_name
+)
+from tests.fake_mongo import FakeDatabase
+
+
+def make_db(entries):
+    db = FakeDatabase()
+    for entry in entries:
+        db.collections.setdefault(partition_name(entry["created_at"]), []).append(entry)
+    asyncio.run(audit_storage._refresh_partitions(db, force=True))
+    return db
+
+
+def seeded_entries():
+    """Three monthly partitions; every timestamp is shared by three entries"""
+    entries = []
+    start = datetime(2026, 3, 30, 12, 0)
+    for step in range(40):
+        created_at = start + timedelta(days=step, milliseconds=step % 2)
+        for n in range(3):
+            entries.append({
+                "id": f"{step:03d}-{n}",
+                "created_at": created_at,
+                "action": "post_update" if n else "post_create",
+            })
+    return entries
+
+
+def page_through(db, query, limit):
+    pages = []
+    before = None
+    while True:
+        page = asyncio.run(find_entries(db, query, limit=limit, before=before))
+        if not page:
+            return pages
+        pages.append(page)
+        if len(page) < limit:
+            return pages
+        before = parse_entry_cursor(entry_cursor(page[-1]))
+
+
+def expected_order(entries, query=None):
+    selected = [entry for entry in entries if all(entry[k] == v for k, v in (query or {}).items())]
+    return sorted(selected, key=lambda entry: (entry["created_at"], entry["id"]), reverse=True)
+
+
+def test_entry_cursor_round_trip():
+    entry = {"created_at": datetime(2026, 5, 1, 8, 30, 15, 123000), "id": "abc_def-1"}
+    assert parse_entry_cursor(entry_cursor(entry)) == (entry["created_at"], "abc_def-1")
+
+
+def test_entry_cursor_truncates_to_milliseconds():
+    entry = {"created_at": datetime(2026, 5, 1, 8, 30, 15, 123456), "id": "x"}
+    created_at, _ = parse_entry_cursor(entry_cursor(entry))
+    assert created_at == datetime(2026, 5, 1, 8, 30, 15, 123000)
+
+
+@pytest.mark.parametrize("cursor", ["", "123", "abc_def", "12.5_x"])
+def test_parse_entry_cursor_rejects_malformed_values(cursor):
+    with pytest.raises(ValueError):
+        parse_entry_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 7, 10, 50])
+def test_keyset_pages_cover_every_partition_once(limit):
+    entries = seeded_entries()
+    db = make_db(entries)
+    assert len(db.collections) == 3
+
+    pages = page_through(db, {}, limit)
+    seen = [entry["id"] for page in pages for entry in page]
+    assert seen == [entry["id"] for entry in expected_order(entries)]
+
+
+def test_keyset_pages_with_a_filter():
+    entries = seeded_entries()
+    db = make_db(entries)
+    pages = page_through(db, {"action": "post_create"}, 4)
+    seen = [entry["id"] for page in pages for entry in page]
+    assert seen == [entry["id"] for entry in expected_order(entries, {"action": "post_create"})]
+
+
+def test_skip_crosses_partition_boundaries():
+    entries = seeded_entries()
+    db = make_db(entries)
+    ordered = expected_order(entries)
+    newest_partition = partition_name(ordered[0]["created_at"])
+    skip = len(db.collections[newest_partition]) + 2
+
+    page = asyncio.run(find_entries(db, {}, skip=skip, limit=5))
+    assert [entry["id"] for entry in page] == [entry["id"] for entry in ordered[skip:skip + 5]]
@@ -0,0 +1,83 @@
+"""Change feed polling fallback: (updated_at, _id) cursors and the commit lag"""
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from services import change_feed as change_feed_module
+from services.change_feed import ChangeFeed, FEED_COLLECTIONS, _parse_polling_cursor, _polling_cursor
+from tests.fake_mongo import FakeDatabase
+
+
+def now_millis():
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def make_feed():
+    db = FakeDatabase()
+    feed = ChangeFeed(mode="polling")
+    feed.set_db(db)
+    return feed, db
+
+
+def add(db, collection, updated_at, entity_id):
+    db.collections.setdefault(collection, []).append({
+        "_id": ObjectId(), "id": entity_id, "created_at": updated_at - timedelta(days=1), "updated_at": updated_at,
+    })
+
+
+def read_all(feed, since, limit):
+    seen = []
+    while True:
+        changes, since, has_more = asyncio.run(feed.read(since, limit))
+        seen.extend(change["id"] for change in changes)
+        if not has_more:
+            return seen, since
+
+
+def test_polling_cursor_round_trip():
+    key = ObjectId()
+    at = datetime(2026, 5, 1, 12, 0, 0, 250000)
+    assert _parse_polling_cursor(_polling_cursor(at, "site_settings", key)) == (at, "site_settings", key)
+    assert _parse_polling_cursor(_polling_cursor(at)) == (at, None, None)
+
+
+def test_changes_sharing_a_timestamp_are_paged_without_gaps():
+    feed, db = make_feed()
+    base = now_millis() - timedelta(minutes=5)
+    since = _polling_cursor(base)
+    expected = []
+    for step in range(5):
+        for collection in FEED_COLLECTIONS:
+            for n in range(3):
+                entity_id = f"{collection}-{step}-{n}"
+                add(db, collection, base + timedelta(seconds=step + 1), entity_id)
+                expected.append(entity_id)
+
+    for limit in (1, 2, 4, 7, 100):
+        seen, _ = read_all(feed, since, limit)
+        assert sorted(seen) == sorted(expected)
+        assert len(seen) == len(set(seen))
+
+
+def test_recent_writes_wait_for_the_commit_lag(monkeypatch):
+    feed, db = make_feed()
+    since = _polling_cursor(now_millis() - timedelta(minutes=1))
+    add(db, "posts", now_millis() - timedelta(seconds=30), "settled")
+    add(db, "pages", now_millis(), "in-flight")
+
+    seen, since = read_all(feed, since, 10)
+    assert seen == ["settled"]
+
+    # A slower write with an earlier timestamp commits after the read above
+    add(db, "widgets", now_millis() - timedelta(milliseconds=change_feed_module.CHANGE_FEED_POLL_LAG_MS // 2), "slow")
+    monkeypatch.setattr(change_feed_module, "CHANGE_FEED_POLL_LAG_MS", 0)
+    seen, _ = read_all(feed, since, 10)
+    assert sorted(seen) == ["in-flight", "slow"]
+
+
+def test_empty_read_keeps_the_cursor():
+    feed, _ = make_feed()
+    since = _polling_cursor(now_millis() - timedelta(minutes=1), "posts", ObjectId())
+    assert asyncio.run(feed.read(since, 10)) == ([], since, False)
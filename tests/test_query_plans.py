@@ -0,0 +1,165 @@
+"""
+Query-plan regression test for the TimeLov route queries
+
+Seeds a scratch database with benchmarks.seed_data, applies
+services.indexes.INDEX_SPEC and runs every route's query shape through
+explain(). A winning plan containing a COLLSCAN or a blocking (in-memory)
+SORT fails, so a missing or mismatched index is caught before it reaches
+production. Needs a MongoDB server (MONGO_URL, default localhost) and is
+skipped when none is reachable.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from benchmarks.seed_data import seed_database
+from models.audit_log import AuditAction, EntityType
+from models.post import PostCategory, PostStatus
+from services.audit_storage import ENTRY_SORT, LEGACY_COLLECTION, PARTITION_RE
+from services.change_feed import POLLING_SORT
+from services.indexes import INDEX_SPEC
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+PLANS_DB_NAME = "timelov_plans_test"
+
+BAD_STAGES = frozenset(("COLLSCAN", "SORT"))
+
+NOT_DELETED = {"deleted_at": None}
+PUBLISHED = PostStatus.PUBLISHED.value
+SINCE = datetime.utcnow() - timedelta(days=30)
+
+
+class QueryShape(NamedTuple):
+    route: str
+    collection: str
+    filter: dict
+    sort: Optional[list] = None
+    limit: int = 0
+    count: bool = False
+
+
+QUERY_SHAPES: List[QueryShape] = [
+    # posts
+    QueryShape("list_posts", "posts", NOT_DELETED, [("created_at", -1)], 50),
+    QueryShape("list_posts?status", "posts", {**NOT_DELETED, "status": PUBLISHED}, [("created_at", -1)], 50),
+    QueryShape("list_posts?category", "posts", {**NOT_DELETED, "category": PostCategory.NEWS.value}, [("created_at", -1)], 50),
+    QueryShape("list_posts?status&category", "posts",
+               {**NOT_DELETED, "status": PUBLISHED, "category": PostCategory.NEWS.value}, [("created_at", -1)], 50),
+    QueryShape("get_post", "posts", {"id": "x", **NOT_DELETED}, limit=1),
+    QueryShape("create_post (slug check)", "posts", {"slug": "x", **NOT_DELETED}, limit=1),
+    QueryShape("list_public_posts", "posts", {"status": PUBLISHED, **NOT_DELETED}, [("published_at", -1)], 10),
+    QueryShape("list_public_posts?category", "posts",
+               {"status": PUBLISHED, **NOT_DELETED, "category": PostCategory.NEWS.value}, [("published_at", -1)], 10),
+    QueryShape("get_public_post", "posts", {"slug": "x", "status": PUBLISHED, **NOT_DELETED}, limit=1),
+    # pages
+    QueryShape("list_pages", "pages", NOT_DELETED, [("created_at", -1)], 100),
+    QueryShape("list_pages?status", "pages", {**NOT_DELETED, "status": "published"}, [("created_at", -1)], 100),
+    QueryShape("get_page", "pages", {"id": "x", **NOT_DELETED}, limit=1),
+    QueryShape("get_public_page", "pages", {"slug": "/x", "status": "published", **NOT_DELETED}, limit=1),
+    # widgets
+    QueryShape("list_widgets", "widgets", {**NOT_DELETED, "is_active": True}, [("display_order", 1)], 100),
+    QueryShape("list_widgets?include_inactive", "widgets", NOT_DELETED, [("display_order", 1)], 100),
+    QueryShape("get_public_widget", "widgets", {"section_name": "hero", "is_active": True, **NOT_DELETED}, limit=1),
+    # integrations
+    QueryShape("list_integrations", "integrations", {"is_active": True}, [("priority_order", 1)], 100),
+    QueryShape("list_integrations?include_inactive", "integrations", {}, [("priority_order", 1)], 100),
+    QueryShape("list_public_integrations?position", "integrations",
+               {"is_active": True, "injection_position": "header"}, [("priority_order", 1)], 100),
+    QueryShape("get_integration", "integrations", {"id": "x"}, limit=1),
+    # settings
+    QueryShape("get_public_settings", "site_settings", {"_type": "complete_settings"}, limit=1),
+    # audit logs
+    QueryShape("list_audit_logs", "audit_logs", {}, ENTRY_SORT, 100),
+    QueryShape("list_audit_logs?action", "audit_logs", {"action": AuditAction.UPDATE.value}, ENTRY_SORT, 100),
+    QueryShape("list_audit_logs?admin_id", "audit_logs", {"admin_id": "x"}, ENTRY_SORT, 100),
+    QueryShape("list_audit_logs?entity_type", "audit_logs",
+               {"entity_type": EntityType.POST.value}, ENTRY_SORT, 100),
+    QueryShape("list_audit_logs?start_date", "audit_logs", {"created_at": {"$gte": SINCE}}, ENTRY_SORT, 100),
+    QueryShape("export_audit_logs", "audit_logs", {"created_at": {"$gte": SINCE}}, ENTRY_SORT),
+    QueryShape("get_posts_history", "audit_logs",
+               {"entity_type": EntityType.POST.value, "entity_id": "x"}, ENTRY_SORT, 51),
+    QueryShape("get_posts_history?before", "audit_logs",
+               {"entity_type": EntityType.POST.value, "entity_id": "x", "created_at": {"$lte": SINCE},
+                "$or": [{"created_at": {"$lt": SINCE}}, {"created_at": SINCE, "id": {"$lt": "x"}}]},
+               ENTRY_SORT, 51),
+    QueryShape("get_integrations_history", "audit_logs",
+               {"entity_type": {"$in": ["integration", "widget"]}, "entity_id": "x"}, ENTRY_SORT, 51),
+    QueryShape("get_audit_timeseries", "audit_rollups",
+               {"granularity": "day", "bucket": {"$gte": SINCE}}, [("bucket", 1)]),
+    # dashboard
+    QueryShape("dashboard posts count", "posts", NOT_DELETED, count=True),
+    QueryShape("dashboard published posts count", "posts", {**NOT_DELETED, "status": PUBLISHED}, count=True),
+    QueryShape("dashboard pages count", "pages", NOT_DELETED, count=True),
+    QueryShape("dashboard published pages count", "pages", {**NOT_DELETED, "status": "published"}, count=True),
+    QueryShape("dashboard widgets count", "widgets", NOT_DELETED, count=True),
+    QueryShape("dashboard active widgets count", "widgets", {**NOT_DELETED, "is_active": True}, count=True),
+    QueryShape("dashboard recent logs", "audit_logs", {}, ENTRY_SORT, 10),
+    # change feed polling fallback (resuming inside a timestamp)
+    QueryShape("list_changes (polling)", "posts",
+               {"updated_at": {"$gte": SINCE, "$lte": datetime.utcnow()},
+                "$or": [{"updated_at": {"$gt": SINCE}}, {"_id": {"$gt": ObjectId()}}]},
+               POLLING_SORT, 101),
+]
+
+
+def plan_stages(plan: dict) -> List[str]:
+    """All stage names in a (classic or SBE) winning plan tree"""
+    if "queryPlan" in plan:
+        plan = plan["queryPlan"]
+    stages = [plan.get("stage", "")]
+    for child_key in ("inputStage", "outerStage", "innerStage"):
+        if child_key in plan:
+            stages.extend(plan_stages(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return stages
+
+
+def explain(db, shape: QueryShape, audit_partition: str) -> dict:
+    collection = audit_partition if shape.collection == LEGACY_COLLECTION else shape.collection
+    if shape.count:
+        return db.command("explain", {"count": collection, "query": shape.filter}, verbosity="queryPlanner")
+    cursor = db[collection].find(shape.filter)
+    if shape.sort:
+        cursor = cursor.sort(shape.sort)
+    if shape.limit:
+        cursor = cursor.limit(shape.limit)
+    return cursor.explain()
+
+
+@pytest.fixture(scope="module")
+def plans_db():
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        client.close()
+        pytest.skip(f"MongoDB not reachable at {MONGO_URL} ({type(e).__name__})")
+    db = client[PLANS_DB_NAME]
+    seed_database(db, posts=2_000, pages=100, integrations=20, audit_logs=5_000, log=lambda message: None)
+    for collection, models in INDEX_SPEC.items():
+        db[collection].create_indexes(models)
+    # Seeded audit entries live in monthly partitions sharing the audit_logs indexes
+    for name in db.list_collection_names(filter={"name": {"$regex": PARTITION_RE.pattern}}):
+        db[name].create_indexes(INDEX_SPEC[LEGACY_COLLECTION])
+    yield db
+    client.drop_database(PLANS_DB_NAME)
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def audit_partition(plans_db):
+    """Newest seeded audit partition; audit_logs query shapes run against it"""
+    return max(plans_db.list_collection_names(filter={"name": {"$regex": PARTITION_RE.pattern}}))
+
+
+@pytest.mark.parametrize("shape", QUERY_SHAPES, ids=[shape.route for shape in QUERY_SHAPES])
+def test_query_shape_is_index_backed(plans_db, audit_partition, shape):
+    stages = plan_stages(explain(plans_db, shape, audit_partition)["queryPlanner"]["winningPlan"])
+    bad = BAD_STAGES.intersection(stages)
+    assert not bad, f"{shape.route} on {shape.collection}: {' <- '.join(stages)}"
@@ -0,0 +1,149 @@
+"""Sliding-window rate limiter: window rollover and locally admitted hits"""
+import asyncio
+import types
+
+import pytest
+
+from middleware import rate_limiter
+from middleware.rate_limiter import (
+    MemoryRateLimitStorage, RateLimiter, RateLimitExceeded, parse_rate_limit
+)
+
+LIMIT = parse_rate_limit("10/minute")
+WINDOW_START = 1_800_000_000 // 60 * 60
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(WINDOW_START + 1.0)
+    monkeypatch.setattr(rate_limiter, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+class SharedStorage(MemoryRateLimitStorage):
+    """Memory counters behaving like the shared (remote) Mongo storage"""
+
+    remote = True
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.fail = False
+
+    async def incr(self, key, amount, expire_at):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise ConnectionError("storage down")
+        return await super().incr(key, amount, expire_at)
+
+
+def hits(limiter, n):
+    async def run():
+        admitted = 0
+        for _ in range(n):
+            try:
+                await limiter.hit("api", "client", LIMIT)
+                admitted += 1
+            except RateLimitExceeded:
+                pass
+        return admitted
+    return asyncio.run(run())
+
+
+def test_limit_is_enforced_within_a_window(clock):
+    limiter = RateLimiter()
+    assert hits(limiter, 10) == 10
+    with pytest.raises(RateLimitExceeded) as exc:
+        asyncio.run(limiter.hit("api", "client", LIMIT))
+    assert exc.value.retry_after == 59
+
+
+def test_previous_window_weighs_on_the_next_one(clock):
+    limiter = RateLimiter()
+    assert hits(limiter, 10) == 10
+
+    # Just after the rollover the previous window still counts almost fully
+    clock.now = WINDOW_START + 60 + 1
+    assert hits(limiter, 5) == 0
+
+    # Halfway through, half of the previous window's 10 hits remain; the
+    # rejected attempts above were counted as well
+    clock.now = WINDOW_START + 60 + 30
+    assert hits(limiter, 10) == 0
+
+    # Two windows later nothing is left of the burst
+    clock.now = WINDOW_START + 180 + 1
+    assert hits(limiter, 10) == 10
+
+
+def test_rollover_reads_the_previous_window_once(clock):
+    storage = MemoryRateLimitStorage()
+    limiter = RateLimiter()
+    limiter.init_storage(storage)
+    hits(limiter, 4)
+    clock.now = WINDOW_START + 60 + 30
+    hits(limiter, 1)
+    bucket = limiter._buckets["api:client"]
+    assert bucket.window_id == (WINDOW_START + 60) // 60
+    assert bucket.previous == 4
+
+
+def test_locally_admitted_hits_are_flushed_once_at_rollover(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_WORKERS", 1)
+    limit = parse_rate_limit("1000/minute")
+    storage = SharedStorage()
+    limiter = RateLimiter()
+    limiter.init_storage(storage)
+    first_window = WINDOW_START // 60
+
+    async def burst(n):
+        await asyncio.gather(*(limiter.hit("api", "client", limit) for _ in range(n)))
+
+    asyncio.run(burst(1))
+    asyncio.run(burst(30))
+    # Most of the burst was admitted from local tokens, without a storage call
+    assert storage.calls < 31
+    assert limiter._buckets["api:client"].pending > 0
+
+    # Many requests race into the next window; the pending hits of the old
+    # one are flushed by exactly one of them
+    clock.now = WINDOW_START + 60 + 0.5
+    asyncio.run(burst(50))
+    assert asyncio.run(storage.get(f"api:client:{first_window}")) == 31
+    assert limiter._buckets["api:client"].previous == 31
+
+
+def test_failed_rollover_flush_keeps_the_pending_hits(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_WORKERS", 1)
+    limit = parse_rate_limit("1000/minute")
+    storage = SharedStorage()
+    limiter = RateLimiter()
+    limiter.init_storage(storage)
+    first_window = WINDOW_START // 60
+
+    async def burst(n):
+        await asyncio.gather(*(limiter.hit("api", "client", limit) for _ in range(n)))
+
+    asyncio.run(burst(1))
+    asyncio.run(burst(20))
+    pending = limiter._buckets["api:client"].pending
+    assert pending > 0
+
+    clock.now = WINDOW_START + 60 + 0.5
+    storage.fail = True
+    with pytest.raises(ConnectionError):
+        asyncio.run(limiter.hit("api", "client", limit))
+    assert limiter._buckets["api:client"].pending == pending
+
+    storage.fail = False
+    asyncio.run(limiter.hit("api", "client", limit))
+    assert asyncio.run(storage.get(f"api:client:{first_window}")) == 21
@@ -0,0 +1,167 @@
+"""Single-flight public read cache: coalescing, invalidation races and cross-worker versions"""
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlightCache
+from tests.fake_mongo import FakeDatabase
+
+
+class Source:
+    """Loader whose reads can be held open to interleave them with writes"""
+
+    def __init__(self, value=1):
+        self.value = value
+        self.loads = 0
+        self.gate = None
+
+    async def load(self):
+        self.loads += 1
+        value = self.value
+        if self.gate is not None:
+            await self.gate.wait()
+        return value
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def settle():
+    """Let scheduled tasks (readers, then the loads they start) run"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache, source = SingleFlightCache(ttl=60), Source()
+        source.gate = asyncio.Event()
+        readers = [asyncio.create_task(cache.get("r", "k", source.load)) for _ in range(20)]
+        await settle()
+        source.gate.set()
+        assert await asyncio.gather(*readers) == [1] * 20
+        assert source.loads == 1
+        assert cache.stats["coalesced"] == 19
+    run(scenario())
+
+
+def test_load_started_before_invalidate_is_not_stored():
+    async def scenario():
+        cache = SingleFlightCache(ttl=60)
+        old, new = Source(1), Source(2)
+        old.gate = asyncio.Event()
+        early = asyncio.create_task(cache.get("r", "k", old.load))
+        await settle()
+
+        # A write lands while the read of the old value is still in flight;
+        # the next reader starts its own load and finishes first
+        cache.invalidate("r")
+        assert await cache.get("r", "k", new.load) == 2
+        old.gate.set()
+        assert await early == 1
+
+        # The pre-write load finished last but must not overwrite the entry
+        assert await cache.get("r", "k", Source(3).load) == 2
+        assert new.loads == 1
+    run(scenario())
+
+
+def test_invalidate_drops_stale_entries():
+    async def scenario():
+        cache, source = SingleFlightCache(ttl=0, stale_ttl=60), Source()
+        assert await cache.get("r", "k", source.load) == 1
+        source.value = 2
+        # Expired by TTL: served stale while one refresh runs
+        assert await cache.get("r", "k", source.load) == 1
+        await settle()
+        source.value = 3
+        cache.invalidate("r")
+        # After a write nothing older is served, not even as stale
+        assert await cache.get("r", "k", source.load) == 3
+    run(scenario())
+
+
+def test_invalidate_only_touches_the_given_routes():
+    async def scenario():
+        cache, source = SingleFlightCache(ttl=60), Source()
+        await cache.get("a", "k", source.load)
+        await cache.get("b", "k", source.load)
+        cache.invalidate("a")
+        await cache.get("a", "k", source.load)
+        await cache.get("b", "k", source.load)
+        assert source.loads == 3
+    run(scenario())
+
+
+def test_invalidate_during_stale_refresh_discards_the_refresh():
+    async def scenario():
+        cache, source = SingleFlightCache(ttl=0, stale_ttl=60), Source()
+        await cache.get("r", "k", source.load)
+        source.gate = asyncio.Event()
+        assert await cache.get("r", "k", source.load) == 1
+        await settle()
+        source.value = 2
+        cache.invalidate("r")
+        source.gate.set()
+        await settle()
+        source.gate = None
+        assert await cache.get("r", "k", source.load) == 2
+    run(scenario())
+
+
+def test_failed_load_is_raised_to_every_waiter_and_not_cached():
+    async def scenario():
+        cache = SingleFlightCache(ttl=60)
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise RuntimeError("db down")
+
+        readers = [asyncio.create_task(cache.get("r", "k", failing)) for _ in range(3)]
+        await settle()
+        gate.set()
+        results = await asyncio.gather(*readers, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache.get("r", "k", Source(5).load) == 5
+    run(scenario())
+
+
+def test_cancelled_reader_does_not_cancel_the_shared_load():
+    async def scenario():
+        cache, source = SingleFlightCache(ttl=60), Source()
+        source.gate = asyncio.Event()
+        first = asyncio.create_task(cache.get("r", "k", source.load))
+        second = asyncio.create_task(cache.get("r", "k", source.load))
+        await settle()
+        first.cancel()
+        source.gate.set()
+        assert await second == 1
+        with pytest.raises(asyncio.CancelledError):
+            await first
+    run(scenario())
+
+
+def test_write_on_another_worker_invalidates_after_the_version_check():
+    async def scenario():
+        db = FakeDatabase()
+        writer = SingleFlightCache(ttl=60, version_check=0.01)
+        reader = SingleFlightCache(ttl=60, version_check=0.01)
+        writer.set_db(db)
+        reader.set_db(db)
+        source = Source()
+        assert await writer.get("r", "k", source.load) == 1
+        assert await reader.get("r", "k", source.load) == 1
+
+        source.value = 2
+        await writer.invalidate_shared("r")
+        assert await writer.get("r", "k", source.load) == 2
+        await asyncio.sleep(0.02)
+        assert await reader.get("r", "k", source.load) == 2
+        loads = source.loads
+        # The writer's own bump does not invalidate it a second time
+        await asyncio.sleep(0.02)
+        assert await writer.get("r", "k", source.load) == 2
+        assert source.loads == loads
+    run(scenario())